@@ -6,10 +6,72 @@ class Settings(BaseSettings):
     SMTP_PORT: int
     SMTP_USER: str
     SMTP_PASSWORD: str
+    SMTP_STARTTLS: bool = True
+    SMTP_USE_CREDENTIALS: bool = True   # False para servidores locais (ex.: aiosmtpd)
     DATABASE_URL: str  # <-- Adicione esta linha
+    ASYNC_DATABASE_URL: str | None = None  # default: DATABASE_URL com asyncpg/aiosqlite
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # segundos
     openai_api_key: str 
     OPENAI_MODEL_DIARIO: str
     OPENAI_MODEL_CONSELHO: str 
+    OPENAI_BASE_URL: str | None = None          # ex.: servidor fake compatível com a API da OpenAI
+    OPENAI_TIMEOUT_SEGUNDOS: float = 30
+    OPENAI_MAX_CONCORRENCIA_POR_MODELO: int = 8
+    OPENAI_ESPERA_FILA_SEGUNDOS: float = 5       # espera por vaga antes de responder 503
+
+    # pool de conselhos emergenciais pré-gerados
+    CONSELHO_POOL_MAX: int = 60
+    CONSELHO_POOL_LOTE: int = 5                 # conselhos gerados por rodada
+    CONSELHO_POOL_INTERVALO_SEGUNDOS: float = 600
+
+    # análise de diários em lote
+    DIARIO_LOTE_MAX: int = 10                # entradas por prompt
+    DIARIO_MAX_TENTATIVAS: int = 3
+
+    # avisos no início da janela dos gatilhos (um único líder entre os workers)
+    GATILHOS_NOTIFICAR: bool = True
+    GATILHOS_LOCK_ARQUIVO: str = "/tmp/betblocker-gatilhos.lock"  # usado fora do Postgres
+    GATILHOS_SYNC_SEGUNDOS: float = 15      # busca gatilhos alterados em outros workers
+
+    # expiração noturna de streaks (fecha as streaks sem check-in desde anteontem)
+    STREAKS_EXPIRAR: bool = True
+    STREAKS_EXPIRAR_HORA_UTC: int = 3
+    STREAKS_EXPIRAR_LOTE: int = 5000             # usuários por UPDATE
+    STREAKS_EXPIRAR_PAUSA_SEGUNDOS: float = 0.2  # entre lotes, para não saturar o primário
+    STREAKS_LOCK_ARQUIVO: str = "/tmp/betblocker-streaks.lock"  # usado fora do Postgres
+
+    # orçamento de statements SQL por rota (app/utils/orcamento_sql.py)
+    SQL_ORCAMENTO_ESTRITO: bool = False  # True em dev/CI: rota acima do orçamento responde 500
+
+    # catálogo de desafios em memória
+    CATALOGO_REVALIDAR_SEGUNDOS: float = 30  # confere alterações feitas por outros workers
+
+    # buffer de ingestão de tentativas (POST /tentativas/batch)
+    TENTATIVAS_LOTE_MAX: int = 500          # linhas por INSERT
+    TENTATIVAS_FLUSH_SEGUNDOS: float = 1.0  # flush mesmo sem completar o lote
+    TENTATIVAS_BUFFER_MAX: int = 20000      # acima disso, 503 (backpressure)
+
+    # resumo de alertas de tentativas (um e-mail por usuário por janela)
+    ALERTA_JANELA_SEGUNDOS: float = 300
+    ALERTA_BUCKET_CAPACIDADE: int = 3              # resumos em rajada por usuário
+    ALERTA_BUCKET_RECARGA_SEGUNDOS: float = 1800   # 1 resumo extra a cada 30 min
+
+    # worker de envio de e-mails (tabela email_outbox)
+    SMTP_POOL_SIZE: int = 2             # conexões SMTP autenticadas mantidas abertas
+    EMAIL_LOTE_MAX: int = 50
+    EMAIL_MAX_TENTATIVAS: int = 6
+    EMAIL_BACKOFF_SEGUNDOS: float = 30  # dobra a cada falha
+
+    # bcrypt
+    BCRYPT_ROUNDS: int = 12     # mudar o custo faz o rehash acontecer no próximo login
+    HASH_WORKERS: int = 4       # threads dedicadas ao bcrypt
+    HASH_FILA_MAX: int = 64     # acima disso, 429 (load shedding)
+
+    # autenticação (app/dependencies/auth.py)
+    AUTH_CACHE_SEGUNDOS: float = 10  # token_version em cache: revogação/remoção de usuário chega aos outros workers em até isso
     
     model_config = SettingsConfigDict(env_file=".env")
 
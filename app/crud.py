@@ -1,7 +1,12 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Date, Integer, case, cast, func, insert, select, text, update
+from sqlalchemy.orm import Session, joinedload, raiseload
 from . import models, schemas
 from app.core.security import hash_password
+from app.services import desafio_progresso, diario_rollup, gatilho_agenda, streaks
+from app.database import INSERT_POR_DIALETO
+from app.utils.paginacao import Paginacao
 from datetime import datetime , timedelta , timezone, date
+import json
 import random
 from fastapi import HTTPException
 
@@ -27,6 +32,28 @@ def _days_since(dt: datetime | None) -> int:
     # usar hoje em UTC para diferenças
     return max(0, (today_utc() - dt.date()).days)
 
+# chave do advisory lock que serializa as escritas no change log (Postgres)
+_LOCK_CHANGE_LOG_SITES = 0x5173_0001
+
+def _registrar_mudanca_site(db: Session, site: models.SiteBloqueado, acao: str):
+    """
+    Acrescenta uma linha no change log (na mesma transação da alteração).
+    O id da linha é a versão da blocklist, então as versões precisam ficar
+    visíveis em ordem: uma transação que pegasse o id 10 e commitasse depois
+    da que pegou o 11 seria pulada para sempre por quem já sincronizou o 11.
+    No Postgres o advisory lock (solto no commit/rollback) serializa quem
+    escreve no log; no SQLite a escrita já é serializada pelo próprio banco.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": _LOCK_CHANGE_LOG_SITES})
+    db.add(models.SiteBloqueadoMudanca(
+        site_id=site.id,
+        usuario_id=site.usuario_id,
+        acao=acao,
+        url=site.url if acao == "add" else None,
+        tipo=site.tipo if acao == "add" else None,
+    ))
+
 def create_site(db: Session, site: schemas.SiteBloqueadoCreate, usuario_id: int):
     db_site = models.SiteBloqueado(
         url=site.url,
@@ -34,12 +61,42 @@ def create_site(db: Session, site: schemas.SiteBloqueadoCreate, usuario_id: int)
         usuario_id=usuario_id
     )
     db.add(db_site)
+    db.flush()  # precisa do id para o change log
+    _registrar_mudanca_site(db, db_site, "add")
+    db.commit()
+    db.refresh(db_site)
+    return db_site
+
+def update_site(db: Session, db_site: models.SiteBloqueado, site: schemas.SiteBloqueadoCreate):
+    db_site.url = site.url
+    db_site.tipo = site.tipo
+    _registrar_mudanca_site(db, db_site, "add")  # "add" sobrescreve a versão anterior no cliente
     db.commit()
     db.refresh(db_site)
     return db_site
 
-def list_sites(db: Session, usuario_id: int):
-    return db.query(models.SiteBloqueado).filter(models.SiteBloqueado.usuario_id == usuario_id).all()
+def delete_site(db: Session, db_site: models.SiteBloqueado):
+    _registrar_mudanca_site(db, db_site, "remove")
+    db.delete(db_site)
+    db.commit()
+
+def get_blocklist_version(db: Session) -> int:
+    return db.query(func.max(models.SiteBloqueadoMudanca.id)).scalar() or 0
+
+def list_site_changes_since(db: Session, since: int, limit: int):
+    return (
+        db.query(models.SiteBloqueadoMudanca)
+        .filter(models.SiteBloqueadoMudanca.id > since)
+        .order_by(models.SiteBloqueadoMudanca.id)
+        .limit(limit)
+        .all()
+    )
+
+def list_sites(db: Session, usuario_id: int, pagina: Paginacao | None = None):
+    query = db.query(models.SiteBloqueado).filter(models.SiteBloqueado.usuario_id == usuario_id)
+    if pagina:
+        return pagina.aplicar(query, models.SiteBloqueado, models.SiteBloqueado.data_cadastro, schemas.SiteBloqueadoResponse)
+    return query.all()
 
 def get_site_by_id(db: Session, site_id: int):
     return db.query(models.SiteBloqueado).filter(models.SiteBloqueado.id == site_id).first()
@@ -55,6 +112,14 @@ def create_tentativa(db: Session, tentativa: schemas.TentativaAcessoCreate):
     db.refresh(db_tentativa)
     return db_tentativa
 
+def create_tentativas_bulk(db: Session, rows: list[dict]) -> int:
+    """Grava várias tentativas num único INSERT multi-linha."""
+    if not rows:
+        return 0
+    db.execute(insert(models.TentativaAcesso).values(rows))
+    db.commit()
+    return len(rows)
+
 # CRUD para Usuario
 def get_user_by_email(db: Session, email: str):
     return db.query(models.Usuario).filter(models.Usuario.email == email).first()
@@ -220,6 +285,7 @@ def create_baseline(db: Session, usuario_id: int, data: schemas.BaselineCreate)
         moeda=data.moeda or "BRL",
     )
     db.add(baseline)
+    invalidar_painel(db, usuario_id)
     db.commit()
     db.refresh(baseline)
     return baseline
@@ -229,13 +295,149 @@ def update_baseline(db: Session, baseline: models.UsuarioBaseline, data: schemas
         val = getattr(data, field, None)
         if val is not None:
             setattr(baseline, field, val)
+    invalidar_painel(db, baseline.usuario_id)
     db.commit()
     db.refresh(baseline)
     return baseline
 
 
+# ----------------- Painel (snapshot de streak/métricas/histórico) -----------------
+
+def invalidar_painel(db: Session, *usuario_ids: int) -> None:
+    """
+    Invalida o snapshot do painel (sem commit: entra na transação da alteração).
+    Incrementa a versão em vez de apagar a linha: um obter() que leu o estado
+    antigo e ainda vai gravar perde o UPDATE condicional de salvar_painel_snapshot.
+    """
+    if not usuario_ids:
+        return
+    P = models.UsuarioPainelSnapshot
+    hoje = today_utc()
+    insert_dialeto = INSERT_POR_DIALETO[db.get_bind().dialect.name]
+    db.execute(
+        insert_dialeto(P)
+        .values([{"usuario_id": u, "dia": hoje, "dados": "", "versao": 1} for u in sorted(usuario_ids)])
+        .on_conflict_do_update(index_elements=[P.usuario_id], set_={"versao": P.versao + 1, "dados": ""})
+    )
+
+def get_painel_snapshot(db: Session, usuario_id: int):
+    """(versao, dia, dados) do snapshot; dados vazio = invalidado. None = nunca calculado."""
+    P = models.UsuarioPainelSnapshot
+    return db.query(P.versao, P.dia, P.dados).filter(P.usuario_id == usuario_id).first()
+
+def salvar_painel_snapshot(db: Session, usuario_id: int, dia: date, dados: str, versao: int | None) -> None:
+    """
+    Grava o snapshot calculado depois de ler `versao` (None = não havia linha).
+    Se uma invalidação entrou no meio, a versão mudou e nada é gravado.
+    """
+    P = models.UsuarioPainelSnapshot
+    if versao is None:
+        insert_dialeto = INSERT_POR_DIALETO[db.get_bind().dialect.name]
+        db.execute(
+            insert_dialeto(P)
+            .values(usuario_id=usuario_id, dia=dia, dados=dados, versao=0)
+            .on_conflict_do_nothing(index_elements=[P.usuario_id])
+        )
+    else:
+        db.execute(
+            update(P)
+            .where(P.usuario_id == usuario_id, P.versao == versao)
+            .values(dia=dia, dados=dados)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
 # ----------------- Streak / Check-in -----------------
 
+def registrar_checkin(db: Session, usuario_id: int, dia: date) -> None:
+    """Grava o check-in do dia na tabela checkins; repetir é no-op (sem commit)."""
+    insert_dialeto = INSERT_POR_DIALETO[db.get_bind().dialect.name]
+    db.execute(
+        insert_dialeto(models.Checkin)
+        .values(usuario_id=usuario_id, dia=dia)
+        .on_conflict_do_nothing(index_elements=["usuario_id", "dia"])
+    )
+
+def list_checkin_dias(db: Session, usuario_id: int, desde: date | None = None) -> list[date]:
+    query = db.query(models.Checkin.dia).filter(models.Checkin.usuario_id == usuario_id)
+    if desde is not None:
+        query = query.filter(models.Checkin.dia >= desde)
+    return [d for (d,) in query.order_by(models.Checkin.dia)]
+
+def recalcular_streaks(db: Session, lote_usuarios: int = 10_000) -> int:
+    """
+    Recalcula last_checkin_date e best_streak_days de todos os usuários a partir
+    de checkins: fatias de usuários por keyset, cada uma com um cálculo vetorizado
+    e um UPDATE em lote. Retorna quantos usuários tinham check-ins.
+    Manutenção (script recalcular_streaks.py): conserta as colunas depois de
+    importar/corrigir check-ins direto na tabela.
+    """
+    C = models.Checkin
+    total, ultimo_id = 0, 0
+    while True:
+        usuarios = (
+            db.query(models.Usuario.id, models.Usuario.streak_started_at, models.Usuario.best_streak_days)
+            .filter(models.Usuario.id > ultimo_id)
+            .order_by(models.Usuario.id)
+            .limit(lote_usuarios)
+            .all()
+        )
+        if not usuarios:
+            return total
+        primeiro, ultimo_id = usuarios[0].id, usuarios[-1].id
+        linhas = (
+            db.query(C.usuario_id, C.dia)
+            .filter(C.usuario_id >= primeiro, C.usuario_id <= ultimo_id)
+            .order_by(C.usuario_id, C.dia)
+            .all()
+        )
+        if not linhas:
+            continue
+        usuario_ids, dias = zip(*linhas)
+        inicios = {u.id: u.streak_started_at.date() if u.streak_started_at else None for u in usuarios}
+        melhores = {u.id: u.best_streak_days or 0 for u in usuarios}
+        calculadas = streaks.calcular_em_lote(usuario_ids, dias, inicios)
+        # maior sequência do log; o valor guardado cobre streaks anteriores ao log
+        db.execute(
+            update(models.Usuario),
+            [
+                {
+                    "id": c.usuario_id,
+                    "last_checkin_date": c.ultimo_checkin,
+                    "best_streak_days": max(c.melhor, melhores[c.usuario_id]),
+                }
+                for c in calculadas
+            ],
+        )
+        invalidar_painel(db, *(c.usuario_id for c in calculadas))
+        db.commit()
+        total += len(calculadas)
+
+def reconstruir_checkins(db: Session) -> int:
+    """
+    Backfill de bases anteriores à tabela checkins: cada streak aberta vira um
+    check-in por dia entre streak_started_at e last_checkin_date.
+    """
+    if db.query(models.Checkin.id).first() is not None:
+        return 0
+    usuarios = (
+        db.query(models.Usuario.id, models.Usuario.streak_started_at, models.Usuario.last_checkin_date)
+        .filter(models.Usuario.last_checkin_date.isnot(None))
+        .all()
+    )
+    valores = []
+    for usuario_id, inicio, ultimo in usuarios:
+        primeiro = inicio.date() if inicio and inicio.date() <= ultimo else ultimo
+        valores.extend(
+            {"usuario_id": usuario_id, "dia": primeiro + timedelta(days=i)}
+            for i in range((ultimo - primeiro).days + 1)
+        )
+    if valores:
+        db.execute(insert(models.Checkin), valores)
+        db.commit()
+    return len(valores)
+
 def get_current_streak_days(usuario: models.Usuario) -> int:
     """
     Dias consecutivos de streak, contando de streak_started_at ATÉ o último dia com check-in (inclusivo).
@@ -251,63 +453,173 @@ def get_current_streak_days(usuario: models.Usuario) -> int:
     days = (last - start).days + 1
     return max(0, days)
 
-def start_streak(db: Session, usuario: models.Usuario) -> models.Usuario:
-    if not usuario.streak_started_at:
-        usuario.streak_started_at = datetime.now(tz=timezone.utc)
-        db.add(usuario)
+# Transições de streak: cada uma é um único UPDATE ... RETURNING condicional, então
+# dois check-ins simultâneos (celular + relógio) não conseguem ler o mesmo estado
+# antigo: o segundo espera o lock de linha do primeiro e já vê o dia gravado.
+_COLUNAS_STREAK = (
+    models.Usuario.id,
+    models.Usuario.streak_started_at,
+    models.Usuario.last_checkin_date,
+    models.Usuario.best_streak_days,
+    models.Usuario.last_streak_days,
+)
+
+def _dias_streak_sql(dialeto: str):
+    """Mesma conta de get_current_streak_days, no banco (NULL em qualquer coluna -> 0)."""
+    U = models.Usuario
+    if dialeto == "sqlite":
+        dias = cast(func.julianday(U.last_checkin_date) - func.julianday(func.date(U.streak_started_at)), Integer) + 1
+    else:
+        dias = U.last_checkin_date - cast(U.streak_started_at, Date) + 1
+    return case((dias > 0, dias), else_=0)
+
+def _transicao_streak(db: Session, usuario_id: int, stmt):
+    """Executa o UPDATE; sem linha afetada, devolve o estado atual (None = usuário não existe)."""
+    linha = db.execute(stmt.returning(*_COLUNAS_STREAK).execution_options(synchronize_session=False)).first()
+    if linha is None:
+        return db.execute(select(*_COLUNAS_STREAK).where(models.Usuario.id == usuario_id)).first(), False
+    return linha, True
+
+def start_streak(db: Session, usuario_id: int):
+    """Inicia a streak se não houver uma aberta. Devolve as colunas de streak (None = usuário não existe)."""
+    linha, alterou = _transicao_streak(
+        db,
+        usuario_id,
+        update(models.Usuario)
+        .where(models.Usuario.id == usuario_id, models.Usuario.streak_started_at.is_(None))
+        .values(streak_started_at=datetime.now(tz=timezone.utc)),
+    )
+    if alterou:
+        invalidar_painel(db, usuario_id)
         db.commit()
-        db.refresh(usuario)
-    return usuario
-
-def reset_streak(db: Session, usuario: models.Usuario) -> models.Usuario:
-    current = get_current_streak_days(usuario)
-    if current > 0:
-        usuario.last_streak_days = current
-        if current > (usuario.best_streak_days or 0):
-            usuario.best_streak_days = current
-    usuario.streak_started_at = None
-    db.add(usuario)
-    db.commit()
-    db.refresh(usuario)
-    return usuario
+    return linha
+
+def reset_streak(db: Session, usuario_id: int):
+    """Fecha a streak aberta (atualiza last/best) e zera o início, num statement só."""
+    U = models.Usuario
+    atual = _dias_streak_sql(db.get_bind().dialect.name)
+    linha, alterou = _transicao_streak(
+        db,
+        usuario_id,
+        update(U)
+        .where(U.id == usuario_id)
+        .values(
+            last_streak_days=case((atual > 0, atual), else_=U.last_streak_days),
+            best_streak_days=case((atual > U.best_streak_days, atual), else_=U.best_streak_days),
+            streak_started_at=None,
+        ),
+    )
+    if alterou:
+        db.execute(desafio_progresso.streak_zerada([usuario_id]))
+        invalidar_painel(db, usuario_id)
+        db.commit()
+    return linha
 
 def has_checkin_today(usuario: models.Usuario) -> bool:
     return bool(usuario.last_checkin_date == today_utc())
 
-def do_daily_checkin(db: Session, usuario: models.Usuario) -> int:
+def do_daily_checkin(db: Session, usuario_id: int):
     """
-    Registra o check-in do dia.
+    Registra o check-in do dia num UPDATE condicional (WHERE last_checkin_date <> hoje).
     - Se ficou 2+ dias sem check-in, fecha a streak anterior (atualiza best/last) e reinicia.
-    - Atualiza last_checkin_date e retorna a streak atual.
+    - Sem streak aberta, começa uma agora.
+    Devolve as colunas de streak (None = usuário não existe); use get_current_streak_days.
     """
+    U = models.Usuario
     today = today_utc()
+    agora = datetime.now(tz=timezone.utc)
+    atual = _dias_streak_sql(db.get_bind().dialect.name)
+    # no SET todas as colunas à direita são os valores antigos da linha
+    fecha = U.streak_started_at.isnot(None) & (U.last_checkin_date < today - timedelta(days=1))
+    linha, alterou = _transicao_streak(
+        db,
+        usuario_id,
+        update(U)
+        .where(U.id == usuario_id, (U.last_checkin_date.is_(None)) | (U.last_checkin_date != today))
+        .values(
+            last_streak_days=case((fecha & (atual > 0), atual), else_=U.last_streak_days),
+            best_streak_days=case((fecha & (atual > U.best_streak_days), atual), else_=U.best_streak_days),
+            streak_started_at=case((U.streak_started_at.is_(None) | fecha, agora), else_=U.streak_started_at),
+            last_checkin_date=today,
+        ),
+    )
+    if alterou:
+        registrar_checkin(db, usuario_id, today)
+        db.execute(desafio_progresso.no_checkin(usuario_id, get_current_streak_days(linha)))
+        invalidar_painel(db, usuario_id)
+        db.commit()
+    return linha
 
-    # já fez hoje → não muda nada
-    if usuario.last_checkin_date == today:
-        return get_current_streak_days(usuario)
+# --- expiração noturna de streaks ---
 
-    # primeira vez
-    if not usuario.streak_started_at:
-        usuario.streak_started_at = datetime.now(tz=timezone.utc)
-    else:
-        # dias desde o último check-in
-        if usuario.last_checkin_date and (today - usuario.last_checkin_date).days > 1:
-            # fechamos a streak anterior
-            current = get_current_streak_days(usuario)
-            if current > 0:
-                usuario.last_streak_days = current
-                if current > (usuario.best_streak_days or 0):
-                    usuario.best_streak_days = current
-            # reinicia a streak a partir de hoje
-            usuario.streak_started_at = datetime.now(tz=timezone.utc)
+def get_progresso_tarefa(db: Session, nome: str) -> models.TarefaProgresso | None:
+    return db.get(models.TarefaProgresso, nome)
 
-    usuario.last_checkin_date = today
+def proximo_lote_usuarios(db: Session, desde_id: int, lote: int) -> tuple[int, int] | None:
+    """(maior id, quantidade) dos próximos `lote` usuários depois de `desde_id`; None = acabou."""
+    ids = (
+        select(models.Usuario.id)
+        .where(models.Usuario.id > desde_id)
+        .order_by(models.Usuario.id)
+        .limit(lote)
+        .subquery()
+    )
+    ate, quantidade = db.execute(select(func.max(ids.c.id), func.count(ids.c.id))).one()
+    return (ate, quantidade) if quantidade else None
 
-    db.add(usuario)
+def expirar_streaks_lote(
+    db: Session, nome_tarefa: str, referencia: date, desde_id: int, ate_id: int
+) -> int:
+    """
+    Fecha, num UPDATE só, as streaks de usuarios.id em (desde_id, ate_id] cujo
+    último check-in é anterior a ontem: last/best atualizados e início zerado,
+    como o check-in faria ao voltar. Transições, snapshots e o cursor da tarefa
+    entram na mesma transação, então o lote é aplicado inteiro ou não é.
+    """
+    U = models.Usuario
+    ontem = referencia - timedelta(days=1)
+    atual = _dias_streak_sql(db.get_bind().dialect.name)
+    fechadas = db.execute(
+        update(U)
+        .where(
+            U.id > desde_id,
+            U.id <= ate_id,
+            U.streak_started_at.isnot(None),
+            U.last_checkin_date < ontem,
+            atual > 0,
+        )
+        .values(
+            last_streak_days=atual,
+            best_streak_days=case((atual > U.best_streak_days, atual), else_=U.best_streak_days),
+            streak_started_at=None,
+        )
+        .returning(U.id, U.last_streak_days, U.last_checkin_date)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if fechadas:
+        db.execute(
+            insert(models.StreakTransicao),
+            [
+                {
+                    "usuario_id": usuario_id,
+                    "motivo": "expirada",
+                    "dias": dias,
+                    "inicio": fim - timedelta(days=dias - 1),
+                    "fim": fim,
+                }
+                for usuario_id, dias, fim in fechadas
+            ],
+        )
+        ids = [f.id for f in fechadas]
+        db.execute(desafio_progresso.streak_zerada(ids))
+        invalidar_painel(db, *ids)
+    db.merge(models.TarefaProgresso(nome=nome_tarefa, referencia=referencia, cursor=ate_id, concluida=False))
     db.commit()
-    db.refresh(usuario)
+    return len(fechadas)
 
-    return get_current_streak_days(usuario)
+def concluir_tarefa(db: Session, nome: str, referencia: date, cursor: int) -> None:
+    db.merge(models.TarefaProgresso(nome=nome, referencia=referencia, cursor=cursor, concluida=True))
+    db.commit()
 
 def list_active_templates(db: Session, now: datetime | None = None):
     q = db.query(models.ChallengeTemplate)
@@ -320,6 +632,18 @@ def list_active_templates(db: Session, now: datetime | None = None):
     return q.order_by(models.ChallengeTemplate.created_at.desc()).all()
 
 
+def list_all_templates(db: Session) -> list[dict]:
+    """Todos os templates (inclusive futuros/expirados), já na ordem do catálogo."""
+    T = models.ChallengeTemplate
+    campos = [getattr(T, c) for c in schemas.ChallengeTemplateOut.model_fields]
+    return [r._asdict() for r in db.query(*campos).order_by(T.created_at.desc())]
+
+def get_catalog_assinatura(db: Session) -> tuple:
+    """Muda sempre que um template é criado ou alterado: (quantidade, último updated_at)."""
+    T = models.ChallengeTemplate
+    return tuple(db.query(func.count(T.id), func.max(T.updated_at)).one())
+
+
 def create_template(db: Session, payload: schemas.ChallengeTemplateCreate):
     t = models.ChallengeTemplate(**payload.model_dump())
     db.add(t)
@@ -330,26 +654,61 @@ def create_template(db: Session, payload: schemas.ChallengeTemplateCreate):
 
 # --- User challenges ---
 
-def list_my_challenges(db: Session, user_id: int):
-    return (
-        db.query(models.UserChallenge)
-        .filter(models.UserChallenge.user_id == user_id)
-        .order_by(models.UserChallenge.created_at.desc())
-        .all()
+# Carregamento do relacionamento template por tipo de acesso. Nenhum schema de
+# saída usa o template, então listas e ciclo de vida bloqueiam o lazy load
+# (raiseload: acesso acidental vira erro em vez de uma query por linha);
+# quem precisar dele pede "com_template" e recebe tudo no mesmo SELECT.
+CARREGAMENTO_DESAFIOS = {
+    "lista": (raiseload(models.UserChallenge.template),),
+    "ciclo": (raiseload(models.UserChallenge.template),),
+    "com_template": (joinedload(models.UserChallenge.template),),
+}
+
+def _query_desafios(db: Session, uso: str):
+    return db.query(models.UserChallenge).options(*CARREGAMENTO_DESAFIOS[uso])
+
+def _get_desafio(db: Session, user_id: int, challenge_id: int, uso: str = "ciclo") -> models.UserChallenge:
+    uc = (
+        _query_desafios(db, uso)
+        .filter(models.UserChallenge.id == challenge_id, models.UserChallenge.user_id == user_id)
+        .first()
     )
+    if not uc:
+        raise HTTPException(status_code=404, detail="Challenge não encontrado")
+    return uc
+
+def get_template_disponivel(db: Session, template_id: int, now: datetime | None = None) -> models.ChallengeTemplate:
+    """Template existente e dentro da janela starts_at/expires_at (404/400 caso contrário)."""
+    tpl = db.get(models.ChallengeTemplate, template_id)
+    if not tpl:
+        raise HTTPException(status_code=404, detail="Template não encontrado")
+    now = now or datetime.now(timezone.utc)
+    inicio, fim = tpl.starts_at, tpl.expires_at
+    # SQLite devolve datetimes sem fuso
+    if inicio is not None and inicio.tzinfo is None:
+        inicio = inicio.replace(tzinfo=timezone.utc)
+    if fim is not None and fim.tzinfo is None:
+        fim = fim.replace(tzinfo=timezone.utc)
+    if (inicio and inicio > now) or (fim and fim < now):
+        raise HTTPException(status_code=400, detail="Template indisponível/expirado")
+    return tpl
+
+def list_my_challenges(db: Session, user_id: int, pagina: Paginacao | None = None):
+    query = _query_desafios(db, "lista").filter(models.UserChallenge.user_id == user_id)
+    if pagina:
+        return pagina.aplicar(query, models.UserChallenge, models.UserChallenge.created_at, schemas.UserChallengeOut)
+    return query.order_by(models.UserChallenge.created_at.desc()).all()
 
 
 # -------- Criação --------
 def create_user_challenge(db: Session, user_id: int, payload: schemas.UserChallengeCreate):
-    # via template
+    # via template (uma leitura só: valida disponibilidade e copia os campos)
     if payload.template_id:
-        tpl = db.query(models.ChallengeTemplate).get(payload.template_id)
-        if not tpl:
-            raise HTTPException(status_code=404, detail="Template inexistente")
+        tpl = get_template_disponivel(db, payload.template_id)
 
         uc = models.UserChallenge(
             user_id=user_id,
-            template_id=tpl.id,
+            template=tpl,
             title=tpl.title,
             description=tpl.description,
             target_type=tpl.target_type,
@@ -379,13 +738,7 @@ def create_user_challenge(db: Session, user_id: int, payload: schemas.UserChalle
 
 # -------- Start (grava baselines) --------
 def start_user_challenge(db: Session, user_id: int, challenge_id: int, payload: schemas.UserChallengeStart | None):
-    uc = (
-        db.query(models.UserChallenge)
-        .filter(models.UserChallenge.id == challenge_id, models.UserChallenge.user_id == user_id)
-        .first()
-    )
-    if not uc:
-        raise HTTPException(status_code=404, detail="Challenge não encontrado")
+    uc = _get_desafio(db, user_id, challenge_id)
 
     if uc.status != "draft":
         raise HTTPException(status_code=400, detail="Só é possível iniciar desafios em rascunho")
@@ -395,8 +748,20 @@ def start_user_challenge(db: Session, user_id: int, challenge_id: int, payload:
         uc.baseline_time_min = payload.baseline_time_min
         uc.baseline_streak_days = payload.baseline_streak_days
 
+    # baselines não informados saem do perfil do usuário (base do cálculo de progresso)
+    baseline = get_baseline_by_user(db, user_id)
+    if uc.baseline_money is None and baseline and baseline.gasto_medio_dia is not None:
+        uc.baseline_money = int(round(float(baseline.gasto_medio_dia)))
+    if uc.baseline_time_min is None and baseline:
+        uc.baseline_time_min = baseline.tempo_diario_minutos
+    if uc.baseline_streak_days is None:
+        usuario = db.get(models.Usuario, user_id)
+        uc.baseline_streak_days = get_current_streak_days(usuario) if usuario else 0
+
     uc.status = "active"
     uc.started_at = datetime.now(timezone.utc)
+    uc.progress_value = 0
+    uc.dias_checkin = 0
 
     db.commit()
     db.refresh(uc)
@@ -405,13 +770,7 @@ def start_user_challenge(db: Session, user_id: int, challenge_id: int, payload:
 
 # -------- Completar / Abandonar --------
 def complete_user_challenge(db: Session, user_id: int, challenge_id: int):
-    uc = (
-        db.query(models.UserChallenge)
-        .filter(models.UserChallenge.id == challenge_id, models.UserChallenge.user_id == user_id)
-        .first()
-    )
-    if not uc:
-        raise HTTPException(status_code=404, detail="Challenge não encontrado")
+    uc = _get_desafio(db, user_id, challenge_id)
     uc.status = "completed"
     uc.completed_at = datetime.now(timezone.utc)
     db.commit()
@@ -420,18 +779,268 @@ def complete_user_challenge(db: Session, user_id: int, challenge_id: int):
 
 
 def abandon_user_challenge(db: Session, user_id: int, challenge_id: int):
-    uc = (
-        db.query(models.UserChallenge)
-        .filter(models.UserChallenge.id == challenge_id, models.UserChallenge.user_id == user_id)
-        .first()
-    )
-    if not uc:
-        raise HTTPException(status_code=404, detail="Challenge não encontrado")
+    uc = _get_desafio(db, user_id, challenge_id)
     uc.status = "abandoned"
     uc.abandoned_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(uc)
     return uc
 
-def list_catalog(db: Session):
-    return list_active_templates(db, datetime.now(timezone.utc))
\ No newline at end of file
+def recalcular_progresso_desafios(db: Session, usuario_id: int | None = None) -> int:
+    """
+    Recalcula (e conclui, se for o caso) os desafios ativos de um usuário ou de todos. Retorna linhas afetadas.
+    Roda no lifespan quando a migração acabou de criar progress_value e no
+    script recalcular_streaks.py; no dia a dia o progresso anda pelos eventos de streak.
+    """
+    dialeto = db.get_bind().dialect.name
+    resultado = db.execute(desafio_progresso.recalcular(dialeto, _dias_streak_sql(dialeto), usuario_id))
+    db.commit()
+    return resultado.rowcount
+
+
+# ----------------- Outbox de e-mails -----------------
+
+def enqueue_email(db: Session, destinatarios: list[str], assunto: str, corpo: str) -> models.EmailOutbox:
+    item = models.EmailOutbox(
+        destinatarios=json.dumps(destinatarios),
+        assunto=assunto,
+        corpo=corpo,
+    )
+    db.add(item)
+    db.commit()
+    return item
+
+def claim_emails(db: Session, limit: int, lease_s: int = 300) -> list[dict]:
+    """
+    Reserva até `limit` e-mails prontos para envio. Itens "enviando" cujo lease
+    venceu (worker que caiu) voltam a ser elegíveis. A reserva é um UPDATE
+    condicional que repete o filtro de elegibilidade: se outro worker reservou
+    o item entre o SELECT e o UPDATE, o lease já está no futuro e a linha não
+    volta no RETURNING. SKIP LOCKED (só no Postgres) apenas reduz a disputa.
+    """
+    E = models.EmailOutbox
+    agora = datetime.now(timezone.utc)
+    elegivel = (E.status.in_(("pendente", "enviando")), E.proxima_tentativa_em <= agora)
+    ids = [
+        i for (i,) in db.query(E.id)
+        .filter(*elegivel)
+        .order_by(E.proxima_tentativa_em)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ]
+    if not ids:
+        db.commit()
+        return []
+    linhas = db.execute(
+        update(E)
+        .where(E.id.in_(ids), *elegivel)
+        .values(status="enviando", proxima_tentativa_em=agora + timedelta(seconds=lease_s))
+        .returning(E.id, E.destinatarios, E.assunto, E.corpo, E.tentativas)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return [
+        {
+            "id": r.id,
+            "destinatarios": json.loads(r.destinatarios),
+            "assunto": r.assunto,
+            "corpo": r.corpo,
+            "tentativas": r.tentativas,
+        }
+        for r in linhas
+    ]
+
+def mark_emails_sent(db: Session, ids: list[int]) -> None:
+    if not ids:
+        return
+    db.query(models.EmailOutbox).filter(models.EmailOutbox.id.in_(ids)).update(
+        {
+            models.EmailOutbox.status: "enviado",
+            models.EmailOutbox.enviado_em: datetime.now(timezone.utc),
+            models.EmailOutbox.ultimo_erro: None,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+def mark_email_failed(db: Session, email_id: int, erro: str, proxima: datetime | None) -> None:
+    """proxima=None significa desistir (status 'falhou')."""
+    db.query(models.EmailOutbox).filter(models.EmailOutbox.id == email_id).update(
+        {
+            models.EmailOutbox.status: "pendente" if proxima else "falhou",
+            models.EmailOutbox.tentativas: models.EmailOutbox.tentativas + 1,
+            models.EmailOutbox.proxima_tentativa_em: proxima or datetime.now(timezone.utc),
+            models.EmailOutbox.ultimo_erro: erro[:2000],
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+# ----------------- Análise de diários em lote -----------------
+
+def claim_diarios_pendentes(db: Session, limit: int, lease_s: int = 300) -> list[dict]:
+    """Reserva diários com análise pendente (mesmo UPDATE condicional com lease de claim_emails)."""
+    D = models.DiarioEmocional
+    agora = datetime.now(timezone.utc)
+    elegivel = (D.analise_status.in_(("pendente", "processando")), D.analise_proxima_em <= agora)
+    ids = [
+        i for (i,) in db.query(D.id)
+        .filter(*elegivel)
+        .order_by(D.analise_proxima_em)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ]
+    if not ids:
+        db.commit()
+        return []
+    linhas = db.execute(
+        update(D)
+        .where(D.id.in_(ids), *elegivel)
+        .values(analise_status="processando", analise_proxima_em=agora + timedelta(seconds=lease_s))
+        .returning(D.id, D.texto, D.analise_tentativas)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return [{"id": r.id, "texto": r.texto, "tentativas": r.analise_tentativas} for r in linhas]
+
+def concluir_analise_diario(db: Session, diario_id: int, sentimento: str, resposta: str) -> None:
+    atual = (
+        db.query(models.DiarioEmocional.usuario_id, models.DiarioEmocional.data, models.DiarioEmocional.sentimento)
+        .filter(models.DiarioEmocional.id == diario_id)
+        .first()
+    )
+    if not atual:
+        return
+    db.query(models.DiarioEmocional).filter(models.DiarioEmocional.id == diario_id).update(
+        {
+            models.DiarioEmocional.sentimento: sentimento,
+            models.DiarioEmocional.resposta: resposta,
+            models.DiarioEmocional.analise_status: "concluida",
+        },
+        synchronize_session=False,
+    )
+    if atual.sentimento != sentimento:
+        # troca o sentimento provisório pelo da IA também no rollup
+        dialeto = db.get_bind().dialect.name
+        for stmt in diario_rollup.comandos(dialeto, atual.usuario_id, atual.data, atual.sentimento, -1):
+            db.execute(stmt)
+        for stmt in diario_rollup.comandos(dialeto, atual.usuario_id, atual.data, sentimento, 1):
+            db.execute(stmt)
+    db.commit()
+
+def falhar_analise_diario(db: Session, diario_id: int, proxima: datetime | None) -> None:
+    """proxima=None: desiste e mantém o sentimento provisório."""
+    db.query(models.DiarioEmocional).filter(models.DiarioEmocional.id == diario_id).update(
+        {
+            models.DiarioEmocional.analise_status: "pendente" if proxima else "falhou",
+            models.DiarioEmocional.analise_tentativas: models.DiarioEmocional.analise_tentativas + 1,
+            models.DiarioEmocional.analise_proxima_em: proxima,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+# ----------------- Rollup de sentimentos do diário -----------------
+
+def reconstruir_rollup_diario(db: Session, so_se_vazio: bool = True) -> int:
+    """
+    Recalcula diario_sentimento_rollup a partir de diario_emocional (backfill
+    de bases antigas). Agrupa por dia no SQL; a semana sai do dia em Python.
+    """
+    R = models.DiarioSentimentoRollup
+    if so_se_vazio and db.query(R.id).first() is not None:
+        return 0
+    dia = func.date(models.DiarioEmocional.data)
+    linhas = (
+        db.query(models.DiarioEmocional.usuario_id, dia, models.DiarioEmocional.sentimento, func.count())
+        .group_by(models.DiarioEmocional.usuario_id, dia, models.DiarioEmocional.sentimento)
+        .all()
+    )
+    valores = diario_rollup.agregar(linhas)
+    db.query(R).delete(synchronize_session=False)
+    if valores:
+        db.execute(insert(R), valores)
+    db.commit()
+    return len(valores)
+
+
+# ----------------- Agenda de gatilhos -----------------
+
+def sincronizar_intervalos_gatilho(db: Session, gatilho: models.Gatilho, fuso_horario: str) -> None:
+    """Recalcula máscara e intervalos do gatilho (sem commit). Inativo fica sem intervalos."""
+    dias = [int(x) for x in (gatilho.dias_da_semana or "").split(",") if x != ""]
+    gatilho.dias_mask = gatilho_agenda.mascara(dias)
+    gatilho.intervalos = [
+        models.GatilhoIntervalo(usuario_id=gatilho.usuario_id, fuso_horario=fuso_horario, inicio_min=a, fim_min=b)
+        for a, b in gatilho_agenda.intervalos(gatilho.dias_mask, gatilho.hora_inicio, gatilho.hora_fim)
+    ] if gatilho.ativo else []
+
+def get_fuso_horario(db: Session, usuario_id: int) -> str:
+    fuso = db.query(models.Usuario.fuso_horario).filter(models.Usuario.id == usuario_id).scalar()
+    return fuso or gatilho_agenda.FUSO_PADRAO
+
+def atualizar_fuso_horario(db: Session, usuario_id: int, fuso_horario: str) -> None:
+    db.query(models.Usuario).filter(models.Usuario.id == usuario_id).update(
+        {models.Usuario.fuso_horario: fuso_horario}, synchronize_session=False
+    )
+    db.query(models.GatilhoIntervalo).filter(models.GatilhoIntervalo.usuario_id == usuario_id).update(
+        {models.GatilhoIntervalo.fuso_horario: fuso_horario}, synchronize_session=False
+    )
+    # o agendador de avisos recalcula os horários dos gatilhos alterados
+    db.query(models.Gatilho).filter(models.Gatilho.usuario_id == usuario_id).update(
+        {models.Gatilho.atualizado_em: datetime.now(timezone.utc)}, synchronize_session=False
+    )
+    db.commit()
+
+def gatilhos_ativos_em(db: Session, usuario_id: int, momento: datetime) -> list[models.Gatilho]:
+    """Gatilhos do usuário cuja janela contém `momento` (range query no índice usuario/inicio)."""
+    m = gatilho_agenda.minuto_da_semana(momento, get_fuso_horario(db, usuario_id))
+    I = models.GatilhoIntervalo
+    return (
+        db.query(models.Gatilho)
+        .join(I, I.gatilho_id == models.Gatilho.id)
+        .filter(
+            I.usuario_id == usuario_id,
+            I.inicio_min <= m,
+            I.inicio_min > m - gatilho_agenda.DURACAO_MAX,
+            I.fim_min > m,
+        )
+        .all()
+    )
+
+def reconstruir_agenda_gatilhos(db: Session) -> int:
+    """Backfill de dias_mask/intervalos para gatilhos criados antes da agenda."""
+    gatilhos = db.query(models.Gatilho).filter(models.Gatilho.dias_mask.is_(None)).all()
+    if not gatilhos:
+        return 0
+    fusos = dict(db.query(models.Usuario.id, models.Usuario.fuso_horario))
+    for g in gatilhos:
+        sincronizar_intervalos_gatilho(db, g, fusos.get(g.usuario_id) or gatilho_agenda.FUSO_PADRAO)
+    db.commit()
+    return len(gatilhos)
+
+def list_agenda_gatilhos(db: Session, alterados_desde: datetime | None = None) -> list[dict]:
+    """Dados para o agendador de avisos: todos os gatilhos, ou só os alterados desde um instante."""
+    query = db.query(
+        models.Gatilho.id,
+        models.Gatilho.usuario_id,
+        models.Gatilho.ativo,
+        models.Gatilho.dias_mask,
+        models.Gatilho.hora_inicio,
+        models.Gatilho.atualizado_em,
+        models.Usuario.fuso_horario,
+    ).join(models.Usuario, models.Usuario.id == models.Gatilho.usuario_id)
+    if alterados_desde is not None:
+        query = query.filter(models.Gatilho.atualizado_em > alterados_desde)
+    return [r._asdict() for r in query]
+
+def get_gatilho_para_aviso(db: Session, gatilho_id: int):
+    """(nome do gatilho, hora_inicio, ativo, nome e e-mail do usuário) ou None se foi apagado."""
+    return (
+        db.query(models.Gatilho.nome, models.Gatilho.hora_inicio, models.Gatilho.ativo, models.Usuario.nome.label("usuario_nome"), models.Usuario.email)
+        .join(models.Usuario, models.Usuario.id == models.Gatilho.usuario_id)
+        .filter(models.Gatilho.id == gatilho_id)
+        .first()
+    )
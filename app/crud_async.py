@@ -0,0 +1,155 @@
+"""
+Versões async (AsyncSession) das funções de crud.py usadas pelas rotas `async def`.
+Mesmos nomes e parâmetros; a diferença é que precisam de `await`.
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .crud import _generate_6digit_code
+from app.services import diario_rollup
+
+
+async def get_user_by_id(db: AsyncSession, usuario_id: int) -> models.Usuario | None:
+    return await db.get(models.Usuario, usuario_id)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> models.Usuario | None:
+    result = await db.execute(select(models.Usuario).where(models.Usuario.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, senha_hash: str) -> models.Usuario:
+    """Como crud.create_user, mas recebe a senha já com hash (feito no password_hasher)."""
+    db_user = models.Usuario(
+        nome=user.nome,
+        email=user.email.lower().strip(),
+        senha=senha_hash,
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def create_tentativa(db: AsyncSession, tentativa: schemas.TentativaAcessoCreate):
+    db_tentativa = models.TentativaAcesso(
+        site_id=tentativa.site_id,
+        usuario_id=tentativa.usuario_id
+    )
+    db.add(db_tentativa)
+    await db.commit()
+    await db.refresh(db_tentativa)
+    return db_tentativa
+
+async def validar_tentativas(db: AsyncSession, rows: list[dict]) -> list[dict]:
+    """
+    Erros (formato do 422 do FastAPI) das linhas com site_id ou usuario_id
+    inexistente. Duas consultas por lote, pelos ids distintos.
+    """
+    sites = {r["site_id"] for r in rows}
+    usuarios = {r["usuario_id"] for r in rows}
+    sites_ok = set((await db.execute(select(models.SiteBloqueado.id).where(models.SiteBloqueado.id.in_(sites)))).scalars())
+    usuarios_ok = set((await db.execute(select(models.Usuario.id).where(models.Usuario.id.in_(usuarios)))).scalars())
+    erros = []
+    for i, r in enumerate(rows):
+        if r["site_id"] not in sites_ok:
+            erros.append({"loc": ["body", "tentativas", i, "site_id"], "msg": "Site não encontrado", "type": "value_error"})
+        if r["usuario_id"] not in usuarios_ok:
+            erros.append({"loc": ["body", "tentativas", i, "usuario_id"], "msg": "Usuário não encontrado", "type": "value_error"})
+    return erros
+
+async def list_contatos_emergencia(db: AsyncSession, usuario_id: int):
+    result = await db.execute(
+        select(models.EmergenciaContato).where(models.EmergenciaContato.usuario_id == usuario_id)
+    )
+    return result.scalars().all()
+
+async def create_email_verification_code(db: AsyncSession, user_id: int, minutes_valid: int = 15) -> models.EmailVerificationCode:
+    code = _generate_6digit_code()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=minutes_valid)
+
+    # invalida códigos anteriores não usados
+    await db.execute(
+        update(models.EmailVerificationCode)
+        .where(
+            models.EmailVerificationCode.user_id == user_id,
+            models.EmailVerificationCode.used == False,
+        )
+        .values(used=True)
+    )
+
+    record = models.EmailVerificationCode(
+        user_id=user_id,
+        code=code,
+        expires_at=expires_at,
+        used=False,
+    )
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    return record
+
+async def create_password_reset_code(db: AsyncSession, user_id: int, minutes_valid: int = 15) -> models.PasswordResetCode:
+    code = _generate_6digit_code()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=minutes_valid)
+
+    # invalida códigos anteriores
+    await db.execute(
+        update(models.PasswordResetCode)
+        .where(
+            models.PasswordResetCode.user_id == user_id,
+            models.PasswordResetCode.used == False,
+        )
+        .values(used=True)
+    )
+
+    record = models.PasswordResetCode(
+        user_id=user_id,
+        code=code,
+        expires_at=expires_at,
+        used=False,
+    )
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    return record
+
+async def validate_password_reset_code(db: AsyncSession, email: str, code: str) -> models.Usuario | None:
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+
+    result = await db.execute(
+        select(models.PasswordResetCode)
+        .where(
+            models.PasswordResetCode.user_id == user.id,
+            models.PasswordResetCode.code == code,
+            models.PasswordResetCode.used == False,
+            models.PasswordResetCode.expires_at > datetime.now(timezone.utc),
+        )
+        .order_by(models.PasswordResetCode.id.desc())
+    )
+    rec = result.scalars().first()
+    if not rec:
+        return None
+
+    rec.used = True
+    await db.commit()
+    return user
+
+async def create_diario(
+    db: AsyncSession, usuario_id: int, texto: str, sentimento: str, resposta: str | None, analise_status: str
+) -> models.DiarioEmocional:
+    """Grava o diário e soma no rollup de sentimentos na mesma transação."""
+    diario = models.DiarioEmocional(
+        texto=texto,
+        sentimento=sentimento,
+        resposta=resposta,
+        usuario_id=usuario_id,
+        data=models.utcnow(),
+        analise_status=analise_status,
+    )
+    db.add(diario)
+    for stmt in diario_rollup.comandos(db.bind.dialect.name, usuario_id, diario.data, sentimento, 1):
+        await db.execute(stmt)
+    await db.commit()
+    await db.refresh(diario)
+    return diario
@@ -1,14 +1,53 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-# Usa apenas o DATABASE_URL (modo síncrono)
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+def _async_url(url: str) -> str:
+    """Troca o driver síncrono pelo equivalente async (asyncpg / aiosqlite)."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    for prefixo, async_prefixo in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(prefixo):
+            return async_prefixo + url[len(prefixo):]
+    return url
+
+
+# insert() com ON CONFLICT (upsert) de cada banco suportado
+INSERT_POR_DIALETO = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _pool_kwargs(url: str) -> dict:
+    kwargs = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    # o SQLite usa pools próprios que não aceitam tamanho/overflow/recycle
+    if not url.startswith("sqlite"):
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
+# Engine síncrono: rotas `def` (rodam no threadpool), create_all, seed e workers
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_pool_kwargs(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine async: rotas `async def`, para não bloquear o event loop
+ASYNC_DATABASE_URL = _async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_kwargs(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependência para injeção no FastAPI
@@ -18,3 +57,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,22 +1,69 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Usuario  
-from app.database import SessionLocal
+from app.config import settings
+from app.database import get_async_db
 from app.core.security import SECRET_KEY, ALGORITHM
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Usuario:
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Usuário autenticado: os atributos de Usuario que as rotas usam, sem sessão do ORM."""
+    id: int
+    nome: str
+    email: str
+    email_verificado: bool
+
+
+# usuario_id -> token_version. O Principal vem das claims do JWT; o banco só é
+# consultado para a versão, no máximo uma vez a cada AUTH_CACHE_SEGUNDOS por
+# usuário e worker. Esse é o atraso com que uma revogação (troca de senha ou
+# e-mail) ou a remoção do usuário feita em outro worker passa a valer aqui;
+# no worker que fez a mudança, invalidar_principal vale na hora.
+_versoes = TTLCache(maxsize=100_000, ttl=settings.AUTH_CACHE_SEGUNDOS)
+
+
+def claims_do_usuario(usuario: Usuario) -> dict:
+    """
+    Claims gravadas no JWT; viram o Principal sem consultar o banco. "ver"
+    precisa bater com usuarios.token_version. Nome e verificação do e-mail
+    valem como estavam no login (o próximo login atualiza); o e-mail não
+    fica velho porque trocá-lo revoga os tokens.
+    """
+    return {
+        "sub": str(usuario.id),
+        "nome": usuario.nome,
+        "email": usuario.email,
+        "email_verificado": bool(usuario.email_verificado),
+        "ver": usuario.token_version or 0,
+    }
+
+
+def revogar_tokens(usuario: Usuario) -> None:
+    """Invalida os JWTs já emitidos (troca de senha/e-mail). Vale no commit do chamador."""
+    usuario.token_version = Usuario.token_version + 1
+
+
+def invalidar_principal(usuario_id: int) -> None:
+    """Chamar (após o commit) quando e-mail, senha ou token_version mudarem."""
+    _versoes.pop(usuario_id)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """
+    Principal montado das claims verificadas do token. Com a versão em cache,
+    nenhuma consulta (a AsyncSession só pega conexão no primeiro uso); senão,
+    um SELECT de token_version. Usuário removido ou token com versão antiga -> 401.
+    Tokens emitidos antes das claims de perfil caem no SELECT do usuário.
+    """
     cred_exc = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
@@ -28,10 +75,42 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         if sub is None:
             raise cred_exc
         usuario_id = int(sub)
-    except (JWTError, ValueError):
+        versao = int(payload.get("ver", 0))
+    except (JWTError, ValueError, TypeError):
         raise cred_exc
 
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-    if not usuario:
+    principal = None
+    if "email" in payload:
+        principal = Principal(
+            id=usuario_id,
+            nome=payload.get("nome") or "",
+            email=payload["email"],
+            email_verificado=bool(payload.get("email_verificado")),
+        )
+    versao_atual = _versoes.get(usuario_id)
+    if versao_atual is None or principal is None:
+        usuario = (await db.execute(
+            select(Usuario.id, Usuario.nome, Usuario.email, Usuario.email_verificado, Usuario.token_version)
+            .where(Usuario.id == usuario_id)
+        )).first()
+        if usuario is None:
+            raise cred_exc
+        versao_atual = usuario.token_version
+        _versoes.set(usuario_id, versao_atual)
+        principal = principal or Principal(
+            id=usuario.id,
+            nome=usuario.nome,
+            email=usuario.email,
+            email_verificado=bool(usuario.email_verificado),
+        )
+
+    if versao != versao_atual:
         raise cred_exc
-    return usuario
\ No newline at end of file
+    return principal
+
+
+async def get_admin_user(usuario: Principal = Depends(get_current_user)) -> Principal:
+    """Rotas operacionais (métricas globais): só a conta ADMIN_EMAIL."""
+    if usuario.email.lower() != settings.ADMIN_EMAIL.lower().strip():
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito ao administrador")
+    return usuario
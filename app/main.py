@@ -3,7 +3,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base, SessionLocal
+from app.database import engine, async_engine, Base, SessionLocal
 
 # >>> IMPORTANTE: importar models antes de create_all
 from app import models  # garante que todas as tabelas entrem no metadata
@@ -11,10 +11,26 @@ from app import models  # garante que todas as tabelas entrem no metadata
 # cria tabelas
 Base.metadata.create_all(bind=engine)
 
+# colunas/índices novos em tabelas que já existiam (o create_all não faz ALTER)
+from app.migracoes import migrar
+COLUNAS_MIGRADAS = migrar(engine)
+for _coluna in COLUNAS_MIGRADAS:
+    print(f"[migração] coluna {_coluna} adicionada")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # roda o seed na subida do app
     from app.seed import seed_templates
+    from app.services.tentativa_buffer import tentativa_buffer
+    from app.services.alert_aggregator import alert_aggregator
+    from app.services.mail_worker import mail_worker
+    from app.services.password_hasher import password_hasher
+    from app.services import ai_gateway
+    from app.services.conselho_pool import conselho_pool
+    from app.services.diario_enrichment import diario_enriquecedor
+    from app.services.gatilho_scheduler import gatilho_scheduler
+    from app.services.streak_expiracao import streak_expiracao
+    from app.config import settings
     db = SessionLocal()
     try:
         try:
@@ -23,9 +39,54 @@ async def lifespan(app: FastAPI):
         except Exception as se:
             # loga mas não derruba o app
             print(f"[seed] erro: {se}")
+        try:
+            from app.crud import reconstruir_rollup_diario
+            if reconstruir_rollup_diario(db):
+                print("[rollup] diario_sentimento_rollup reconstruído")
+        except Exception as re_:
+            print(f"[rollup] erro: {re_}")
+        try:
+            from app.crud import reconstruir_agenda_gatilhos
+            if reconstruir_agenda_gatilhos(db):
+                print("[gatilhos] agenda semanal reconstruída")
+        except Exception as ge:
+            print(f"[gatilhos] erro: {ge}")
+        try:
+            from app.crud import reconstruir_checkins
+            if reconstruir_checkins(db):
+                print("[checkins] histórico de check-ins reconstruído")
+        except Exception as ce:
+            print(f"[checkins] erro: {ce}")
+        try:
+            # base antiga: progress_value acabou de ser criado zerado; recalcula do histórico
+            from app.crud import recalcular_progresso_desafios
+            if "user_challenges.progress_value" in COLUNAS_MIGRADAS and recalcular_progresso_desafios(db):
+                print("[desafios] progresso dos desafios ativos recalculado")
+        except Exception as pe:
+            print(f"[desafios] erro: {pe}")
+        await tentativa_buffer.iniciar()
+        await alert_aggregator.iniciar()
+        await mail_worker.iniciar()
+        await conselho_pool.iniciar()
+        await diario_enriquecedor.iniciar()
+        if settings.GATILHOS_NOTIFICAR:
+            await gatilho_scheduler.iniciar()
+        if settings.STREAKS_EXPIRAR:
+            await streak_expiracao.iniciar()
         yield
     finally:
+        # grava as tentativas ainda no buffer antes de desligar
+        await gatilho_scheduler.parar()
+        await streak_expiracao.parar()
+        await conselho_pool.parar()
+        await diario_enriquecedor.parar()
+        await tentativa_buffer.parar()
+        await alert_aggregator.parar()
+        await mail_worker.parar()  # depois do agregador: os resumos finais já estão na outbox
         db.close()
+        await async_engine.dispose()
+        password_hasher.encerrar()
+        await ai_gateway.fechar()
 
 # >>> Passe o lifespan aqui
 app = FastAPI(title="Bet Blocker Backend", lifespan=lifespan)
@@ -53,6 +114,7 @@ ROUTES = [
     "app.routes.gatilhos",
     "app.routes.detox",
     "app.routes.challenges",
+    "app.routes.emails",
 ]
 
 for mod_path in ROUTES:
@@ -0,0 +1,85 @@
+# app/migracoes.py
+"""
+Colunas e índices acrescentados a tabelas que já existiam. O create_all só
+cria tabelas novas (nunca faz ALTER TABLE), então bases antigas passam por
+aqui logo depois dele e antes dos backfills do lifespan. Idempotente e seguro
+com vários workers subindo ao mesmo tempo.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.engine import Engine
+from app import models
+
+_AGORA = object()  # DEFAULT = instante da migração
+
+# (coluna do model, DEFAULT que preenche as linhas existentes; None = fica NULL)
+COLUNAS: list[tuple[Column, object]] = [
+    (models.Usuario.__table__.c.fuso_horario, "'America/Sao_Paulo'"),
+    (models.Usuario.__table__.c.token_version, "0"),
+    # diários antigos já têm a resposta da IA
+    (models.DiarioEmocional.__table__.c.analise_status, "'concluida'"),
+    (models.DiarioEmocional.__table__.c.analise_tentativas, "0"),
+    (models.DiarioEmocional.__table__.c.analise_proxima_em, None),
+    # dias_mask NULL: reconstruir_agenda_gatilhos calcula máscara e intervalos
+    (models.Gatilho.__table__.c.dias_mask, None),
+    (models.Gatilho.__table__.c.atualizado_em, _AGORA),
+    # zerados aqui; recalculados do histórico no lifespan (recalcular_progresso_desafios)
+    (models.UserChallenge.__table__.c.progress_value, "0"),
+    (models.UserChallenge.__table__.c.dias_checkin, "0"),
+    (models.UsuarioPainelSnapshot.__table__.c.versao, "0"),
+]
+
+
+def _default_sql(engine: Engine, padrao) -> str | None:
+    if padrao is not _AGORA:
+        return padrao
+    if engine.dialect.name == "sqlite":
+        # o SQLite não aceita DEFAULT CURRENT_TIMESTAMP em ADD COLUMN
+        return datetime.now(timezone.utc).strftime("'%Y-%m-%d %H:%M:%S.%f'")
+    return "CURRENT_TIMESTAMP"
+
+
+def _tem_coluna(engine: Engine, tabela: str, coluna: str) -> bool:
+    return coluna in {c["name"] for c in inspect(engine).get_columns(tabela)}
+
+
+def _tem_indice(engine: Engine, tabela: str, indice: str) -> bool:
+    return indice in {i["name"] for i in inspect(engine).get_indexes(tabela)}
+
+
+def migrar(engine: Engine) -> list[str]:
+    """Adiciona o que falta; retorna as colunas adicionadas ("tabela.coluna")."""
+    existentes = set(inspect(engine).get_table_names())
+    adicionadas = []
+    for coluna, padrao in COLUNAS:
+        tabela = coluna.table.name
+        if tabela not in existentes or _tem_coluna(engine, tabela, coluna.name):
+            continue  # tabelas criadas pelo create_all já vêm completas
+        ddl = f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {coluna.type.compile(dialect=engine.dialect)}"
+        default = _default_sql(engine, padrao)
+        if default is not None:
+            ddl += f" DEFAULT {default}"
+        if not coluna.nullable:
+            ddl += " NOT NULL"
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception:
+            if not _tem_coluna(engine, tabela, coluna.name):
+                raise
+            continue  # outro worker adicionou antes
+        adicionadas.append(f"{tabela}.{coluna.name}")
+
+    # índices declarados depois que a tabela já existia (inclusive os das colunas acima)
+    for tabela in models.Base.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            continue
+        for indice in tabela.indexes:
+            if _tem_indice(engine, tabela.name, indice.name):
+                continue
+            try:
+                indice.create(engine)
+            except Exception:
+                if not _tem_indice(engine, tabela.name, indice.name):
+                    raise
+    return adicionadas
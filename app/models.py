@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean,func ,Date, Time,UniqueConstraint,Numeric,Enum as SAEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean,func ,Date, Time,UniqueConstraint,Numeric,Index,Enum as SAEnum
+from sqlalchemy import case
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime , date,timezone
 from .database import Base
 
@@ -16,6 +17,7 @@ TargetTypeEnum = SAEnum("streak", "money", "time_min", name="challenge_target_ty
 
 class SiteBloqueado(Base):
     __tablename__ = "sites_bloqueados"
+    __table_args__ = (Index("ix_sites_usuario_data", "usuario_id", "data_cadastro"),)
 
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, index=True)
@@ -27,6 +29,19 @@ class SiteBloqueado(Base):
     usuario = relationship("Usuario", back_populates="sites")
 
 
+class SiteBloqueadoMudanca(Base):
+    """Log append-only das alterações em sites_bloqueados; o id é a versão da blocklist."""
+    __tablename__ = "sites_bloqueados_mudancas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    site_id = Column(Integer, nullable=False, index=True)   # sem FK: o site pode já ter sido apagado
+    usuario_id = Column(Integer, nullable=False)
+    acao = Column(String(6), nullable=False)                # "add" | "remove"
+    url = Column(String, nullable=True)
+    tipo = Column(String, nullable=True)
+    criado_em = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+
 class TentativaAcesso(Base):
     __tablename__ = "tentativas_acesso"
 
@@ -40,6 +55,7 @@ class TentativaAcesso(Base):
 
 class Aconselhamento(Base):
     __tablename__ = "aconselhamentos"
+    __table_args__ = (Index("ix_aconselhamentos_usuario_data", "usuario_id", "data"),)
 
     id = Column(Integer, primary_key=True, index=True)
     mensagem = Column(Text, nullable=False)
@@ -61,6 +77,8 @@ class Usuario(Base):
     best_streak_days = Column(Integer, nullable=False, default=0)
     last_streak_days = Column(Integer, nullable=False, default=0)
     last_checkin_date = Column(Date, nullable=True)
+    fuso_horario = Column(String(64), nullable=False, default="America/Sao_Paulo")  # IANA, p/ avaliar gatilhos
+    token_version = Column(Integer, nullable=False, default=0)  # sobe na troca de senha/e-mail: revoga os JWTs anteriores
     
 
     tentativas = relationship("TentativaAcesso", back_populates="usuario", cascade="all, delete-orphan")
@@ -75,14 +93,42 @@ class Usuario(Base):
 
 class DiarioEmocional(Base):
     __tablename__ = "diario_emocional"
+    __table_args__ = (
+        Index("ix_diario_analise_status_proxima", "analise_status", "analise_proxima_em"),
+        Index("ix_diario_usuario_data", "usuario_id", "data"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     texto = Column(Text, nullable=False)
     sentimento = Column(String)
     resposta = Column(Text)
     data = Column(DateTime(timezone=True), default=utcnow)  # 🛠️
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+
+    # enriquecimento pela IA: "pendente" (sentimento provisório do classificador
+    # local) -> "processando" -> "concluida" | "falhou"
+    analise_status = Column(String(12), nullable=False, default="concluida")
+    analise_tentativas = Column(Integer, nullable=False, default=0)
+    analise_proxima_em = Column(DateTime(timezone=True), default=utcnow, nullable=True)
+
     usuario = relationship("Usuario", back_populates="diarios")
 
+class DiarioSentimentoRollup(Base):
+    """
+    Contagem de diários por (usuário, período, sentimento), mantida a cada
+    inserção/reclassificação. granularidade: "day" (data UTC) | "week" (segunda-feira).
+    """
+    __tablename__ = "diario_sentimento_rollup"
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "granularidade", "periodo", "sentimento", name="uq_diario_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    granularidade = Column(String(4), nullable=False)
+    periodo = Column(Date, nullable=False)
+    sentimento = Column(String, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+
 class EmergenciaContato(Base):
     __tablename__ = "contatos_emergencia" 
 
@@ -122,6 +168,7 @@ class PasswordResetCode(Base):
 # --- GATILHOS ---
 class Gatilho(Base):
     __tablename__ = "gatilhos"
+    __table_args__ = (Index("ix_gatilhos_usuario_criado", "usuario_id", "criado_em"),)
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
@@ -129,17 +176,38 @@ class Gatilho(Base):
     nome = Column(String, nullable=False)                 # ex.: "Noite", "Dia de pagamento"
     # dias_da_semana: 0=Seg ... 6=Dom (para simplificar salvaremos como string CSV "0,1,6")
     dias_da_semana = Column(String, default="", nullable=False)
+    dias_mask = Column(Integer, nullable=True)            # bit 0=Seg ... bit 6=Dom (mesmo dado, compacto)
     hora_inicio = Column(Time, nullable=False)            # ex.: 20:00
     hora_fim = Column(Time, nullable=False)               # ex.: 23:59
     ativo = Column(Boolean, default=True, nullable=False)
 
     criado_em = Column(DateTime(timezone=True), default=utcnow, nullable=False)  # 🛠️
+    atualizado_em = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False, index=True)
 
     usuario = relationship("Usuario", back_populates="gatilhos")
+    intervalos = relationship("GatilhoIntervalo", cascade="all, delete-orphan")
+
+class GatilhoIntervalo(Base):
+    """
+    Janelas do gatilho em minutos da semana no fuso do usuário (0 = Seg 00:00),
+    [inicio_min, fim_min). Só existem para gatilhos ativos.
+    """
+    __tablename__ = "gatilho_intervalos"
+    __table_args__ = (
+        Index("ix_gatilho_intervalos_usuario_inicio", "usuario_id", "inicio_min"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    gatilho_id = Column(Integer, ForeignKey("gatilhos.id", ondelete="CASCADE"), nullable=False, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    fuso_horario = Column(String(64), nullable=False)     # cópia de usuarios.fuso_horario
+    inicio_min = Column(Integer, nullable=False)
+    fim_min = Column(Integer, nullable=False)
 
 # --- PLANO DE DESINTOXICAÇÃO ---
 class DetoxPlano(Base):
     __tablename__ = "detox_planos"
+    __table_args__ = (Index("ix_detox_usuario_criado", "usuario_id", "criado_em"),)
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
@@ -160,6 +228,7 @@ class DetoxPlano(Base):
 
 class DesafioAbstinencia(Base):
     __tablename__ = "desafios_abstinencia"
+    __table_args__ = (Index("ix_desafios_usuario_criado", "usuario_id", "criado_em"),)
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
@@ -178,6 +247,52 @@ class DesafioAbstinencia(Base):
 
 
 
+class Checkin(Base):
+    """Log append-only de check-ins: no máximo uma linha por usuário por dia (UTC)."""
+    __tablename__ = "checkins"
+    __table_args__ = (UniqueConstraint("usuario_id", "dia", name="uq_checkin_usuario_dia"),)
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    dia = Column(Date, nullable=False)
+    criado_em = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+class StreakTransicao(Base):
+    """Streaks encerradas (hoje só pela expiração noturna): quanto durou e quando terminou."""
+    __tablename__ = "streak_transicoes"
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
+    motivo = Column(String(20), nullable=False)   # "expirada"
+    dias = Column(Integer, nullable=False)
+    inicio = Column(Date, nullable=False)
+    fim = Column(Date, nullable=False)            # último check-in da streak
+    criado_em = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+class TarefaProgresso(Base):
+    """Cursor de jobs em lote: um job interrompido retoma do último id confirmado."""
+    __tablename__ = "tarefas_progresso"
+
+    nome = Column(String(50), primary_key=True)
+    referencia = Column(Date, nullable=False)     # dia da execução a que o cursor pertence
+    cursor = Column(Integer, nullable=False, default=0)
+    concluida = Column(Boolean, nullable=False, default=False)
+    atualizado_em = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False)
+
+class UsuarioPainelSnapshot(Base):
+    """
+    Streak, métricas e histórico do usuário já calculados (JSON), válidos para
+    o dia `dia`. Invalidado (dados vazio, versao + 1) no check-in, no
+    início/reset/expiração de streak e na troca de baseline.
+    """
+    __tablename__ = "usuarios_painel_snapshot"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    dia = Column(Date, nullable=False)
+    dados = Column(Text, nullable=False)
+    versao = Column(Integer, nullable=False, default=0)  # só grava quem calculou sobre a versão atual
+    atualizado_em = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False)
+
 class UsuarioBaseline(Base):
     __tablename__ = "usuarios_baseline"
     __table_args__ = (UniqueConstraint("usuario_id", name="uq_baseline_usuario"),)
@@ -218,6 +333,7 @@ class ChallengeTemplate(Base):
 
 class UserChallenge(Base):
     __tablename__ = "user_challenges"
+    __table_args__ = (Index("ix_user_challenges_user_created", "user_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False, index=True)
@@ -247,6 +363,38 @@ class UserChallenge(Base):
     baseline_time_min = Column(Integer, nullable=True)
     baseline_streak_days = Column(Integer, nullable=True)
 
+    # progresso mantido pelos eventos de streak (services/desafio_progresso)
+    progress_value = Column(Integer, nullable=False, default=0)
+    dias_checkin = Column(Integer, nullable=False, default=0)
+    # calculado no próprio SELECT: a listagem não precisa de query extra por item
+    progress_pct = column_property(
+        case(
+            (target_value <= 0, 100.0),
+            (progress_value >= target_value, 100.0),
+            else_=func.round(progress_value * 100.0 / target_value, 1),
+        )
+    )
+
     created_at = Column(DateTime(timezone=True), default=utcnow, nullable=False)  # 🛠️
     updated_at = Column(DateTime(timezone=True), default=utcnow,
-                        onupdate=utcnow, nullable=False)  # 🛠️
\ No newline at end of file
+                        onupdate=utcnow, nullable=False)  # 🛠️
+
+
+class EmailOutbox(Base):
+    """Fila durável de e-mails a enviar; consumida pelo mail_worker."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_proxima", "status", "proxima_tentativa_em"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    destinatarios = Column(Text, nullable=False)          # JSON: ["a@x.com", ...]
+    assunto = Column(String, nullable=False)
+    corpo = Column(Text, nullable=False)
+
+    status = Column(String(10), nullable=False, default="pendente")  # pendente|enviando|enviado|falhou
+    tentativas = Column(Integer, nullable=False, default=0)
+    # próxima tentativa (pendente) ou fim do "lease" de quem está enviando
+    proxima_tentativa_em = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+    ultimo_erro = Column(Text, nullable=True)
+
+    criado_em = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+    enviado_em = Column(DateTime(timezone=True), nullable=True)
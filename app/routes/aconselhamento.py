@@ -1,25 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas import AconselhamentoRequest, AconselhamentoResponse, AconselhamentoOut
 from app.dependencies.auth import get_current_user
-from app.database import get_db
+from app.database import get_db, get_async_db, AsyncSessionLocal
 from app.models import Usuario, Aconselhamento
-from app.utils.ai_utils import gerar_aconselhamento_ia
+from app.utils.ai_utils import gerar_aconselhamento_ia, gerar_aconselhamento_ia_stream
 from typing import List
-from app.utils.model_utils import to_pydantic
+from app.utils.paginacao import Paginacao
 
 
 
 router = APIRouter(prefix="/aconselhamento", tags=["aconselhamento"])
 
 @router.post("/", response_model=AconselhamentoResponse)
-def obter_aconselhamento(
+async def obter_aconselhamento(
     payload: AconselhamentoRequest,
     usuario: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    cache: bool = Query(True, description="False força uma nova resposta da IA"),
 ):
     try:
-        resposta = gerar_aconselhamento_ia(payload.mensagem)
+        resposta = await gerar_aconselhamento_ia(payload.mensagem, usar_cache=cache)
 
         novo = Aconselhamento(
             mensagem=payload.mensagem,
@@ -27,19 +31,65 @@ def obter_aconselhamento(
             usuario_id=usuario.id
         )
         db.add(novo)
-        db.commit()
-        db.refresh(novo)
+        await db.commit()
 
         return AconselhamentoResponse(resposta=resposta)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar aconselhamento: {str(e)}")
+
+
+def _sse(dados: dict, evento: str | None = None) -> str:
+    linha_evento = f"event: {evento}\n" if evento else ""
+    return f"{linha_evento}data: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def obter_aconselhamento_stream(
+    payload: AconselhamentoRequest,
+    usuario: Usuario = Depends(get_current_user),
+    cache: bool = Query(True, description="False força uma nova resposta da IA"),
+):
+    """
+    Mesmo que POST /aconselhamento/, mas em Server-Sent Events: cada pedaço da
+    resposta chega como `data: {"delta": ...}` e, ao final, `event: fim`.
+    """
+    usuario_id = usuario.id
+
+    async def eventos():
+        partes = []
+        try:
+            async for delta in gerar_aconselhamento_ia_stream(payload.mensagem, usar_cache=cache):
+                partes.append(delta)
+                yield _sse({"delta": delta})
+        except HTTPException as e:
+            yield _sse({"detail": e.detail}, "erro")
+            return
+        except Exception as e:
+            yield _sse({"detail": f"Erro ao gerar aconselhamento: {str(e)}"}, "erro")
+            return
+
+        # a sessão da requisição já pode ter sido fechada quando o stream termina
+        async with AsyncSessionLocal() as db:
+            novo = Aconselhamento(mensagem=payload.mensagem, resposta="".join(partes), usuario_id=usuario_id)
+            db.add(novo)
+            await db.commit()
+        yield _sse({"id": novo.id}, "fim")
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
     
 
 @router.get("/", response_model=List[AconselhamentoOut])
 def listar_aconselhamentos(
+    pagina: Paginacao = Depends(),
     usuario: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    registros = db.query(Aconselhamento).filter_by(usuario_id=usuario.id).order_by(Aconselhamento.data.desc()).all()
-    return [to_pydantic(r, AconselhamentoOut) for r in registros]
+    linhas = pagina.consultar(db, Aconselhamento, Aconselhamento.data, AconselhamentoOut, Aconselhamento.usuario_id == usuario.id)
+    return pagina.responder_rapido(AconselhamentoOut, linhas)
 
@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, Response, status
 from sqlalchemy.orm import Session
-from datetime import datetime, timezone  # 🛠️ usar timezone-aware
 from app.database import get_db
 from app.dependencies.auth import get_current_user
-from app import schemas, models, crud
+from app import schemas, crud
+from app.services.catalogo_cache import catalogo_cache
+from app.utils.json_rapido import RespostaJSON
+from app.utils.orcamento_sql import orcamento_sql
+from app.utils.paginacao import Paginacao
 
 router = APIRouter(prefix="/challenges", tags=["Challenges"])
 
 # --- Catálogo ---
 
 @router.get("/catalog", response_model=list[schemas.ChallengeTemplateOut])
-def list_catalog(db: Session = Depends(get_db)):
-    # antes: crud.list_active_templates(...)
-    return crud.list_catalog(db)
+def list_catalog(if_none_match: str | None = Header(None), db: Session = Depends(get_db)):
+    # servido da memória; o banco só é consultado ao (re)carregar o cache
+    catalogo = catalogo_cache.obter(db)
+    headers = {"ETag": catalogo.etag, "Cache-Control": f"public, max-age={catalogo_cache.max_age(catalogo)}"}
+    if if_none_match == catalogo.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return RespostaJSON(catalogo.corpo, headers=headers)
 
 @router.post("/catalog", response_model=schemas.ChallengeTemplateOut)
 def create_catalog_item(
@@ -21,34 +28,33 @@ def create_catalog_item(
     user = Depends(get_current_user),
 ):
     # mantém como estava na sua versão
-    return crud.create_template(db, payload)
+    tpl = crud.create_template(db, payload)
+    catalogo_cache.invalidar()
+    return tpl
 
 
 # --- Minhas instâncias ---
 
-@router.get("/me", response_model=list[schemas.UserChallengeOut])
-def my_challenges(db: Session = Depends(get_db), user = Depends(get_current_user)):
+# orçamento: 1 SELECT da página (sem lazy load de template por item)
+@router.get("/me", response_model=list[schemas.UserChallengeOut], dependencies=[Depends(orcamento_sql(1))])
+def my_challenges(
+    response: Response,
+    pagina: Paginacao = Depends(),
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
     # antes: crud.list_user_challenges(...)
-    return crud.list_my_challenges(db, user.id)
+    itens = crud.list_my_challenges(db, user.id, pagina)
+    return pagina.responder(response, itens)
 
-@router.post("/", response_model=schemas.UserChallengeOut)
+# orçamento: template + INSERT + refresh
+@router.post("/", response_model=schemas.UserChallengeOut, dependencies=[Depends(orcamento_sql(3))])
 def create_user_challenge(
     payload: schemas.UserChallengeCreate,
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
 ):
-    # valida disponibilidade do template (se houver)
-    if payload.template_id:
-        tpl = db.query(models.ChallengeTemplate).get(payload.template_id)
-        if not tpl:
-            raise HTTPException(status_code=404, detail="Template não encontrado")
-
-        # 🛠️ agora timezone-aware para bater com DateTime(timezone=True)
-        now = datetime.now(timezone.utc)
-
-        if (tpl.starts_at and tpl.starts_at > now) or (tpl.expires_at and tpl.expires_at < now):
-            raise HTTPException(status_code=400, detail="Template indisponível/expirado")
-
+    # disponibilidade do template é validada no crud, na mesma leitura que copia os campos
     uc = crud.create_user_challenge(db, user.id, payload)
     return uc
 
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from datetime import date
 from app.database import get_db
 from app.models import DesafioAbstinencia, Usuario
 from app.schemas import DesafioCreate, DesafioOut
 from app.dependencies.auth import get_current_user
+from app.utils.paginacao import Paginacao
 
 router = APIRouter(prefix="/desafios", tags=["Desafio de Abstinência"])
 
@@ -33,11 +34,13 @@ def criar_desafio(payload: DesafioCreate,
     return novo
 
 @router.get("/me", response_model=list[DesafioOut])
-def listar_meus_desafios(db: Session = Depends(get_db),
+def listar_meus_desafios(response: Response,
+                         pagina: Paginacao = Depends(),
+                         db: Session = Depends(get_db),
                          usuario: Usuario = Depends(get_current_user)):
-    return db.query(DesafioAbstinencia)\
-        .filter(DesafioAbstinencia.usuario_id == usuario.id)\
-        .order_by(DesafioAbstinencia.criado_em.desc()).all()
+    query = db.query(DesafioAbstinencia).filter(DesafioAbstinencia.usuario_id == usuario.id)
+    itens = pagina.aplicar(query, DesafioAbstinencia, DesafioAbstinencia.criado_em, DesafioOut)
+    return pagina.responder(response, itens)
 
 @router.patch("/{desafio_id}/checkin", response_model=DesafioOut)
 def fazer_checkin(desafio_id: int,
@@ -5,6 +5,7 @@ from app.dependencies.auth import get_current_user
 from app.database import get_db
 from app.models import DetoxPlano, Usuario
 from app.schemas import DetoxPlanoCreate, DetoxPlanoOut
+from app.utils.paginacao import Paginacao
 
 router = APIRouter(prefix="/detox", tags=["Detox"])
 
@@ -37,27 +38,12 @@ def criar_plano(
 
 @router.get("/", response_model=list[DetoxPlanoOut])
 def listar_planos(
+    pagina: Paginacao = Depends(),
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(get_current_user),
 ):
-    itens = (
-        db.query(DetoxPlano)
-        .filter(DetoxPlano.usuario_id == usuario.id)
-        .order_by(DetoxPlano.criado_em.desc())
-        .all()
-    )
-    return [
-        DetoxPlanoOut(
-            id=i.id,
-            titulo=i.titulo,
-            objetivos=i.objetivos,
-            atividades_diarias=json.loads(i.atividades_diarias or "[]"),
-            dicas=i.dicas,
-            criado_em=i.criado_em,
-            atualizado_em=i.atualizado_em,
-        )
-        for i in itens
-    ]
+    linhas = pagina.consultar(db, DetoxPlano, DetoxPlano.criado_em, DetoxPlanoOut, DetoxPlano.usuario_id == usuario.id)
+    return pagina.responder_rapido(DetoxPlanoOut, linhas, {"atividades_diarias": lambda v: json.loads(v or "[]")})
 
 @router.put("/{plano_id}", response_model=DetoxPlanoOut)
 def atualizar_plano(
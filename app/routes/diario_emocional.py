@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.models import DiarioEmocional, Usuario
-from app.schemas import DiarioCreate, DiarioOut
-from app.services.diario_service import analisar_diario
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud_async
+from app.models import DiarioEmocional, DiarioSentimentoRollup, Usuario
+from app.schemas import DiarioCreate, DiarioOut, DiarioAnaliseOut, DiarioResumoOut, TendenciasOut, TendenciaPeriodoOut
+from app.services.diario_enrichment import diario_enriquecedor
+from app.services.semantic_cache import cache_diario
+from app.services.sentimento_local import classificar
+from typing import List, Literal
 from app.dependencies.auth import get_current_user
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.utils.paginacao import Paginacao
 
 router = APIRouter(prefix="/diario", tags=["Diário Emocional"])
 
@@ -13,30 +21,102 @@ router = APIRouter(prefix="/diario", tags=["Diário Emocional"])
 async def criar_diario(
     entrada: DiarioCreate,
     usuario: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    cache: bool = Query(True, description="False força uma nova análise da IA"),
 ):
-    sentimento, resposta = await analisar_diario(entrada.texto)
+    """
+    Grava na hora. Sem resposta em cache, o sentimento é o provisório do
+    classificador local e a IA completa a análise em segundo plano
+    (acompanhe em GET /diario/{id}/analise).
+    """
+    em_cache = cache_diario.get(entrada.texto) if cache else None
+    if em_cache is not None:
+        sentimento, resposta = em_cache
+        status = "concluida"
+    else:
+        sentimento, resposta = classificar(entrada.texto), None
+        status = "pendente"
 
-    novo_diario = DiarioEmocional(
-        texto=entrada.texto,
-        sentimento=sentimento,
-        resposta=resposta,
-        usuario_id=usuario.id,
-    )
-    db.add(novo_diario)
-    db.commit()
-    db.refresh(novo_diario)
+    novo_diario = await crud_async.create_diario(db, usuario.id, entrada.texto, sentimento, resposta, status)
+    if status == "pendente":
+        diario_enriquecedor.notificar()
     return novo_diario
 
 
+@router.get("/{diario_id}/analise", response_model=DiarioAnaliseOut)
+async def status_analise(
+    diario_id: int,
+    esperar: float = Query(0, ge=0, le=30, description="Long-poll: segundos para aguardar a análise"),
+    usuario: Usuario = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    loop = asyncio.get_running_loop()
+    prazo = loop.time() + esperar
+    while True:
+        result = await db.execute(
+            select(DiarioEmocional.id, DiarioEmocional.analise_status, DiarioEmocional.sentimento, DiarioEmocional.resposta)
+            .where(DiarioEmocional.id == diario_id, DiarioEmocional.usuario_id == usuario.id)
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Diário não encontrado")
+        restante = prazo - loop.time()
+        if row.analise_status in ("concluida", "falhou") or restante <= 0:
+            return DiarioAnaliseOut(id=row.id, analise_status=row.analise_status, sentimento=row.sentimento, resposta=row.resposta)
+        # o evento cobre o worker deste processo; o teto de 1s cobre os outros workers
+        await diario_enriquecedor.aguardar(diario_id, min(restante, 1.0))
+
+
+@router.get("/tendencias", response_model=TendenciasOut)
+async def tendencias(
+    granularity: Literal["day", "week"] = Query("day"),
+    limit: int = Query(30, ge=1, le=366, description="Períodos por página"),
+    cursor: date | None = Query(None, description="next_cursor da página anterior"),
+    usuario: Usuario = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Contagem de sentimentos por período, do mais recente para o mais antigo.
+    Lê só o rollup: o custo depende de `limit`, não do tamanho do histórico.
+    """
+    R = DiarioSentimentoRollup
+    filtro = [R.usuario_id == usuario.id, R.granularidade == granularity, R.total > 0]
+    if cursor is not None:
+        filtro.append(R.periodo < cursor)
+    result = await db.execute(
+        select(R.periodo).where(*filtro).distinct().order_by(R.periodo.desc()).limit(limit + 1)
+    )
+    periodos = result.scalars().all()
+    next_cursor = periodos[limit - 1] if len(periodos) > limit else None
+    periodos = periodos[:limit]
+    if not periodos:
+        return TendenciasOut(granularity=granularity, periodos=[])
+
+    result = await db.execute(
+        select(R.periodo, R.sentimento, R.total)
+        .where(*filtro, R.periodo >= periodos[-1])
+        .order_by(R.periodo.desc())
+    )
+    por_periodo = {p: {} for p in periodos}
+    for p, sentimento, total in result.all():
+        por_periodo[p][sentimento] = total
+    return TendenciasOut(
+        granularity=granularity,
+        periodos=[
+            TendenciaPeriodoOut(periodo=p, total=sum(c.values()), sentimentos=c) for p, c in por_periodo.items()
+        ],
+        next_cursor=next_cursor,
+    )
+
+
 @router.get("/", response_model=List[DiarioOut])
 def listar_diarios(
+    resumo: bool = Query(False, description="Atalho para fields=id,sentimento,data,analise_status"),
+    pagina: Paginacao = Depends(),
     usuario: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    return (
-        db.query(DiarioEmocional)
-        .filter_by(usuario_id=usuario.id)
-        .order_by(DiarioEmocional.data.desc())
-        .all()
-    )
\ No newline at end of file
+    if resumo and pagina.campos is None:
+        pagina.campos = list(DiarioResumoOut.model_fields)
+    linhas = pagina.consultar(db, DiarioEmocional, DiarioEmocional.data, DiarioOut, DiarioEmocional.usuario_id == usuario.id)
+    return pagina.responder_rapido(DiarioOut, linhas)
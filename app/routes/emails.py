@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Depends
+from app.dependencies.auth import get_admin_user
+from app.schemas import EmailMetricasOut
+from app.services.mail_worker import mail_worker
+
+router = APIRouter(prefix="/emails", tags=["E-mails"])
+
+@router.get("/metricas", response_model=EmailMetricasOut, dependencies=[Depends(get_admin_user)])
+def metricas_envio():
+    return mail_worker.metricas()
@@ -1,20 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import Usuario
-from app.schemas import EmergenciaResponse
+from app.schemas import EmergenciaResponse, ConselhoEmergencialOut
 from app.dependencies.auth import get_current_user
-from app.database import get_db
+from app.database import get_async_db
 from app.services.emergencia_service import lidar_emergencia
+from app.services.conselho_pool import conselho_pool
 
 router = APIRouter(prefix="/emergencia", tags=["Emergência"])
 
 @router.post("/", response_model=EmergenciaResponse)
 async def acionar_emergencia(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     usuario: Usuario = Depends(get_current_user),
 ):
     try:
         return await lidar_emergencia(db, usuario, background_tasks)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao acionar emergência: {str(e)}")
+
+@router.get("/conselho", response_model=ConselhoEmergencialOut)
+async def conselho_emergencial(usuario: Usuario = Depends(get_current_user)):
+    """Mensagem de apoio + dica rápida, servidas do pool em memória (sem chamar a IA)."""
+    return conselho_pool.proximo(usuario.id)
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
+from app import crud
+from app.services.gatilho_scheduler import gatilho_scheduler
 from app.dependencies.auth import get_current_user
 from app.database import get_db
 from app.models import Gatilho, Usuario
 from app.schemas import GatilhoCreate, GatilhoUpdate, GatilhoOut
+from app.utils.paginacao import Paginacao
 
 router = APIRouter(prefix="/gatilhos", tags=["Gatilhos"])
 
@@ -31,8 +34,10 @@ def criar_gatilho(
         ativo=payload.ativo,
     )
     db.add(db_obj)
+    crud.sincronizar_intervalos_gatilho(db, db_obj, crud.get_fuso_horario(db, usuario.id))
     db.commit()
     db.refresh(db_obj)
+    gatilho_scheduler.notificar()
     return GatilhoOut(
         id=db_obj.id,
         nome=db_obj.nome,
@@ -45,27 +50,12 @@ def criar_gatilho(
 
 @router.get("/", response_model=list[GatilhoOut])
 def listar_gatilhos(
+    pagina: Paginacao = Depends(),
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(get_current_user),
 ):
-    itens = (
-        db.query(Gatilho)
-        .filter(Gatilho.usuario_id == usuario.id)
-        .order_by(Gatilho.criado_em.desc())
-        .all()
-    )
-    return [
-        GatilhoOut(
-            id=i.id,
-            nome=i.nome,
-            dias_da_semana=_csv_to_ints(i.dias_da_semana),
-            hora_inicio=i.hora_inicio,
-            hora_fim=i.hora_fim,
-            ativo=i.ativo,
-            criado_em=i.criado_em,
-        )
-        for i in itens
-    ]
+    linhas = pagina.consultar(db, Gatilho, Gatilho.criado_em, GatilhoOut, Gatilho.usuario_id == usuario.id)
+    return pagina.responder_rapido(GatilhoOut, linhas, {"dias_da_semana": _csv_to_ints})
 
 @router.patch("/{gatilho_id}", response_model=GatilhoOut)
 def atualizar_gatilho(
@@ -93,8 +83,10 @@ def atualizar_gatilho(
     if payload.ativo is not None:
         g.ativo = payload.ativo
 
+    crud.sincronizar_intervalos_gatilho(db, g, crud.get_fuso_horario(db, usuario.id))
     db.commit()
     db.refresh(g)
+    gatilho_scheduler.notificar()
     return GatilhoOut(
         id=g.id,
         nome=g.nome,
@@ -120,6 +112,7 @@ def deletar_gatilho(
         raise HTTPException(status_code=404, detail="Gatilho não encontrado.")
     db.delete(g)
     db.commit()
+    gatilho_scheduler.remover(gatilho_id)
     return None
 
 @router.get("/agora/ativos", response_model=list[GatilhoOut])
@@ -127,32 +120,17 @@ def gatilhos_ativos_agora(
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(get_current_user),
 ):
-    """Retorna gatilhos ativos no dia da semana/hora atuais."""
-    agora = datetime.now()
-    dia_semana = (agora.weekday())  # 0=Seg ... 6=Dom
-    hora_atual = agora.time()
-
-    itens = (
-        db.query(Gatilho)
-        .filter(Gatilho.usuario_id == usuario.id, Gatilho.ativo == True)
-        .all()
-    )
-
-    ativos = []
-    for i in itens:
-        dias = _csv_to_ints(i.dias_da_semana)
-        if dias and (dia_semana not in dias):
-            continue
-        if i.hora_inicio <= hora_atual <= i.hora_fim:
-            ativos.append(
-                GatilhoOut(
-                    id=i.id,
-                    nome=i.nome,
-                    dias_da_semana=dias,
-                    hora_inicio=i.hora_inicio,
-                    hora_fim=i.hora_fim,
-                    ativo=i.ativo,
-                    criado_em=i.criado_em,
-                )
-            )
-    return ativos
+    """Retorna gatilhos ativos no dia da semana/hora atuais, no fuso do usuário."""
+    itens = crud.gatilhos_ativos_em(db, usuario.id, datetime.now(timezone.utc))
+    return [
+        GatilhoOut(
+            id=i.id,
+            nome=i.nome,
+            dias_da_semana=_csv_to_ints(i.dias_da_semana),
+            hora_inicio=i.hora_inicio,
+            hora_fim=i.hora_fim,
+            ativo=i.ativo,
+            criado_em=i.criado_em,
+        )
+        for i in itens
+    ]
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app import schemas, crud, database, models
 from app.models import Usuario
 from app.dependencies.auth import get_current_user
 from app.database import get_db
+from app.services.blocklist_matcher import donos_visiveis, get_matcher, matcher
+from app.services.blocklist_sync import calcular_delta, obter_snapshot
+from app.utils.paginacao import Paginacao
 
 
 router = APIRouter(prefix="/sites-bloqueados", tags=["sites-bloqueados"])
@@ -18,19 +21,76 @@ def criar_site(
     existing = crud.get_site_by_url(db, site.url, usuario.id)
     if existing:
         raise HTTPException(status_code=400, detail="Site já cadastrado")
-    return crud.create_site(db, site, usuario.id)
+    db_site = crud.create_site(db, site, usuario.id)
+    matcher.adicionar(db_site.id, db_site.url, db_site.usuario_id)
+    return db_site
 
 @router.get("/", response_model=List[schemas.SiteBloqueadoResponse])
 def listar_sites(
+    response: Response,
+    pagina: Paginacao = Depends(),
     db: Session = Depends(database.get_db),
     usuario: Usuario = Depends(get_current_user)
 ):
-    return crud.list_sites(db, usuario.id)
+    itens = crud.list_sites(db, usuario.id, pagina)
+    return pagina.responder(response, itens)
 
 @router.get("/todos", response_model=list[schemas.SiteBloqueadoResponse])
 def listar_todos_os_sites(db: Session = Depends(get_db)):
     return db.query(models.SiteBloqueado).all()
 
+@router.get("/sync", response_model=schemas.SiteSyncResponse)
+def sincronizar_sites(
+    response: Response,
+    since: int = Query(0, ge=0, description="Última versão aplicada pelo cliente"),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+):
+    versao_atual = crud.get_blocklist_version(db)
+    etag = f'"blocklist-{versao_atual}"'
+    # o ETag vale sozinho (cliente frio com since=0 que já tem a lista atual)
+    if if_none_match == etag or (since and since == versao_atual):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    delta = calcular_delta(db, since, versao_atual)
+    response.headers["ETag"] = f'"blocklist-{delta["versao"]}"'
+    return delta
+
+@router.get("/snapshot")
+def snapshot_sites(
+    if_none_match: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    db: Session = Depends(get_db),
+):
+    snap = obter_snapshot(db)
+    headers = {"ETag": snap.etag, "X-Blocklist-Version": str(snap.versao)}
+    if if_none_match == snap.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if accept_encoding and "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snap.corpo_gzip, media_type="application/json", headers=headers)
+    return Response(content=snap.corpo, media_type="application/json", headers=headers)
+
+@router.post("/match", response_model=schemas.SiteMatchResponse)
+def verificar_hosts(
+    payload: schemas.SiteMatchRequest,
+    db: Session = Depends(database.get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    m = get_matcher(db)
+    # nunca as regras de outros usuários: só as do usuário e as globais
+    donos = donos_visiveis(db, usuario.id, payload.apenas_meus)
+    resultados = []
+    for host in payload.hostnames:
+        achado = m.match(host, donos)
+        resultados.append(schemas.SiteMatchItem(
+            hostname=host,
+            bloqueado=achado is not None,
+            site_id=achado[0] if achado else None,
+            regra=achado[1] if achado else None,
+        ))
+    return schemas.SiteMatchResponse(resultados=resultados)
+
 @router.put("/{site_id}", response_model=schemas.SiteBloqueadoResponse)
 def atualizar_site(
     site_id: int,
@@ -41,10 +101,8 @@ def atualizar_site(
     db_site = crud.get_site_by_id(db, site_id)
     if not db_site or db_site.usuario_id != usuario.id:
         raise HTTPException(status_code=404, detail="Site não encontrado ou acesso negado")
-    db_site.url = site.url
-    db_site.tipo = site.tipo
-    db.commit()
-    db.refresh(db_site)
+    db_site = crud.update_site(db, db_site, site)
+    matcher.adicionar(db_site.id, db_site.url, db_site.usuario_id)
     return db_site
 
 @router.delete("/{site_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -56,6 +114,6 @@ def deletar_site(
     db_site = crud.get_site_by_id(db, site_id)
     if not db_site or db_site.usuario_id != usuario.id:
         raise HTTPException(status_code=404, detail="Site não encontrado ou acesso negado")
-    db.delete(db_site)
-    db.commit()
+    crud.delete_site(db, db_site)
+    matcher.remover(site_id)
     return None
@@ -1,12 +1,39 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
-from sqlalchemy.orm import Session
-from app import schemas, crud, database
-from app.services.email_service import send_email_alert
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, crud_async, database
+from app.dependencies.auth import get_admin_user
+from app.services.alert_aggregator import alert_aggregator
+from app.services.tentativa_buffer import tentativa_buffer, BufferCheio
 
 router = APIRouter(prefix="/tentativas", tags=["tentativas"])
 
 @router.post("/", response_model=schemas.TentativaAcessoResponse)
-async def criar_tentativa(tentativa: schemas.TentativaAcessoCreate, background_tasks: BackgroundTasks, db: Session = Depends(database.get_db)):
-    db_tentativa = crud.create_tentativa(db, tentativa)
-    background_tasks.add_task(send_email_alert, db, db_tentativa) 
+async def criar_tentativa(tentativa: schemas.TentativaAcessoCreate, db: AsyncSession = Depends(database.get_async_db)):
+    db_tentativa = await crud_async.create_tentativa(db, tentativa)
+    alert_aggregator.registrar(db_tentativa.usuario_id, db_tentativa.site_id, db_tentativa.data_hora)
     return db_tentativa
+
+@router.post("/batch", response_model=schemas.TentativaAcessoBatchResponse, status_code=202)
+async def criar_tentativas_batch(payload: schemas.TentativaAcessoBatch, db: AsyncSession = Depends(database.get_async_db)):
+    """Tudo ou nada: com algum site/usuário inexistente, 422 apontando as linhas e nada é gravado."""
+    agora = datetime.now(timezone.utc)
+    rows = [
+        {"site_id": t.site_id, "usuario_id": t.usuario_id, "data_hora": t.data_hora or agora}
+        for t in payload.tentativas
+    ]
+    erros = await crud_async.validar_tentativas(db, rows)
+    if erros:
+        raise HTTPException(status_code=422, detail=erros)
+    try:
+        await tentativa_buffer.enfileirar(rows)
+    except BufferCheio:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente.", headers={"Retry-After": "5"})
+
+    for row in rows:
+        alert_aggregator.registrar(row["usuario_id"], row["site_id"], row["data_hora"])
+    return schemas.TentativaAcessoBatchResponse(aceitas=len(rows))
+
+@router.get("/alertas/metricas", response_model=schemas.AlertaMetricasOut, dependencies=[Depends(get_admin_user)])
+def metricas_alertas():
+    return schemas.AlertaMetricasOut(**alert_aggregator.contadores, pendentes=alert_aggregator.pendentes)
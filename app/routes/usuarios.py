@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status , BackgroundTasks,Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import Usuario , EmergenciaContato
 from app.services.email_service import send_email_notificacao 
-from app.schemas import TrocaSenha, UserOut, ContatoEmergenciaCreate, ContatoEmergenciaOut, BaselineOut,BaselineCreate,BaselineUpdate,MetricsOut,CheckinTodayOut,HistoryOut, HistoryPoint
-from app.core.security import verify_password, get_password_hash
+from app.schemas import TrocaSenha, UserOut, FusoHorarioUpdate, ContatoEmergenciaCreate, ContatoEmergenciaOut, BaselineOut,BaselineCreate,BaselineUpdate,MetricsOut,CheckinTodayOut,HistoryOut
+from app.services.password_hasher import password_hasher
 from typing import List
-from app import crud
+from app import crud, crud_async
+from app.dependencies.auth import invalidar_principal, revogar_tokens
+from app.services.gatilho_agenda import fuso_valido
+from app.services import painel_usuario
+from app.utils.json_rapido import RespostaJSON, dumps
 from datetime import datetime,date,timedelta,timezone
 
 router = APIRouter(prefix="/usuarios", tags=["Usuários"])
@@ -22,24 +27,37 @@ class StreakOut(BaseModel):
     bestDays: int
     since: datetime | None
 
+
+class TotaisJanelaOut(BaseModel):
+    avoidedBets: int
+    moneySaved: float
+    timeSavedMin: int
+
+
+class DashboardOut(BaseModel):
+    streak: StreakOut
+    metrics: MetricsOut | None = None   # None sem baseline
+    history: HistoryOut
+    totals: TotaisJanelaOut             # soma da janela de `days` dias
+
 @router.patch("/{usuario_id}/email", status_code=200)
 async def trocar_email(
     usuario_id: int,
     payload: TrocaEmailRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 
 ):
     novo_email = payload.novo_email
 
-    usuario_existente = db.query(Usuario).filter(Usuario.email == novo_email).first()
+    usuario_existente = await crud_async.get_user_by_email(db, novo_email)
     if usuario_existente:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Este e-mail já está em uso."
         )
 
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await crud_async.get_user_by_id(db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
@@ -47,7 +65,9 @@ async def trocar_email(
     nome_antigo = usuario.nome
 
     usuario.email = novo_email
-    db.commit()
+    revogar_tokens(usuario)
+    await db.commit()
+    invalidar_principal(usuario.id)
 
     try:
         background_tasks.add_task(
@@ -67,19 +87,22 @@ async def trocar_senha(
     usuario_id: int,
     senha_data: TrocaSenha,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 
 ):
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await crud_async.get_user_by_id(db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    if not verify_password(senha_data.senha_atual, usuario.senha):
+    ok, _ = await password_hasher.verificar(senha_data.senha_atual, usuario.senha)
+    if not ok:
         raise HTTPException(status_code=403, detail="Senha atual incorreta")
 
-    usuario.senha = get_password_hash(senha_data.nova_senha)
-    db.commit()
-    db.refresh(usuario)
+    usuario.senha = await password_hasher.hash(senha_data.nova_senha)
+    revogar_tokens(usuario)
+    await db.commit()
+    await db.refresh(usuario)
+    invalidar_principal(usuario.id)
 
     try:
         background_tasks.add_task(
@@ -93,6 +116,16 @@ async def trocar_senha(
 
     return usuario
 
+@router.patch("/{usuario_id}/fuso-horario", status_code=200)
+def trocar_fuso_horario(usuario_id: int, payload: FusoHorarioUpdate, db: Session = Depends(get_db)):
+    if not fuso_valido(payload.fuso_horario):
+        raise HTTPException(status_code=400, detail="Fuso horário inválido")
+    if not db.query(Usuario.id).filter(Usuario.id == usuario_id).first():
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    crud.atualizar_fuso_horario(db, usuario_id, payload.fuso_horario)
+    return {"mensagem": "Fuso horário atualizado com sucesso"}
+
+
 @router.post("/{usuario_id}/contatos", response_model=ContatoEmergenciaOut, status_code=201)
 def adicionar_contato_emergencia(
     usuario_id: int,
@@ -177,47 +210,42 @@ def atualizar_baseline(usuario_id: int, payload: BaselineUpdate, db: Session = D
     return crud.update_baseline(db, baseline, payload)
 
 
-@router.get("/{usuario_id}/metrics", response_model=MetricsOut)
-def get_user_metrics(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-    if not usuario:
+def _painel(db: Session, usuario_id: int) -> dict:
+    dados = painel_usuario.obter(db, usuario_id)
+    if dados is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return dados
 
-    baseline = crud.get_baseline_by_user(db, usuario_id)
-    if not baseline:
-        raise HTTPException(status_code=404, detail="Baseline não encontrado")
-
-    streak_days = crud.get_current_streak_days(usuario)
-    avoided_bets = round((baseline.dias_por_semana or 0) * (streak_days / 7) * 2)
-    money_saved = round((baseline.gasto_medio_dia or 0.0) * streak_days, 2)
-    time_saved_min = int((baseline.tempo_diario_minutos or 0) * streak_days)
 
-    return MetricsOut(
-        streakDays=streak_days,
-        avoidedBets=avoided_bets,
-        moneySaved=money_saved,
-        timeSavedMin=time_saved_min,
-    )
+@router.get("/{usuario_id}/metrics", response_model=MetricsOut)
+def get_user_metrics(usuario_id: int, db: Session = Depends(get_db)):
+    dados = _painel(db, usuario_id)
+    if dados["metrics"] is None:
+        raise HTTPException(status_code=404, detail="Baseline não encontrado")
+    return RespostaJSON(dumps(dados["metrics"]))
+
+@router.get("/{usuario_id}/dashboard", response_model=DashboardOut)
+def get_dashboard(usuario_id: int, days: int = Query(7, ge=1, le=painel_usuario.HISTORICO_DIAS), db: Session = Depends(get_db)):
+    """Streak, métricas e histórico numa chamada só (servidos do snapshot do dia)."""
+    dados = _painel(db, usuario_id)
+    return RespostaJSON(dumps({
+        "streak": dados["streak"],
+        "metrics": dados["metrics"],
+        "history": {"points": painel_usuario.historico(dados, days)},
+        "totals": painel_usuario.totais(dados, days),
+    }))
 
 # -------- streak / check-in --------
 
 @router.get("/{usuario_id}/streak", response_model=StreakOut)
 def get_streak(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-    if not usuario:
-        raise HTTPException(404, "Usuário não encontrado")
-    return StreakOut(
-        currentDays=crud.get_current_streak_days(usuario),
-        bestDays=usuario.best_streak_days or 0,
-        since=usuario.streak_started_at,
-    )
+    return RespostaJSON(dumps(_painel(db, usuario_id)["streak"]))
 
 @router.post("/{usuario_id}/streak/start", response_model=StreakOut)
 def start_streak_route(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = crud.start_streak(db, usuario_id)
     if not usuario:
         raise HTTPException(404, "Usuário não encontrado")
-    usuario = crud.start_streak(db, usuario)
     return StreakOut(
         currentDays=crud.get_current_streak_days(usuario),
         bestDays=usuario.best_streak_days or 0,
@@ -226,10 +254,9 @@ def start_streak_route(usuario_id: int, db: Session = Depends(get_db)):
 
 @router.post("/{usuario_id}/streak/reset", response_model=StreakOut)
 def reset_streak_route(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = crud.reset_streak(db, usuario_id)
     if not usuario:
         raise HTTPException(404, "Usuário não encontrado")
-    usuario = crud.reset_streak(db, usuario)
     return StreakOut(
         currentDays=crud.get_current_streak_days(usuario),
         bestDays=usuario.best_streak_days or 0,
@@ -247,48 +274,15 @@ def get_checkin_today(usuario_id: int, db: Session = Depends(get_db)):
 
 @router.post("/{usuario_id}/checkin", response_model=CheckinTodayOut, status_code=201)
 def do_checkin(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = crud.do_daily_checkin(db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    streak = crud.do_daily_checkin(db, usuario)
+    streak = crud.get_current_streak_days(usuario)
     return CheckinTodayOut(done=True, checked_at=usuario.last_checkin_date, streakDays=streak)
 
 
 
 @router.get("/{usuario_id}/history", response_model=HistoryOut)
-def get_history(usuario_id: int, days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
-    usuario: Usuario | None = db.query(Usuario).filter_by(id=usuario_id).first()
-    if not usuario:
-        raise HTTPException(404, "Usuário não encontrado")
-
-    baseline = crud.get_baseline_by_user(db, usuario_id)
-    if not baseline:
-        # sem baseline não faz sentido calcular métricas
-        return HistoryOut(points=[])
-
-    # streak atual (em dias) e heurística simples:
-    streak_days = crud.get_current_streak_days(usuario)
-
-    last = usuario.last_checkin_date or crud.today_utc()
-    # se tiver streak>0, o início é "last - (streak_days-1)"
-    streak_start = last - timedelta(days=max(0, streak_days - 1))
-
-    start = crud.today_utc() - timedelta(days=days - 1)
-    points: list[HistoryPoint] = []
-
-    for i in range(days):
-        d = start + timedelta(days=i)
-        active = (streak_days > 0) and (streak_start <= d <= last)
-
-        avoided = int((baseline.dias_por_semana or 0) / 7) if active else 0
-        money  = float(baseline.gasto_medio_dia or 0.0) if active else 0.0
-        time_m = int(baseline.tempo_diario_minutos or 0) if active else 0
-
-        points.append(HistoryPoint(
-            date=d,
-            avoidedBets=avoided,
-            moneySaved=round(money, 2),
-            timeSavedMin=time_m
-        ))
-
-    return HistoryOut(points=points)
\ No newline at end of file
+def get_history(usuario_id: int, days: int = Query(7, ge=1, le=painel_usuario.HISTORICO_DIAS), db: Session = Depends(get_db)):
+    dados = _painel(db, usuario_id)
+    return RespostaJSON(dumps({"points": painel_usuario.historico(dados, days)}))
@@ -21,6 +21,30 @@ class SiteBloqueadoResponse(SiteBloqueadoBase):
     class Config:
         from_attributes = True
 
+class SiteMatchRequest(BaseModel):
+    hostnames: List[str] = Field(..., max_length=1000)
+    apenas_meus: bool = False  # True = só as regras do usuário; padrão: as dele + as globais (conta ADMIN_EMAIL)
+
+class SiteMatchItem(BaseModel):
+    hostname: str
+    bloqueado: bool
+    site_id: Optional[int] = None
+    regra: Optional[str] = None
+
+class SiteMatchResponse(BaseModel):
+    resultados: List[SiteMatchItem]
+
+class SiteSyncItem(BaseModel):
+    id: int
+    url: str
+    tipo: Optional[str] = None
+
+class SiteSyncResponse(BaseModel):
+    versao: int
+    reset: bool = False  # True = baixar /sites-bloqueados/snapshot e sincronizar a partir dele
+    adicionados: List[SiteSyncItem]
+    removidos: List[int]
+
 # Schemas para TentativaAcesso
 class TentativaAcessoBase(BaseModel):
     site_id: int
@@ -29,6 +53,23 @@ class TentativaAcessoBase(BaseModel):
 class TentativaAcessoCreate(TentativaAcessoBase):
     pass
 
+class TentativaAcessoBatchItem(TentativaAcessoBase):
+    data_hora: Optional[datetime] = None  # quando o dispositivo registrou (default: recebimento)
+
+class TentativaAcessoBatch(BaseModel):
+    tentativas: List[TentativaAcessoBatchItem] = Field(..., min_length=1, max_length=1000)
+
+class TentativaAcessoBatchResponse(BaseModel):
+    aceitas: int
+
+class AlertaMetricasOut(BaseModel):
+    recebidas: int    # tentativas registradas no agregador
+    enviados: int     # e-mails-resumo enviados
+    suprimidos: int   # tentativas que entraram num resumo em vez de gerar e-mail próprio
+    adiados: int      # janelas que esperaram token do balde
+    falhas: int
+    pendentes: int    # usuários com janela aberta
+
 class TentativaAcessoResponse(TentativaAcessoBase):
     id: int
     data_hora: datetime
@@ -60,6 +101,9 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True
 
+class FusoHorarioUpdate(BaseModel):
+    fuso_horario: str = Field(..., description="Nome IANA, ex.: America/Sao_Paulo")
+
 # Login
 class LoginSchema(BaseModel):
     email: EmailStr
@@ -101,8 +145,32 @@ class DiarioOut(BaseModel):
     id: int
     texto: str
     sentimento: str
-    resposta: str
+    resposta: Optional[str] = None   # None enquanto a análise da IA estiver pendente
     data: datetime
+    analise_status: str = "concluida"
+
+class DiarioAnaliseOut(BaseModel):
+    id: int
+    analise_status: str
+    sentimento: str
+    resposta: Optional[str] = None
+
+class DiarioResumoOut(BaseModel):
+    """Projeção sem texto/resposta, para listas e telas de humor."""
+    id: int
+    sentimento: str
+    data: datetime
+    analise_status: str = "concluida"
+
+class TendenciaPeriodoOut(BaseModel):
+    periodo: date          # dia, ou segunda-feira da semana
+    total: int
+    sentimentos: dict[str, int]
+
+class TendenciasOut(BaseModel):
+    granularity: Literal["day", "week"]
+    periodos: List[TendenciaPeriodoOut]
+    next_cursor: Optional[date] = None   # passe como `cursor` para a próxima página
 
 class ContatoEmergenciaCreate(BaseModel):
     email: EmailStr
@@ -116,10 +184,15 @@ class ContatoEmergenciaOut(BaseModel):
     class Config:
         from_attributes = True
 
+class ConselhoEmergencialOut(BaseModel):
+    mensagem_apoio: str
+    dica_rapida: str
+
 class EmergenciaResponse(BaseModel):
     mensagem: str
     enviado_para: list[EmailStr]
     data_hora: datetime
+    conselho: Optional[ConselhoEmergencialOut] = None
 
     class Config:
         from_attributes = True
@@ -311,6 +384,10 @@ class UserChallengeOut(BaseModel):
     baseline_time_min: Optional[int] = None
     baseline_streak_days: Optional[int] = None
 
+    # progresso (atualizado a cada check-in; 100 = meta atingida)
+    progress_value: int = 0
+    progress_pct: float = 0.0
+
     created_at: datetime
     updated_at: datetime
 
@@ -330,3 +407,15 @@ class ChallengeTemplateCreate(BaseModel):
     target_value: int | None = None   # opcional (o modelo permite NULL)
     starts_at: datetime | None = None
     expires_at: datetime | None = None
+
+
+# ============== E-MAILS ==============
+class EmailMetricasOut(BaseModel):
+    enviados: int
+    falhas: int
+    retentativas: int
+    desistencias: int       # excederam EMAIL_MAX_TENTATIVAS
+    conexoes_abertas: int
+    enviados_ultimo_minuto: int
+    latencia_p50_ms: Optional[float] = None
+    latencia_p99_ms: Optional[float] = None
@@ -0,0 +1,75 @@
+import asyncio
+import importlib.util
+from typing import AsyncIterator
+import httpx
+from openai import AsyncOpenAI
+from fastapi import HTTPException
+from app.config import settings
+
+# HTTP/2 só se o pacote "h2" estiver instalado; senão fica em HTTP/1.1 keep-alive
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+_client: AsyncOpenAI | None = None
+_semaforos: dict[str, asyncio.Semaphore] = {}
+
+
+def get_client() -> AsyncOpenAI:
+    """Cliente único do processo, com pool de conexões persistentes."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.OPENAI_BASE_URL,  # None = API oficial; aponte para um fake local nos testes
+            timeout=settings.OPENAI_TIMEOUT_SEGUNDOS,
+            max_retries=1,
+            http_client=httpx.AsyncClient(
+                http2=_HTTP2,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+                timeout=settings.OPENAI_TIMEOUT_SEGUNDOS,
+            ),
+        )
+    return _client
+
+
+async def fechar() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _semaforo(model: str) -> asyncio.Semaphore:
+    sem = _semaforos.get(model)
+    if sem is None:
+        sem = _semaforos[model] = asyncio.Semaphore(settings.OPENAI_MAX_CONCORRENCIA_POR_MODELO)
+    return sem
+
+
+async def _adquirir(model: str) -> asyncio.Semaphore:
+    sem = _semaforo(model)
+    try:
+        await asyncio.wait_for(sem.acquire(), settings.OPENAI_ESPERA_FILA_SEGUNDOS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Serviço de IA ocupado, tente novamente.", headers={"Retry-After": "2"})
+    return sem
+
+
+async def completar(model: str, messages: list[dict], **kwargs) -> str:
+    sem = await _adquirir(model)
+    try:
+        resposta = await get_client().chat.completions.create(model=model, messages=messages, **kwargs)
+        return resposta.choices[0].message.content or ""
+    finally:
+        sem.release()
+
+
+async def completar_stream(model: str, messages: list[dict], **kwargs) -> AsyncIterator[str]:
+    """Gera os pedaços de texto conforme chegam (a vaga do modelo fica presa até o fim)."""
+    sem = await _adquirir(model)
+    try:
+        stream = await get_client().chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        sem.release()
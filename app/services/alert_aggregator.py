@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+from anyio import to_thread
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Usuario, SiteBloqueado
+from app.services.email_service import send_email_digest
+from app.utils.tarefas import encerrar, esperar_evento
+
+
+class TokenBucket:
+    """Balde de tokens: `capacidade` envios em rajada, recarga de 1 token a cada `recarga_s`."""
+    __slots__ = ("capacidade", "recarga_s", "tokens", "atualizado")
+
+    def __init__(self, capacidade: int, recarga_s: float):
+        self.capacidade = capacidade
+        self.recarga_s = recarga_s
+        self.tokens = float(capacidade)
+        self.atualizado = time.monotonic()
+
+    def _recarregar(self, agora: float) -> None:
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) / self.recarga_s)
+        self.atualizado = agora
+
+    def consumir(self, agora: float) -> bool:
+        self._recarregar(agora)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def cheio(self, agora: float) -> bool:
+        self._recarregar(agora)
+        return self.tokens >= self.capacidade
+
+
+class _Janela:
+    __slots__ = ("inicio", "sites", "total", "ultima", "adiada")
+
+    def __init__(self, inicio: float):
+        self.inicio = inicio
+        self.sites: Counter = Counter()
+        self.total = 0
+        self.ultima: datetime | None = None
+        self.adiada = False
+
+    def absorver(self, outra: "_Janela") -> None:
+        """Junta uma janela devolvida a esta; vale o início mais antigo."""
+        self.inicio = min(self.inicio, outra.inicio)
+        self.sites.update(outra.sites)
+        self.total += outra.total
+        if outra.ultima and (self.ultima is None or outra.ultima > self.ultima):
+            self.ultima = outra.ultima
+
+
+class AlertAggregator:
+    """
+    Agrupa as tentativas por usuário numa janela e envia um único e-mail-resumo
+    por janela. O balde de tokens por usuário limita quantos resumos saem em
+    rajada; sem token, a janela continua acumulando até o próximo envio.
+    """
+
+    def __init__(self, janela_s: float, capacidade: int, recarga_s: float):
+        self.janela_s = janela_s
+        self.capacidade = capacidade
+        self.recarga_s = recarga_s
+        self._pendentes: dict[int, _Janela] = {}
+        self._buckets: dict[int, TokenBucket] = {}
+        self._task: asyncio.Task | None = None
+        self._acordar: asyncio.Event | None = None
+        self._parando = False
+        self.contadores = Counter(recebidas=0, enviados=0, suprimidos=0, adiados=0, falhas=0)
+
+    @property
+    def pendentes(self) -> int:
+        return len(self._pendentes)
+
+    def registrar(self, usuario_id: int, site_id: int, data_hora: datetime | None) -> None:
+        janela = self._pendentes.get(usuario_id)
+        if janela is None:
+            janela = self._pendentes[usuario_id] = _Janela(time.monotonic())
+        janela.sites[site_id] += 1
+        janela.total += 1
+        janela.ultima = data_hora or janela.ultima
+        self.contadores["recebidas"] += 1
+
+    async def iniciar(self) -> None:
+        self._acordar = asyncio.Event()
+        self._parando = False
+        self._task = asyncio.create_task(self._loop(), name="alertas")
+
+    async def parar(self) -> None:
+        """
+        Sinaliza a parada; um envio em andamento termina antes. Depois manda os
+        resumos que ainda estão pendentes (sem checar os baldes).
+        """
+        if not self._task:
+            return
+        self._parando = True
+        self._acordar.set()
+        await encerrar(self._task)
+        self._task = None
+        prontos, self._pendentes = self._pendentes, {}
+        await self._enviar(prontos)
+        if self._pendentes:
+            print(f"[alertas] {len(self._pendentes)} resumo(s) não enviado(s) no shutdown")
+
+    async def _loop(self) -> None:
+        intervalo = max(1.0, self.janela_s / 10)
+        while not self._parando:
+            if await esperar_evento(self._acordar, intervalo):
+                break
+            try:
+                await self._enviar(self._coletar_prontos(time.monotonic()))
+            except Exception as e:
+                print(f"[alertas] erro no envio dos resumos: {e}")
+
+    def _coletar_prontos(self, agora: float) -> dict[int, _Janela]:
+        prontos = {}
+        for usuario_id, janela in list(self._pendentes.items()):
+            if agora - janela.inicio < self.janela_s:
+                continue
+            bucket = self._buckets.get(usuario_id)
+            if bucket is None:
+                bucket = self._buckets[usuario_id] = TokenBucket(self.capacidade, self.recarga_s)
+            if bucket.consumir(agora):
+                prontos[usuario_id] = self._pendentes.pop(usuario_id)
+            elif not janela.adiada:
+                janela.adiada = True
+                self.contadores["adiados"] += 1
+
+        # baldes cheios de usuários sem pendência não precisam ficar em memória
+        for usuario_id, bucket in list(self._buckets.items()):
+            if usuario_id not in self._pendentes and bucket.cheio(agora):
+                del self._buckets[usuario_id]
+        return prontos
+
+    def _devolver(self, janelas: dict[int, _Janela]) -> None:
+        """Janelas não enviadas voltam para a fila e saem no próximo tick."""
+        for usuario_id, janela in janelas.items():
+            atual = self._pendentes.get(usuario_id)
+            if atual is None:
+                self._pendentes[usuario_id] = janela
+            else:
+                atual.absorver(janela)
+
+    async def _enviar(self, prontos: dict[int, _Janela]) -> None:
+        if not prontos:
+            return
+        restantes = dict(prontos)
+        try:
+            usuarios, urls = await to_thread.run_sync(_carregar_destinos, prontos)
+            for usuario_id, janela in prontos.items():
+                usuario = usuarios.get(usuario_id)
+                if not usuario:
+                    del restantes[usuario_id]
+                    continue
+                itens = [(urls.get(site_id, f"site #{site_id}"), n) for site_id, n in janela.sites.most_common()]
+                try:
+                    await send_email_digest(usuario[0], usuario[1], itens, janela.total, janela.ultima)
+                except Exception as e:
+                    self.contadores["falhas"] += 1
+                    print(f"[alertas] falha ao enviar resumo para usuário {usuario_id}: {e}")
+                    continue
+                del restantes[usuario_id]
+                self.contadores["enviados"] += 1
+                self.contadores["suprimidos"] += janela.total - 1
+        finally:
+            # erro ou cancelamento no meio do tick: nada do que foi tirado da fila se perde
+            self._devolver(restantes)
+
+
+def _carregar_destinos(prontos: dict[int, _Janela]) -> tuple[dict, dict]:
+    """Uma consulta para os usuários e outra para os sites de todos os resumos do tick."""
+    site_ids = {s for j in prontos.values() for s in j.sites}
+    db = SessionLocal()
+    try:
+        usuarios = {
+            i: (email, nome)
+            for i, email, nome in db.query(Usuario.id, Usuario.email, Usuario.nome)
+            .filter(Usuario.id.in_(list(prontos)))
+        }
+        urls = dict(
+            db.query(SiteBloqueado.id, SiteBloqueado.url).filter(SiteBloqueado.id.in_(list(site_ids)))
+        )
+        return usuarios, urls
+    finally:
+        db.close()
+
+
+alert_aggregator = AlertAggregator(
+    janela_s=settings.ALERTA_JANELA_SEGUNDOS,
+    capacidade=settings.ALERTA_BUCKET_CAPACIDADE,
+    recarga_s=settings.ALERTA_BUCKET_RECARGA_SEGUNDOS,
+)
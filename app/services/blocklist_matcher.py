@@ -0,0 +1,201 @@
+import threading
+from typing import Collection
+from urllib.parse import urlsplit
+from sqlalchemy.orm import Session
+from app import crud
+from app.config import settings
+from app.models import SiteBloqueado
+from app.utils.cache import TTLCache
+
+
+def _host(valor: str) -> str:
+    """Host em minúsculas, sem esquema, caminho, porta e pontos nas pontas."""
+    v = (valor or "").strip().lower()
+    if "://" in v:
+        v = urlsplit(v).hostname or ""
+    else:
+        v = v.split("/", 1)[0].split(":", 1)[0]
+    return v.strip(".")
+
+
+def normalizar_host(valor: str) -> tuple[str, bool]:
+    """
+    Converte uma URL/host cadastrado (regra) em (dominio, apenas_subdominios).
+    - "https://www.Bet365.com/x" -> ("bet365.com", False)
+    - "*.bet365.com"             -> ("bet365.com", True)
+    Um domínio simples casa com ele mesmo e com todos os subdomínios;
+    o curinga "*." casa apenas com os subdomínios. O "www." só é removido das
+    regras: no host consultado ele é um subdomínio como outro qualquer.
+    """
+    v = _host(valor)
+    apenas_subdominios = False
+    if v.startswith("*."):
+        apenas_subdominios = True
+        v = v[2:]
+    elif v.startswith("www."):
+        v = v[4:]
+    return v, apenas_subdominios
+
+
+class _No:
+    __slots__ = ("filhos", "regras")
+
+    def __init__(self):
+        self.filhos: dict[str, "_No"] = {}
+        # site_id -> (usuario_id, apenas_subdominios)
+        self.regras: dict[int, tuple[int, bool]] = {}
+
+
+class BlocklistMatcher:
+    """
+    Trie de domínios com labels invertidos ("www.bet365.com" -> com, bet365, www).
+    Cada consulta custa O(nº de labels do host), independente do tamanho da tabela.
+    """
+
+    def __init__(self):
+        self._raiz = _No()
+        self._por_site: dict[int, tuple[str, int, bool]] = {}
+        self._lock = threading.Lock()
+        self.carregado = False
+        self.versao = 0  # última versão do change log aplicada
+
+    def __len__(self) -> int:
+        return len(self._por_site)
+
+    # ---------- construção / atualização incremental ----------
+
+    def carregar(self, db: Session) -> None:
+        """Compila todos os SiteBloqueado (carga inicial, feita uma vez por processo)."""
+        with self._lock:
+            self._raiz = _No()
+            self._por_site = {}
+            self.versao = crud.get_blocklist_version(db)
+            rows = (
+                db.query(SiteBloqueado.id, SiteBloqueado.url, SiteBloqueado.usuario_id)
+                .yield_per(10_000)
+            )
+            for site_id, url, usuario_id in rows:
+                self._inserir(site_id, url, usuario_id)
+            self.carregado = True
+
+    def sincronizar(self, db: Session) -> None:
+        """
+        Aplica as mudanças do change log posteriores a self.versao. Mantém
+        consistentes os matchers de vários workers sem recarregar a tabela.
+        """
+        versao = crud.get_blocklist_version(db)
+        if versao == self.versao:
+            return
+        if versao < self.versao:
+            self.carregar(db)  # o change log andou para trás (banco restaurado)
+            return
+        mudancas = crud.list_site_changes_since(db, self.versao, 50_000)
+        if mudancas and mudancas[-1].id < versao:
+            self.carregar(db)  # atraso grande demais: recompila
+            return
+        with self._lock:
+            for m in mudancas:
+                self._remover(m.site_id)
+                if m.acao == "add":
+                    self._inserir(m.site_id, m.url, m.usuario_id)
+            self.versao = max(self.versao, versao)
+
+    def adicionar(self, site_id: int, url: str, usuario_id: int) -> None:
+        with self._lock:
+            self._remover(site_id)
+            self._inserir(site_id, url, usuario_id)
+
+    def remover(self, site_id: int) -> None:
+        with self._lock:
+            self._remover(site_id)
+
+    def _inserir(self, site_id: int, url: str, usuario_id: int) -> None:
+        dominio, apenas_sub = normalizar_host(url)
+        if not dominio:
+            return
+        no = self._raiz
+        for label in reversed(dominio.split(".")):
+            no = no.filhos.setdefault(label, _No())
+        no.regras[site_id] = (usuario_id, apenas_sub)
+        self._por_site[site_id] = (dominio, usuario_id, apenas_sub)
+
+    def _remover(self, site_id: int) -> None:
+        info = self._por_site.pop(site_id, None)
+        if not info:
+            return
+        caminho = [self._raiz]
+        for label in reversed(info[0].split(".")):
+            no = caminho[-1].filhos.get(label)
+            if no is None:
+                return
+            caminho.append(no)
+        caminho[-1].regras.pop(site_id, None)
+
+        # poda nós vazios de baixo para cima
+        labels = list(reversed(info[0].split(".")))
+        for i in range(len(caminho) - 1, 0, -1):
+            no = caminho[i]
+            if no.regras or no.filhos:
+                break
+            del caminho[i - 1].filhos[labels[i - 1]]
+
+    # ---------- consulta ----------
+
+    def match(self, host: str, donos: Collection[int] | None = None) -> tuple[int, str] | None:
+        """
+        Retorna (site_id, dominio) da regra mais específica que bloqueia o host,
+        ou None. Com `donos`, considera apenas as regras desses usuários.
+        """
+        dominio = _host(host)
+        if not dominio:
+            return None
+        labels = dominio.split(".")
+        no = self._raiz
+        achado = None
+        profundidade = 0
+        for label in reversed(labels):
+            no = no.filhos.get(label)
+            if no is None:
+                break
+            profundidade += 1
+            if not no.regras:
+                continue
+            exato = profundidade == len(labels)
+            for site_id, (dono, apenas_sub) in no.regras.items():
+                if donos is not None and dono not in donos:
+                    continue
+                if exato and apenas_sub:
+                    continue
+                achado = (site_id, ".".join(labels[-profundidade:]))
+                break
+        return achado
+
+
+matcher = BlocklistMatcher()
+
+# regras globais = as cadastradas pela conta ADMIN_EMAIL
+_dono_global = TTLCache(maxsize=1, ttl=300)
+
+
+def donos_visiveis(db: Session, usuario_id: int, apenas_meus: bool = False) -> set[int]:
+    """Regras que valem para o usuário: as dele e (salvo `apenas_meus`) as globais."""
+    donos = {usuario_id}
+    if apenas_meus:
+        return donos
+    admin_id = _dono_global.get("id")
+    if admin_id is None:
+        admin = crud.get_user_by_email(db, settings.ADMIN_EMAIL.lower().strip())
+        admin_id = admin.id if admin else 0
+        _dono_global.set("id", admin_id)
+    if admin_id:
+        donos.add(admin_id)
+    return donos
+
+
+def get_matcher(db: Session) -> BlocklistMatcher:
+    """Retorna o matcher do processo, compilando a tabela no primeiro uso."""
+    if not matcher.carregado:
+        matcher.carregar(db)
+    else:
+        matcher.sincronizar(db)
+    return matcher
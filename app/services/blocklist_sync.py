@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from sqlalchemy.orm import Session
+from app import crud
+from app.models import SiteBloqueado
+
+# acima disso o delta fica maior que o snapshot: o cliente deve recarregar tudo
+MAX_MUDANCAS_POR_SYNC = 5000
+
+
+def calcular_delta(db: Session, since: int, versao_atual: int | None = None) -> dict:
+    """
+    Mudanças desde a versão `since`, já compactadas por site (a última vence).
+    O custo é proporcional ao nº de mudanças, não ao tamanho da tabela.
+    Um `since` acima da versão do servidor (banco restaurado/recriado) não tem
+    delta possível: o cliente recebe reset e baixa o snapshot.
+    """
+    if versao_atual is None:
+        versao_atual = crud.get_blocklist_version(db)
+    if since <= 0 or since > versao_atual:
+        return {"versao": versao_atual, "reset": True, "adicionados": [], "removidos": []}
+
+    mudancas = crud.list_site_changes_since(db, since, MAX_MUDANCAS_POR_SYNC + 1)
+    if len(mudancas) > MAX_MUDANCAS_POR_SYNC:
+        return {"versao": crud.get_blocklist_version(db), "reset": True, "adicionados": [], "removidos": []}
+
+    ultimas = {}
+    for m in mudancas:
+        ultimas[m.site_id] = m
+
+    return {
+        "versao": mudancas[-1].id if mudancas else since,
+        "reset": False,
+        "adicionados": [
+            {"id": m.site_id, "url": m.url, "tipo": m.tipo}
+            for m in ultimas.values() if m.acao == "add"
+        ],
+        "removidos": [m.site_id for m in ultimas.values() if m.acao == "remove"],
+    }
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    versao: int
+    corpo: bytes       # JSON
+    corpo_gzip: bytes  # JSON comprimido (servido quando o cliente aceita gzip)
+    etag: str          # hash do conteúdo
+
+
+_snapshot: Snapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def obter_snapshot(db: Session) -> Snapshot:
+    """
+    Snapshot completo da blocklist para clientes "frios". É recompilado apenas
+    quando a versão muda; os demais pedidos servem os bytes já prontos.
+    """
+    global _snapshot
+    versao = crud.get_blocklist_version(db)
+    snap = _snapshot
+    if snap is not None and snap.versao == versao:
+        return snap
+
+    with _snapshot_lock:
+        snap = _snapshot
+        if snap is not None and snap.versao == versao:
+            return snap
+
+        # a versão é lida antes das linhas: se algo entrar no meio, o cliente
+        # recebe de novo no próximo sync (add/remove são idempotentes por id)
+        rows = (
+            db.query(SiteBloqueado.id, SiteBloqueado.url, SiteBloqueado.tipo)
+            .order_by(SiteBloqueado.id)
+            .all()
+        )
+        corpo = json.dumps(
+            {"versao": versao, "sites": [{"id": i, "url": u, "tipo": t} for i, u, t in rows]},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        snap = Snapshot(
+            versao=versao,
+            corpo=corpo,
+            corpo_gzip=gzip.compress(corpo, mtime=0),
+            etag=f'"{hashlib.sha256(corpo).hexdigest()[:32]}"',
+        )
+        _snapshot = snap
+        return snap
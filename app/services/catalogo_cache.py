@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from app import crud, schemas
+from app.config import settings
+from app.utils.json_rapido import dumps
+
+
+@dataclass(frozen=True)
+class Compilado:
+    corpo: bytes                     # JSON da lista de templates ativos
+    etag: str
+    valido_ate: datetime | None      # próximo starts_at/expires_at a virar; None = estável
+
+
+def _utc(momento: datetime | None) -> datetime | None:
+    if momento is not None and momento.tzinfo is None:  # SQLite devolve sem fuso
+        return momento.replace(tzinfo=timezone.utc)
+    return momento
+
+
+def compilar(templates: list[dict], agora: datetime) -> Compilado:
+    """
+    Mesmo filtro/ordem de list_active_templates, em memória. Também acha o
+    próximo instante em que algum template entra ou sai do catálogo.
+    """
+    ativos, proxima = [], None
+    for t in templates:
+        inicio, fim = t["starts_at"], t["expires_at"]
+        if inicio is not None and inicio > agora:
+            proxima = inicio if proxima is None else min(proxima, inicio)
+            continue
+        if fim is not None and fim < agora:
+            continue
+        if fim is not None:
+            proxima = fim if proxima is None else min(proxima, fim)
+        ativos.append(t)
+    campos = list(schemas.ChallengeTemplateOut.model_fields)
+    corpo = dumps([{c: t[c] for c in campos} for t in ativos])
+    return Compilado(corpo=corpo, etag=f'"catalogo-{hashlib.sha256(corpo).hexdigest()[:32]}"', valido_ate=proxima)
+
+
+class CatalogoCache:
+    """
+    Catálogo de desafios servido da memória. A tabela inteira (pequena) fica
+    carregada; a lista ativa é recompilada sem ir ao banco quando passa o
+    próximo starts_at/expires_at. Alterações em outros workers são percebidas
+    por uma assinatura barata (count + max(updated_at)) conferida no máximo a
+    cada `revalidar_s`; no próprio worker, `invalidar()` vale na hora.
+    """
+
+    def __init__(self, revalidar_s: float):
+        self.revalidar_s = revalidar_s
+        self._lock = threading.Lock()
+        self._templates: list[dict] | None = None
+        self._assinatura = None
+        self._compilado: Compilado | None = None
+        self._conferir_em = 0.0
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._templates = None
+            self._compilado = None
+
+    def obter(self, db: Session) -> Compilado:
+        agora = datetime.now(timezone.utc)
+        with self._lock:
+            if self._templates is not None and time.monotonic() >= self._conferir_em:
+                if crud.get_catalog_assinatura(db) != self._assinatura:
+                    self._templates = None
+                self._conferir_em = time.monotonic() + self.revalidar_s
+            if self._templates is None:
+                self._assinatura = crud.get_catalog_assinatura(db)
+                self._templates = [
+                    {**t, "starts_at": _utc(t["starts_at"]), "expires_at": _utc(t["expires_at"])}
+                    for t in crud.list_all_templates(db)
+                ]
+                self._conferir_em = time.monotonic() + self.revalidar_s
+                self._compilado = None
+            c = self._compilado
+            if c is None or (c.valido_ate is not None and agora >= c.valido_ate):
+                c = self._compilado = compilar(self._templates, agora)
+            return c
+
+    def max_age(self, c: Compilado) -> int:
+        """Cache-Control: nunca além da próxima transição nem da janela de revalidação."""
+        segundos = self.revalidar_s
+        if c.valido_ate is not None:
+            segundos = min(segundos, (c.valido_ate - datetime.now(timezone.utc)).total_seconds())
+        return max(0, int(segundos))
+
+
+catalogo_cache = CatalogoCache(revalidar_s=settings.CATALOGO_REVALIDAR_SEGUNDOS)
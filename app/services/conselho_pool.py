@@ -0,0 +1,101 @@
+import asyncio
+import random
+from app.config import settings
+from app.utils.ai_utils import gerar_conselho_emergencial
+from app.utils.cache import TTLCache
+
+# usados até o primeiro reabastecimento (e se a IA estiver fora do ar)
+CONSELHOS_PADRAO = [
+    {
+        "mensagem_apoio": "Essa vontade é forte agora, mas ela passa. Você já chegou até aqui e merece continuar.",
+        "dica_rapida": "Afaste-se do celular por 10 minutos: beba um copo de água e respire fundo 5 vezes.",
+    },
+    {
+        "mensagem_apoio": "Pedir ajuda é um sinal de força. Você não está sozinho nesse momento.",
+        "dica_rapida": "Ligue ou mande mensagem para alguém de confiança e conte como está se sentindo.",
+    },
+    {
+        "mensagem_apoio": "Lembre do motivo pelo qual você decidiu parar. Ele continua valendo.",
+        "dica_rapida": "Anote quanto você já economizou e o que pretende fazer com esse dinheiro.",
+    },
+    {
+        "mensagem_apoio": "Uma recaída não apaga o seu progresso, mas resistir agora fortalece cada dia seguinte.",
+        "dica_rapida": "Saia do ambiente em que está: uma caminhada curta ajuda a impulsão a diminuir.",
+    },
+    {
+        "mensagem_apoio": "A urgência costuma durar poucos minutos. Você consegue atravessar esses minutos.",
+        "dica_rapida": "Conte de 100 até 0 de 7 em 7 — ocupar a mente quebra o ciclo da vontade.",
+    },
+]
+
+
+class ConselhoPool:
+    """
+    Pool rotativo de pares (mensagem_apoio, dica_rapida) servidos da memória em
+    O(1). A IA só é chamada em segundo plano para reabastecer o pool; o botão de
+    pânico nunca espera pela rede.
+    """
+
+    def __init__(self, tamanho_max: int, lote: int, intervalo_s: float):
+        self.tamanho_max = tamanho_max
+        self.lote = lote
+        self.intervalo_s = intervalo_s
+        self._itens: list[dict] = list(CONSELHOS_PADRAO)
+        self._slot = 0  # próxima posição a sobrescrever quando o pool estiver cheio
+        # usuario_id -> próximo índice: cada usuário percorre o pool sem repetir
+        self._cursores = TTLCache(maxsize=50_000, ttl=24 * 3600)
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def proximo(self, usuario_id: int) -> dict:
+        cursor = self._cursores.get(usuario_id)
+        if cursor is None:
+            cursor = random.randrange(len(self._itens))
+        self._cursores.set(usuario_id, cursor + 1)
+        return self._itens[cursor % len(self._itens)]
+
+    def adicionar(self, item: dict) -> None:
+        if not item.get("mensagem_apoio"):
+            return
+        if len(self._itens) < self.tamanho_max:
+            self._itens.append(item)
+        else:
+            self._itens[self._slot] = item
+            self._slot = (self._slot + 1) % self.tamanho_max
+
+    async def iniciar(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def parar(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            resultados = await asyncio.gather(
+                *(gerar_conselho_emergencial() for _ in range(self.lote)),
+                return_exceptions=True,
+            )
+            falhas = 0
+            for r in resultados:
+                if isinstance(r, Exception):
+                    falhas += 1
+                else:
+                    self.adicionar(r)
+            if falhas:
+                print(f"[conselhos] {falhas}/{self.lote} gerações falharam; pool com {len(self)} itens")
+            await asyncio.sleep(self.intervalo_s)
+
+
+conselho_pool = ConselhoPool(
+    tamanho_max=settings.CONSELHO_POOL_MAX,
+    lote=settings.CONSELHO_POOL_LOTE,
+    intervalo_s=settings.CONSELHO_POOL_INTERVALO_SEGUNDOS,
+)
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from sqlalchemy import Date, and_, case, cast, func, select, update
+from app import models
+
+# Progresso de cada tipo de desafio ativo, a partir dos baselines gravados no start:
+#   streak   -> dias de streak ganhos desde o início (streak atual - baseline_streak_days)
+#   money    -> dias com check-in desde o início x baseline_money (gasto por dia)
+#   time_min -> dias com check-in desde o início x baseline_time_min (minutos por dia)
+# progress_value fica gravado em user_challenges e é atualizado nos eventos de
+# streak (check-in, reset, expiração), sem reler o histórico.
+
+
+def _progresso(streak_atual, dias):
+    UC = models.UserChallenge
+    return case(
+        (UC.target_type == "streak", case((streak_atual > func.coalesce(UC.baseline_streak_days, 0),
+                                           streak_atual - func.coalesce(UC.baseline_streak_days, 0)), else_=0)),
+        (UC.target_type == "money", dias * func.coalesce(UC.baseline_money, 0)),
+        else_=dias * func.coalesce(UC.baseline_time_min, 0),
+    )
+
+
+def _aplicar(stmt, streak_atual, dias, agora: datetime):
+    """SET de progresso + conclusão automática quando a meta é atingida (tudo sobre os valores antigos)."""
+    UC = models.UserChallenge
+    progresso = _progresso(streak_atual, dias)
+    atingiu = progresso >= UC.target_value
+    return stmt.values(
+        dias_checkin=dias,
+        progress_value=progresso,
+        status=case((atingiu, "completed"), else_=UC.status),
+        completed_at=case((atingiu, agora), else_=UC.completed_at),
+    ).execution_options(synchronize_session=False)
+
+
+def no_checkin(usuario_id: int, streak_atual: int):
+    """Primeiro check-in do dia: +1 dia em todos os desafios ativos do usuário."""
+    UC = models.UserChallenge
+    stmt = update(UC).where(UC.user_id == usuario_id, UC.status == "active")
+    return _aplicar(stmt, streak_atual, UC.dias_checkin + 1, datetime.now(timezone.utc))
+
+
+def streak_zerada(usuario_ids: list[int]):
+    """Reset/expiração: desafios de streak voltam a 0 (os de dinheiro/tempo guardam os dias já feitos)."""
+    UC = models.UserChallenge
+    return (
+        update(UC)
+        .where(UC.user_id.in_(usuario_ids), UC.status == "active", UC.target_type == "streak")
+        .values(progress_value=0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recalcular(dialeto: str, streak_sql, usuario_id: int | None = None):
+    """
+    Recalcula todos os desafios ativos (ou os de um usuário) direto das tabelas
+    checkins e usuarios, com subqueries correlacionadas: um UPDATE só.
+    `streak_sql`: expressão dos dias de streak atuais sobre models.Usuario.
+    """
+    UC, C, U = models.UserChallenge, models.Checkin, models.Usuario
+    inicio = func.date(UC.started_at) if dialeto == "sqlite" else cast(UC.started_at, Date)
+    dias = (
+        select(func.count(C.id))
+        .where(and_(C.usuario_id == UC.user_id, C.dia >= inicio))
+        .scalar_subquery()
+    )
+    streak_atual = select(streak_sql).where(U.id == UC.user_id).scalar_subquery()
+    stmt = update(UC).where(UC.status == "active")
+    if usuario_id is not None:
+        stmt = stmt.where(UC.user_id == usuario_id)
+    return _aplicar(stmt, streak_atual, dias, datetime.now(timezone.utc))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from anyio import to_thread
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.services import ai_gateway
+from app.services.diario_service import analisar_diario
+from app.services.semantic_cache import cache_diario
+from app.utils.structured_output import RESPONSE_FORMAT_ANALISES_LOTE, parse_analises_lote
+from app.utils.tarefas import encerrar, esperar_evento
+
+PROMPT_LOTE = (
+    "Você é uma IA conselheira emocional. Abaixo há desabafos de usuários em recuperação "
+    "do vício em apostas, cada um com um id.\n"
+    "Para cada desabafo, identifique o principal sentimento (seja direto, como: Tristeza, "
+    "Ansiedade, Raiva, Esperança, etc.) e escreva uma resposta empática e motivadora, "
+    "como se você fosse um terapeuta gentil.\n"
+    'Responda apenas com JSON no formato {"analises": [{"id": <id>, "sentimento": "...", "resposta": "..."}]}.\n\n'
+)
+
+
+class DiarioEnriquecedor:
+    """
+    Worker que reprocessa em lote os diários gravados com sentimento provisório:
+    um único prompt por lote, e o resultado preenche sentimento/resposta.
+    Lote de um item só vai pelo prompt individual em stream (analisar_diario),
+    que aproveita a resposta parcial se a conexão cair.
+    """
+
+    def __init__(self, lote_max: int, max_tentativas: int, intervalo_s: float = 5.0, backoff_s: float = 30.0):
+        self.lote_max = lote_max
+        self.max_tentativas = max_tentativas
+        self.intervalo_s = intervalo_s
+        self.backoff_s = backoff_s
+        self._acordar: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._parando = False
+        # diario_id -> evento disparado quando a análise termina (long-poll)
+        self._eventos: dict[int, asyncio.Event] = {}
+
+    async def iniciar(self) -> None:
+        self._acordar = asyncio.Event()
+        self._parando = False
+        self._task = asyncio.create_task(self._loop(), name="diario_enriquecedor")
+
+    async def parar(self) -> None:
+        """Sinaliza a parada; o lote em andamento termina (ou volta à fila pelo lease)."""
+        if not self._task:
+            return
+        self._parando = True
+        self._acordar.set()
+        await encerrar(self._task)
+        self._task = None
+
+    def notificar(self) -> None:
+        if self._acordar is not None:
+            self._acordar.set()
+
+    async def aguardar(self, diario_id: int, timeout: float) -> None:
+        """Espera (até `timeout`) a análise deste diário terminar neste processo."""
+        evento = self._eventos.setdefault(diario_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(evento.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _avisar(self, diario_id: int) -> None:
+        evento = self._eventos.pop(diario_id, None)
+        if evento:
+            evento.set()
+
+    async def _loop(self) -> None:
+        while not self._parando:
+            self._acordar.clear()
+            try:
+                lote = await to_thread.run_sync(_reservar, self.lote_max)
+            except Exception as e:
+                print(f"[diario] erro ao ler pendentes: {e}")
+                lote = []
+            if not lote:
+                await esperar_evento(self._acordar, self.intervalo_s)
+                continue
+            await self._processar(lote)
+
+    async def _processar(self, lote: list[dict]) -> None:
+        try:
+            analises = await self._analisar(lote)
+        except Exception as e:
+            print(f"[diario] falha ao analisar lote de {len(lote)}: {e}")
+            analises = {}
+
+        resultados = [(d, *analises.get(d["id"], (None, None))) for d in lote]
+        await to_thread.run_sync(self._gravar, resultados)
+        for d, _, _ in resultados:
+            self._avisar(d["id"])
+
+    async def _analisar(self, lote: list[dict]) -> dict[int, tuple[str, str]]:
+        if len(lote) == 1:
+            d = lote[0]
+            # o cache já foi consultado na criação (ou ignorado a pedido do usuário)
+            sentimento, resposta = await analisar_diario(d["texto"], usar_cache=False)
+            return {d["id"]: (sentimento, resposta)} if resposta else {}
+        entradas = json.dumps([{"id": d["id"], "texto": d["texto"]} for d in lote], ensure_ascii=False)
+        conteudo = await ai_gateway.completar(
+            settings.OPENAI_MODEL_DIARIO,
+            [{"role": "user", "content": PROMPT_LOTE + entradas}],
+            temperature=0.7,
+            max_tokens=350 * len(lote),
+            response_format=RESPONSE_FORMAT_ANALISES_LOTE,
+        )
+        return parse_analises_lote(conteudo)
+
+    def _gravar(self, resultados: list[tuple]) -> None:
+        db = SessionLocal()
+        try:
+            for d, sentimento, resposta in resultados:
+                if sentimento:
+                    crud.concluir_analise_diario(db, d["id"], sentimento, resposta)
+                    cache_diario.set(d["texto"], (sentimento, resposta))
+                    continue
+                tentativas = d["tentativas"] + 1
+                proxima = None
+                if tentativas < self.max_tentativas:
+                    proxima = datetime.now(timezone.utc) + timedelta(seconds=self.backoff_s * 2 ** (tentativas - 1))
+                crud.falhar_analise_diario(db, d["id"], proxima)
+        finally:
+            db.close()
+
+
+def _reservar(limit: int) -> list[dict]:
+    db = SessionLocal()
+    try:
+        return crud.claim_diarios_pendentes(db, limit)
+    finally:
+        db.close()
+
+
+diario_enriquecedor = DiarioEnriquecedor(
+    lote_max=settings.DIARIO_LOTE_MAX,
+    max_tentativas=settings.DIARIO_MAX_TENTATIVAS,
+)
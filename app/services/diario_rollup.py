@@ -0,0 +1,58 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import update
+from app import models
+from app.database import INSERT_POR_DIALETO
+from app.services.sentimento_local import NEUTRO
+
+GRANULARIDADES = ("day", "week")
+
+
+def periodo(data: datetime | date, granularidade: str) -> date:
+    """Chave do período: a data UTC (day) ou a segunda-feira da semana (week)."""
+    if isinstance(data, datetime):
+        data = data.astimezone(timezone.utc).date() if data.tzinfo else data.date()
+    if granularidade == "week":
+        return data - timedelta(days=data.weekday())
+    return data
+
+
+def comandos(dialeto: str, usuario_id: int, data: datetime, sentimento: str | None, delta: int) -> list:
+    """
+    Statements que somam `delta` ao contador do sentimento nos dois períodos.
+    Incremento é upsert (ON CONFLICT); decremento é só UPDATE, nunca cria linha.
+    """
+    R = models.DiarioSentimentoRollup
+    sentimento = sentimento or NEUTRO
+    insert = INSERT_POR_DIALETO[dialeto]
+    stmts = []
+    for g in GRANULARIDADES:
+        chave = dict(usuario_id=usuario_id, granularidade=g, periodo=periodo(data, g), sentimento=sentimento)
+        if delta > 0:
+            stmts.append(
+                insert(R).values(**chave, total=delta).on_conflict_do_update(
+                    index_elements=["usuario_id", "granularidade", "periodo", "sentimento"],
+                    set_={"total": R.total + delta},
+                )
+            )
+        else:
+            stmts.append(
+                update(R)
+                .where(*(getattr(R, k) == v for k, v in chave.items()))
+                .values(total=R.total + delta)
+            )
+    return stmts
+
+
+def agregar(linhas) -> list[dict]:
+    """(usuario_id, dia, sentimento, total) já agrupados por dia -> linhas day + week do rollup."""
+    contagem: dict[tuple, int] = defaultdict(int)
+    for usuario_id, dia, sentimento, total in linhas:
+        if isinstance(dia, str):  # SQLite devolve date() como texto
+            dia = date.fromisoformat(dia[:10])
+        for g in GRANULARIDADES:
+            contagem[(usuario_id, g, periodo(dia, g), sentimento or NEUTRO)] += total
+    return [
+        dict(usuario_id=u, granularidade=g, periodo=p, sentimento=s, total=t)
+        for (u, g, p, s), t in contagem.items()
+    ]
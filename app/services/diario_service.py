@@ -1,30 +1,43 @@
-from openai import OpenAI
 from fastapi import HTTPException
 from app.config import settings
-from anyio import to_thread
+from app.services import ai_gateway
+from app.services.semantic_cache import cache_diario
+from app.utils.structured_output import ParserIncremental, RESPONSE_FORMAT_ANALISE
 
-def _get_client() -> OpenAI:
-    return OpenAI(api_key=settings.openai_api_key)
+async def analisar_diario(texto: str, usar_cache: bool = True) -> tuple[str, str]:
+    if usar_cache:
+        em_cache = cache_diario.get(texto)
+        if em_cache is not None:
+            return em_cache
 
-async def analisar_diario(texto: str) -> tuple[str, str]:
     prompt = (
         f"Você é uma IA conselheira emocional. O usuário escreveu o seguinte desabafo:\n\n"
         f"{texto}\n\n"
-        f"1. Qual é o principal sentimento nesse texto? Seja direto, como: Tristeza, Ansiedade, Raiva, Esperança, etc.\n"
-        f"2. Responda de forma empática e motivadora, como se você fosse um terapeuta gentil."
+        f"Identifique o principal sentimento nesse texto e responda de forma empática e motivadora, "
+        f"como se você fosse um terapeuta gentil. "
+        f'Responda em JSON: {{"sentimento": "...", "resposta": "..."}}.'
     )
 
+    # stream + parser incremental: se a conexão cair depois do sentimento,
+    # ficamos com o que já chegou em vez de pagar outra chamada
+    parser = ParserIncremental(texto)
     try:
-        client = _get_client()
-        resposta = await to_thread.run_sync(lambda: client.chat.completions.create(
-        model=settings.OPENAI_MODEL_DIARIO,  
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-    ))
-        
-        partes = resposta.choices[0].message.content.split("\n", 1)
-        sentimento = partes[0].strip().replace("1. ", "")
-        resposta_ia = partes[1].strip().replace("2. ", "")
-        return sentimento, resposta_ia
+        async for pedaco in ai_gateway.completar_stream(
+            settings.OPENAI_MODEL_DIARIO,
+            [{"role": "user", "content": prompt}],
+            temperature=0.7,
+            response_format=RESPONSE_FORMAT_ANALISE,
+        ):
+            parser.feed(pedaco)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao analisar diário: {str(e)}")
+        if parser.sentimento is None:
+            raise HTTPException(status_code=500, detail=f"Erro ao analisar diário: {str(e)}")
+        print(f"[diario] stream interrompido, usando resposta parcial: {e}")
+        return parser.resultado()
+
+    sentimento, resposta_ia = parser.resultado()
+    if resposta_ia:
+        cache_diario.set(texto, (sentimento, resposta_ia))
+    return sentimento, resposta_ia
@@ -1,11 +1,25 @@
+from anyio import to_thread
 from app.models import Usuario
-from fastapi_mail import MessageSchema, FastMail
-from app.core.security import get_mail_config
 from sqlalchemy.orm import Session
+from app import crud
 from app.config import settings
+from app.database import SessionLocal
+from app.services.mail_worker import mail_worker
 
 APP_BASE_URL = getattr(settings, "APP_BASE_URL", "http://127.0.0.1:8000")
 
+def _gravar_outbox(destinatarios: list[str], assunto: str, corpo: str) -> None:
+    db = SessionLocal()
+    try:
+        crud.enqueue_email(db, destinatarios, assunto, corpo)
+    finally:
+        db.close()
+
+async def _enfileirar(destinatarios: list[str], assunto: str, corpo: str) -> None:
+    """Grava o e-mail na outbox; o envio fica a cargo do mail_worker."""
+    await to_thread.run_sync(_gravar_outbox, destinatarios, assunto, corpo)
+    mail_worker.notificar()
+
 async def send_email_alert(db: Session, tentativa):
     usuario = db.query(Usuario).filter(Usuario.id == tentativa.usuario_id).first()
     if not usuario:
@@ -25,17 +39,24 @@ async def send_email_alert(db: Session, tentativa):
     Data/Hora: {tentativa.data_hora}
     """
 
-    mail_config = get_mail_config()
+    await _enfileirar([email_destino], assunto, corpo)
+
+async def send_email_digest(email: str, nome: str, itens: list[tuple[str, int]], total: int, ultima):
+    assunto = f"{total} tentativa(s) de acesso bloqueada(s)"
+    linhas = "\n".join(f"    - {url}: {n} tentativa(s)" for url, n in itens)
+    corpo = f"""
+    Olá {nome},
+
+    Foram detectadas {total} tentativas de acesso a sites bloqueados no seu dispositivo:
 
-    message = MessageSchema(
-        subject=assunto,
-        recipients=[email_destino],
-        body=corpo,
-        subtype="plain"
-    )
+{linhas}
 
-    fastmail = FastMail(mail_config)
-    await fastmail.send_message(message)
+    Se você não reconhece essas tentativas, recomendamos verificar suas configurações de segurança.
+
+    Última tentativa: {ultima}
+    """
+
+    await _enfileirar([email], assunto, corpo)
 
 async def send_email_notificacao(email: str, nome: str, mensagem: str):
     assunto = "Notificação da sua conta"
@@ -47,17 +68,20 @@ async def send_email_notificacao(email: str, nome: str, mensagem: str):
     Se não foi você, entre em contato com o suporte.
     """
 
-    mail_config = get_mail_config()
+    await _enfileirar([email], assunto, corpo)
 
-    message = MessageSchema(
-        subject=assunto,
-        recipients=[email],
-        body=corpo,
-        subtype="plain"
-    )
+async def send_email_gatilho(email: str, nome: str, nome_gatilho: str, hora_inicio):
+    assunto = f"Atenção: começou o seu horário de risco \"{nome_gatilho}\""
+    corpo = f"""
+    Olá {nome},
 
-    fastmail = FastMail(mail_config)
-    await fastmail.send_message(message)
+    Você marcou o período \"{nome_gatilho}\" (a partir das {hora_inicio:%H:%M}) como um momento de risco.
+
+    Lembre-se do seu plano: afaste-se das apostas, converse com alguém de confiança
+    e, se a vontade apertar, use o botão de emergência no app.
+    """
+
+    await _enfileirar([email], assunto, corpo)
 
 async def send_email_emergencia(nomes_email: list[str], nome_usuario: str):
     assunto = "Emergência - Ajuda solicitada"
@@ -71,16 +95,7 @@ async def send_email_emergencia(nomes_email: list[str], nome_usuario: str):
     Esta é uma mensagem automática.
     """
 
-    mail_config = get_mail_config()
-    message = MessageSchema(
-        subject=assunto,
-        recipients=nomes_email,
-        body=corpo,
-        subtype="plain"
-    )
-
-    fastmail = FastMail(mail_config)
-    await fastmail.send_message(message)
+    await _enfileirar(nomes_email, assunto, corpo)
 
 async def send_email_verification_code(email: str, nome: str, code: str, minutes_valid: int = 15):
     assunto = "Código de verificação de e-mail"
@@ -92,10 +107,7 @@ async def send_email_verification_code(email: str, nome: str, code: str, minutes
 
     Se não foi você, ignore este e-mail.
     """
-    mail_config = get_mail_config()
-    message = MessageSchema(subject=assunto, recipients=[email], body=corpo, subtype="plain")
-    fastmail = FastMail(mail_config)
-    await fastmail.send_message(message)
+    await _enfileirar([email], assunto, corpo)
 
 async def send_password_reset_code(email: str, nome: str, code: str, minutes_valid: int = 15):
     assunto = "Código para redefinição de senha"
@@ -107,7 +119,4 @@ async def send_password_reset_code(email: str, nome: str, code: str, minutes_val
 
     Se não foi você, ignore este e-mail.
     """
-    mail_config = get_mail_config()
-    message = MessageSchema(subject=assunto, recipients=[email], body=corpo, subtype="plain")
-    fastmail = FastMail(mail_config)
-    await fastmail.send_message(message)
\ No newline at end of file
+    await _enfileirar([email], assunto, corpo)
\ No newline at end of file
@@ -1,20 +1,19 @@
 from datetime import datetime
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import BackgroundTasks
-from app.models import Usuario, EmergenciaContato
+from app import crud_async
+from app.models import Usuario
 from app.services.email_service import send_email_emergencia
+from app.services.conselho_pool import conselho_pool
 
 async def lidar_emergencia(
-    db: Session,
+    db: AsyncSession,
     usuario: Usuario,
     background_tasks: BackgroundTasks | None = None,
 ) -> dict:
     emails: List[str] = [
-        c.email
-        for c in db.query(EmergenciaContato)
-                   .filter(EmergenciaContato.usuario_id == usuario.id)
-                   .all()
+        c.email for c in await crud_async.list_contatos_emergencia(db, usuario.id)
     ]
 
     if not emails:
@@ -22,6 +21,7 @@ async def lidar_emergencia(
             "mensagem": "Nenhum contato emergencial cadastrado.",
             "enviado_para": [],
             "data_hora": datetime.utcnow(),
+            "conselho": conselho_pool.proximo(usuario.id),
         }
 
     if background_tasks:
@@ -33,4 +33,5 @@ async def lidar_emergencia(
         "mensagem": "Alerta enviado com sucesso.",
         "enviado_para": emails,
         "data_hora": datetime.utcnow(),
+        "conselho": conselho_pool.proximo(usuario.id),
     }
@@ -0,0 +1,74 @@
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+# nenhuma janela passa de 24h: "intervalos que contêm o minuto m" vira o
+# range scan inicio em (m - DURACAO_MAX, m] no índice
+DURACAO_MAX = MINUTOS_DIA
+TODOS_OS_DIAS = 0b1111111
+FUSO_PADRAO = "America/Sao_Paulo"
+
+
+def mascara(dias: list[int]) -> int:
+    """[0, 2, 6] -> bit 0 = Seg ... bit 6 = Dom. Lista vazia = todos os dias."""
+    m = 0
+    for d in dias or []:
+        if 0 <= d <= 6:
+            m |= 1 << d
+    return m or TODOS_OS_DIAS
+
+
+def dias_da_mascara(m: int) -> list[int]:
+    if m == TODOS_OS_DIAS:
+        return []
+    return [d for d in range(7) if m & (1 << d)]
+
+
+def _minuto(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def intervalos(dias_mask: int, hora_inicio: time, hora_fim: time) -> list[tuple[int, int]]:
+    """
+    Janelas [inicio, fim) em minutos da semana (0 = Seg 00:00, hora local).
+    hora_fim é inclusiva (20:00-23:59 cobre o minuto 23:59); se hora_fim < hora_inicio
+    a janela vira a noite, e a de domingo é quebrada em duas na virada da semana.
+    """
+    ini, fim = _minuto(hora_inicio), _minuto(hora_fim) + 1
+    if fim <= ini:
+        fim += MINUTOS_DIA
+    resultado = []
+    for d in range(7):
+        if not dias_mask & (1 << d):
+            continue
+        a, b = d * MINUTOS_DIA + ini, d * MINUTOS_DIA + fim
+        if b > MINUTOS_SEMANA:
+            resultado.append((a, MINUTOS_SEMANA))
+            resultado.append((0, b - MINUTOS_SEMANA))
+        else:
+            resultado.append((a, b))
+    return resultado
+
+
+def fuso(nome: str | None) -> ZoneInfo:
+    try:
+        return ZoneInfo(nome or FUSO_PADRAO)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(FUSO_PADRAO)
+
+
+def fuso_valido(nome: str) -> bool:
+    try:
+        ZoneInfo(nome)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def minuto_da_semana(momento: datetime, nome_fuso: str | None) -> int:
+    """Minuto da semana no fuso do usuário para um instante (aware, ou naive = UTC)."""
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    local = momento.astimezone(fuso(nome_fuso))
+    return local.weekday() * MINUTOS_DIA + local.hour * 60 + local.minute
@@ -0,0 +1,294 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, time, timedelta, timezone
+from typing import Awaitable, Callable
+from anyio import to_thread
+from sqlalchemy import text
+from app import crud
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.services import gatilho_agenda
+from app.services.email_service import send_email_gatilho
+from app.utils.tarefas import encerrar, esperar_evento
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, cada processo se considera líder
+    fcntl = None
+
+_CHAVE_ADVISORY = 0x67617431       # pg_try_advisory_lock: constante própria deste agendador
+_TOLERANCIA = timedelta(minutes=5)  # aviso atrasado mais que isso (app fora do ar) é pulado
+_SOBREPOSICAO = timedelta(seconds=60)  # releitura de alterações p/ não perder commits lentos
+
+Sink = Callable[[dict], Awaitable[None]]
+
+
+class LockLider:
+    """
+    Um único dono entre os workers do uvicorn: advisory lock de sessão no
+    Postgres (vale entre máquinas) ou flock num arquivo local nos demais bancos.
+    Cada tarefa usa sua própria chave/arquivo.
+    """
+
+    def __init__(self, caminho: str, chave: int = _CHAVE_ADVISORY):
+        self.caminho = caminho
+        self.chave = chave
+        self._conexao = None
+        self._arquivo = None
+
+    def tentar(self) -> bool:
+        if engine.dialect.name == "postgresql":
+            conexao = engine.connect()
+            ok = conexao.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": self.chave}).scalar()
+            conexao.commit()
+            if not ok:
+                conexao.close()
+                return False
+            self._conexao = conexao  # o lock vive enquanto esta conexão estiver aberta
+            return True
+        if fcntl is None:
+            return True
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, "a+")
+        try:
+            fcntl.flock(self._arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def ainda_lider(self) -> bool:
+        """No Postgres, conexão caída = lock perdido."""
+        if self._conexao is None:
+            return True
+        try:
+            self._conexao.execute(text("SELECT 1"))
+            self._conexao.commit()
+            return True
+        except Exception:
+            self._conexao = None
+            return False
+
+    def liberar(self) -> None:
+        if self._conexao is not None:
+            try:
+                self._conexao.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self.chave})
+                self._conexao.commit()
+            finally:
+                self._conexao.close()
+                self._conexao = None
+        if self._arquivo is not None:
+            if fcntl is not None:
+                fcntl.flock(self._arquivo, fcntl.LOCK_UN)
+            self._arquivo.close()
+            self._arquivo = None
+
+
+def proxima_ativacao(dias_mask: int | None, hora_inicio: time, fuso: str | None, depois_de: datetime) -> datetime | None:
+    """Próximo início de janela (UTC) estritamente depois de `depois_de`, no fuso do usuário."""
+    tz = gatilho_agenda.fuso(fuso)
+    local = depois_de.astimezone(tz)
+    mask = dias_mask or gatilho_agenda.TODOS_OS_DIAS
+    for i in range(8):
+        dia = local.date() + timedelta(days=i)
+        if not mask & (1 << dia.weekday()):
+            continue
+        inicio = datetime.combine(dia, hora_inicio.replace(tzinfo=None), tzinfo=tz)
+        if inicio > local:
+            return inicio.astimezone(timezone.utc)
+    return None
+
+
+async def _sink_email(aviso: dict) -> None:
+    await send_email_gatilho(aviso["email"], aviso["usuario_nome"], aviso["nome"], aviso["hora_inicio"])
+
+
+class GatilhoScheduler:
+    """
+    Dispara um aviso no início de cada janela de gatilho ativa.
+
+    Heap de (instante UTC, seq, gatilho_id): o loop dorme até o topo, sem varrer
+    a tabela. Reagendar é um push O(log n) com seq nova; a entrada antiga fica
+    no heap e é descartada quando sai (seq diferente de `_seq_atual`).
+    Só o líder (LockLider) mantém o heap; os demais workers ficam em espera.
+    """
+
+    def __init__(self, sync_s: float, lock_arquivo: str):
+        self.sync_s = sync_s
+        self.lider = False
+        self._lock = LockLider(lock_arquivo)
+        self._heap: list[tuple[datetime, int, int]] = []
+        self._seq = itertools.count()
+        self._seq_atual: dict[int, int] = {}  # gatilho_id -> seq válida
+        self._itens: dict[int, dict] = {}     # gatilho_id -> dados para reagendar
+        self._visto_ate: datetime | None = None
+        self._proximo_sync = 0.0
+        self._sync_pendente = False
+        self._sinks: list[Sink] = [_sink_email]
+        self._acordar: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._parando = False
+        self.stats = {"disparados": 0, "pulados": 0}
+
+    def registrar_sink(self, sink: Sink) -> None:
+        """Destino extra dos avisos (push, webhook...). Recebe o dict do aviso."""
+        self._sinks.append(sink)
+
+    async def iniciar(self) -> None:
+        self._acordar = asyncio.Event()
+        self._parando = False
+        self._task = asyncio.create_task(self._loop(), name="gatilho_scheduler")
+
+    async def parar(self) -> None:
+        if self._task:
+            self._parando = True
+            self._acordar.set()
+            await encerrar(self._task)
+            self._task = None
+        if self.lider:
+            await to_thread.run_sync(self._lock.liberar)
+            self.lider = False
+
+    def notificar(self) -> None:
+        """Gatilho criado/alterado neste processo: relê as alterações já."""
+        self._sync_pendente = True
+        if self._acordar is not None:
+            self._acordar.set()
+
+    def remover(self, gatilho_id: int) -> None:
+        self._seq_atual.pop(gatilho_id, None)
+        self._itens.pop(gatilho_id, None)
+
+    def agendar(self, item: dict, depois_de: datetime) -> None:
+        gatilho_id = item["id"]
+        if not item["ativo"]:
+            self.remover(gatilho_id)
+            return
+        instante = proxima_ativacao(item["dias_mask"], item["hora_inicio"], item["fuso_horario"], depois_de)
+        if instante is None:
+            self.remover(gatilho_id)
+            return
+        seq = next(self._seq)
+        self._seq_atual[gatilho_id] = seq
+        self._itens[gatilho_id] = item
+        heapq.heappush(self._heap, (instante, seq, gatilho_id))
+        if len(self._heap) > 2 * len(self._seq_atual) + 1000:
+            self._compactar()
+
+    def _compactar(self) -> None:
+        self._heap = [e for e in self._heap if self._seq_atual.get(e[2]) == e[1]]
+        heapq.heapify(self._heap)
+
+    def pendentes(self) -> int:
+        return len(self._seq_atual)
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._parando:
+            self._acordar.clear()  # notificações a partir daqui encurtam o próximo sono
+            try:
+                if not self.lider:
+                    self.lider = await to_thread.run_sync(self._lock.tentar)
+                    if not self.lider:
+                        await self._dormir(self.sync_s * 2)
+                        continue
+                    print("[gatilhos] este worker é o agendador de avisos")
+                    self._visto_ate = None
+                if self._sync_pendente or loop.time() >= self._proximo_sync:
+                    if not await to_thread.run_sync(self._lock.ainda_lider):
+                        self._resetar()
+                        continue
+                    await self._sincronizar()
+                    self._sync_pendente = False
+                    self._proximo_sync = loop.time() + self.sync_s
+                await self._disparar_vencidos()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[gatilhos] erro no agendador: {e}")
+            espera = self._proximo_sync - loop.time()
+            if self._heap:
+                espera = min(espera, (self._heap[0][0] - datetime.now(timezone.utc)).total_seconds())
+            await self._dormir(max(espera, 0.05))
+
+    async def _dormir(self, segundos: float) -> None:
+        await esperar_evento(self._acordar, segundos)
+
+    def _resetar(self) -> None:
+        self.lider = False
+        self._heap.clear()
+        self._seq_atual.clear()
+        self._itens.clear()
+        self._visto_ate = None
+
+    async def _sincronizar(self) -> None:
+        """Primeira vez: carga completa. Depois: só gatilhos com atualizado_em recente."""
+        desde = self._visto_ate - _SOBREPOSICAO if self._visto_ate else None
+        itens = await to_thread.run_sync(_ler_agenda, desde)
+        agora = datetime.now(timezone.utc)
+        for item in itens:
+            self.agendar(item, agora)
+            alterado = item["atualizado_em"]
+            if alterado.tzinfo is None:  # SQLite devolve sem fuso
+                alterado = alterado.replace(tzinfo=timezone.utc)
+            if self._visto_ate is None or alterado > self._visto_ate:
+                self._visto_ate = alterado
+        if self._visto_ate is None:
+            self._visto_ate = agora
+
+    async def _disparar_vencidos(self) -> None:
+        agora = datetime.now(timezone.utc)
+        while self._heap and self._heap[0][0] <= agora:
+            instante, seq, gatilho_id = heapq.heappop(self._heap)
+            if self._seq_atual.get(gatilho_id) != seq:
+                continue  # reagendado ou removido depois do push
+            item = self._itens[gatilho_id]
+            if agora - instante <= _TOLERANCIA:
+                await self._avisar(gatilho_id, instante)
+            else:
+                self.stats["pulados"] += 1
+            if gatilho_id in self._itens:
+                self.agendar(item, max(instante, agora - _TOLERANCIA))
+
+    async def _avisar(self, gatilho_id: int, instante: datetime) -> None:
+        # confirma no banco: o gatilho pode ter sido apagado/desativado em outro worker
+        dados = await to_thread.run_sync(_ler_gatilho, gatilho_id)
+        if dados is None or not dados.ativo:
+            self.remover(gatilho_id)
+            return
+        aviso = {
+            "gatilho_id": gatilho_id,
+            "nome": dados.nome,
+            "hora_inicio": dados.hora_inicio,
+            "instante": instante,
+            "email": dados.email,
+            "usuario_nome": dados.usuario_nome,
+        }
+        for sink in self._sinks:
+            try:
+                await sink(aviso)
+            except Exception as e:
+                print(f"[gatilhos] falha ao avisar gatilho {gatilho_id}: {e}")
+        self.stats["disparados"] += 1
+
+
+def _ler_agenda(desde: datetime | None) -> list[dict]:
+    db = SessionLocal()
+    try:
+        return crud.list_agenda_gatilhos(db, desde)
+    finally:
+        db.close()
+
+
+def _ler_gatilho(gatilho_id: int):
+    db = SessionLocal()
+    try:
+        return crud.get_gatilho_para_aviso(db, gatilho_id)
+    finally:
+        db.close()
+
+
+gatilho_scheduler = GatilhoScheduler(
+    sync_s=settings.GATILHOS_SYNC_SEGUNDOS,
+    lock_arquivo=settings.GATILHOS_LOCK_ARQUIVO,
+)
@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import formataddr
+import aiosmtplib
+from anyio import to_thread
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.utils.tarefas import encerrar, esperar_evento
+
+
+class _ConexaoSMTP:
+    """Conexão SMTP autenticada, aberta sob demanda e reaproveitada entre mensagens."""
+
+    def __init__(self):
+        self._smtp: aiosmtplib.SMTP | None = None
+
+    @property
+    def aberta(self) -> bool:
+        return self._smtp is not None and self._smtp.is_connected
+
+    async def _conectar(self) -> None:
+        await self.fechar()
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            start_tls=settings.SMTP_STARTTLS,
+            timeout=30,
+        )
+        await smtp.connect()
+        if settings.SMTP_USE_CREDENTIALS:
+            await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self._smtp = smtp
+
+    async def enviar(self, msg: EmailMessage) -> None:
+        if not self.aberta:
+            await self._conectar()
+        try:
+            await self._smtp.send_message(msg)
+        except aiosmtplib.SMTPServerDisconnected:
+            # servidor fechou a sessão ociosa: reconecta uma vez
+            await self._conectar()
+            await self._smtp.send_message(msg)
+
+    async def fechar(self) -> None:
+        if self._smtp is not None:
+            try:
+                await self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+class MailWorker:
+    """
+    Consome a tabela email_outbox e entrega as mensagens por um pool de conexões
+    SMTP persistentes (sem handshake TCP+STARTTLS+AUTH por mensagem). Falhas
+    voltam para a fila com backoff exponencial.
+    """
+
+    def __init__(self, pool_size: int, lote_max: int, max_tentativas: int, backoff_s: float,
+                 intervalo_s: float = 2.0):
+        self.pool_size = pool_size
+        self.lote_max = lote_max
+        self.max_tentativas = max_tentativas
+        self.backoff_s = backoff_s
+        self.intervalo_s = intervalo_s
+        self._conexoes: list[_ConexaoSMTP] = []
+        self._pool: asyncio.Queue | None = None
+        self._acordar: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._parando = False
+        self.contadores = Counter(enviados=0, falhas=0, retentativas=0, desistencias=0)
+        self._latencias = deque(maxlen=1000)  # segundos por mensagem
+        self._envios = deque(maxlen=10000)    # instantes (monotonic) dos envios
+
+    async def iniciar(self) -> None:
+        self._conexoes = [_ConexaoSMTP() for _ in range(self.pool_size)]
+        self._pool = asyncio.Queue()
+        for c in self._conexoes:
+            self._pool.put_nowait(c)
+        self._acordar = asyncio.Event()
+        self._parando = False
+        self._task = asyncio.create_task(self._loop(), name="mail_worker")
+
+    async def parar(self) -> None:
+        """Sinaliza a parada; o loop termina o lote em andamento e sai."""
+        if not self._task:
+            return
+        self._parando = True
+        self._acordar.set()
+        await encerrar(self._task)
+        self._task = None
+        for c in self._conexoes:
+            await c.fechar()
+        # itens reservados e não finalizados voltam à fila quando o lease vencer
+
+    def notificar(self) -> None:
+        """Acorda o worker logo após um enfileiramento neste processo."""
+        if self._acordar is not None:
+            self._acordar.set()
+
+    async def _loop(self) -> None:
+        while not self._parando:
+            self._acordar.clear()
+            try:
+                lote = await to_thread.run_sync(_reservar, self.lote_max)
+            except Exception as e:
+                print(f"[mail] erro ao ler a outbox: {e}")
+                lote = []
+            if not lote:
+                await esperar_evento(self._acordar, self.intervalo_s)
+                continue
+            resultados = await asyncio.gather(*(self._entregar(item) for item in lote))
+            await to_thread.run_sync(self._finalizar, lote, resultados)
+
+    async def _entregar(self, item: dict) -> str | None:
+        """Retorna None em caso de sucesso ou a mensagem de erro."""
+        conexao = await self._pool.get()
+        inicio = time.monotonic()
+        try:
+            await conexao.enviar(_montar_mensagem(item))
+        except Exception as e:
+            await conexao.fechar()
+            return str(e) or e.__class__.__name__
+        finally:
+            self._pool.put_nowait(conexao)
+        fim = time.monotonic()
+        self._latencias.append(fim - inicio)
+        self._envios.append(fim)
+        return None
+
+    def _finalizar(self, lote: list[dict], resultados: list[str | None]) -> None:
+        db = SessionLocal()
+        try:
+            ok = [item["id"] for item, erro in zip(lote, resultados) if erro is None]
+            crud.mark_emails_sent(db, ok)
+            self.contadores["enviados"] += len(ok)
+            for item, erro in zip(lote, resultados):
+                if erro is None:
+                    continue
+                self.contadores["falhas"] += 1
+                tentativas = item["tentativas"] + 1
+                if tentativas >= self.max_tentativas:
+                    proxima = None
+                    self.contadores["desistencias"] += 1
+                else:
+                    proxima = datetime.now(timezone.utc) + timedelta(seconds=self.backoff_s * 2 ** (tentativas - 1))
+                    self.contadores["retentativas"] += 1
+                crud.mark_email_failed(db, item["id"], erro, proxima)
+        finally:
+            db.close()
+
+    def metricas(self) -> dict:
+        agora = time.monotonic()
+        latencias = sorted(self._latencias)
+
+        def pct(p: float) -> float | None:
+            if not latencias:
+                return None
+            return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 1)
+
+        return {
+            **self.contadores,
+            "conexoes_abertas": sum(1 for c in self._conexoes if c.aberta),
+            "enviados_ultimo_minuto": sum(1 for t in self._envios if agora - t <= 60),
+            "latencia_p50_ms": pct(0.50),
+            "latencia_p99_ms": pct(0.99),
+        }
+
+
+def _reservar(limit: int) -> list[dict]:
+    db = SessionLocal()
+    try:
+        return crud.claim_emails(db, limit)
+    finally:
+        db.close()
+
+
+def _montar_mensagem(item: dict) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = formataddr(("Bet Blocker", settings.ADMIN_EMAIL))
+    msg["To"] = ", ".join(item["destinatarios"])
+    msg["Subject"] = item["assunto"]
+    msg.set_content(item["corpo"])
+    return msg
+
+
+mail_worker = MailWorker(
+    pool_size=settings.SMTP_POOL_SIZE,
+    lote_max=settings.EMAIL_LOTE_MAX,
+    max_tentativas=settings.EMAIL_MAX_TENTATIVAS,
+    backoff_s=settings.EMAIL_BACKOFF_SEGUNDOS,
+)
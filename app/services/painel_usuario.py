@@ -0,0 +1,112 @@
+import json
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from app import crud, models
+from app.utils.json_rapido import dumps
+
+HISTORICO_DIAS = 90  # maior janela aceita por GET /usuarios/{id}/history
+
+
+def calcular(
+    usuario: models.Usuario,
+    baseline: models.UsuarioBaseline | None,
+    hoje: date,
+    dias_checkin: set[date] | None = None,
+) -> dict:
+    """
+    Snapshot do painel: streak, métricas e a série diária dos últimos
+    HISTORICO_DIAS dias (mais antigo -> hoje), com somas acumuladas para
+    que o total de qualquer janela saia de uma subtração.
+    `dias_checkin`: dias com check-in na tabela checkins; None = base sem o
+    log, usa a heurística antiga (todo dia entre o início da streak e o último check-in).
+    A streak sai das colunas do usuário (get_current_streak_days), a mesma
+    conta do check-in e das demais rotas; o log só desenha o histórico.
+    """
+    streak_days = crud.get_current_streak_days(usuario)
+    dados = {
+        "streak": {
+            "currentDays": streak_days,
+            "bestDays": max(usuario.best_streak_days or 0, streak_days),
+            "since": usuario.streak_started_at,
+        },
+        "metrics": None,
+        "history": [],
+        "acumulado": [],
+    }
+    if not baseline:
+        return dados
+
+    dias_semana = baseline.dias_por_semana or 0
+    gasto_dia = float(baseline.gasto_medio_dia or 0.0)
+    tempo_dia = int(baseline.tempo_diario_minutos or 0)
+    dados["metrics"] = {
+        "streakDays": streak_days,
+        "avoidedBets": round(dias_semana * (streak_days / 7) * 2),
+        "moneySaved": round(gasto_dia * streak_days, 2),
+        "timeSavedMin": int(tempo_dia * streak_days),
+    }
+
+    last = usuario.last_checkin_date or hoje
+    streak_start = last - timedelta(days=max(0, streak_days - 1))
+    inicio = hoje - timedelta(days=HISTORICO_DIAS - 1)
+    soma = [0, 0.0, 0]
+    for i in range(HISTORICO_DIAS):
+        d = inicio + timedelta(days=i)
+        if dias_checkin is not None:
+            active = d in dias_checkin
+        else:
+            active = streak_days > 0 and streak_start <= d <= last
+        ponto = {
+            "date": d,
+            "avoidedBets": int(dias_semana / 7) if active else 0,
+            "moneySaved": round(gasto_dia, 2) if active else 0.0,
+            "timeSavedMin": tempo_dia if active else 0,
+        }
+        soma = [soma[0] + ponto["avoidedBets"], round(soma[1] + ponto["moneySaved"], 2), soma[2] + ponto["timeSavedMin"]]
+        dados["history"].append(ponto)
+        dados["acumulado"].append(soma)
+    return dados
+
+
+def obter(db: Session, usuario_id: int) -> dict | None:
+    """
+    Snapshot do dia (uma leitura por PK); recalcula e grava se não houver. None = usuário não existe.
+    A versão do snapshot é lida ANTES do usuário: se um check-in invalidar no
+    meio do cálculo, a gravação condicional não acontece e o próximo pedido recalcula.
+    """
+    hoje = crud.today_utc()
+    salvo = crud.get_painel_snapshot(db, usuario_id)
+    if salvo is not None and salvo.dia == hoje and salvo.dados:
+        return json.loads(salvo.dados)
+    usuario = db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
+    if not usuario:
+        return None
+    dias = crud.list_checkin_dias(db, usuario_id, desde=hoje - timedelta(days=HISTORICO_DIAS - 1))
+    dados = calcular(
+        usuario,
+        crud.get_baseline_by_user(db, usuario_id),
+        hoje,
+        set(dias) if dias else None,
+    )
+    texto = dumps(dados).decode()
+    crud.salvar_painel_snapshot(db, usuario_id, hoje, texto, salvo.versao if salvo is not None else None)
+    return json.loads(texto)
+
+
+def historico(dados: dict, days: int) -> list[dict]:
+    """Últimos `days` pontos: fatia da série pronta, sem recalcular nada."""
+    return dados["history"][-days:] if dados["history"] else []
+
+
+def totais(dados: dict, days: int) -> dict:
+    """Soma da janela de `days` dias em O(1) pela série acumulada."""
+    acumulado = dados["acumulado"]
+    if not acumulado:
+        return {"avoidedBets": 0, "moneySaved": 0.0, "timeSavedMin": 0}
+    fim = acumulado[-1]
+    antes = acumulado[-days - 1] if days < len(acumulado) else [0, 0.0, 0]
+    return {
+        "avoidedBets": fim[0] - antes[0],
+        "moneySaved": round(fim[1] - antes[1], 2),
+        "timeSavedMin": fim[2] - antes[2],
+    }
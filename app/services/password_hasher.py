@@ -0,0 +1,52 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app.config import settings
+from app.core.security import hash_password, verify_and_update_password
+
+
+class PasswordHasher:
+    """
+    Roda o bcrypt num pool de threads dedicado (a lib libera o GIL), fora do
+    event loop. Com mais de `fila_max` hashes pendentes, rejeita com 429 em vez
+    de enfileirar indefinidamente.
+    """
+
+    def __init__(self, workers: int, fila_max: int):
+        self.fila_max = fila_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pendentes = 0  # só é alterado no event loop
+        self.contadores = Counter(hashes=0, verificacoes=0, rehashes=0, rejeitados=0)
+
+    async def _rodar(self, fn, *args):
+        if self._pendentes >= self.fila_max:
+            self.contadores["rejeitados"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas requisições simultâneas, tente novamente em instantes.",
+                headers={"Retry-After": "1"},
+            )
+        self._pendentes += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pendentes -= 1
+
+    async def hash(self, senha: str) -> str:
+        self.contadores["hashes"] += 1
+        return await self._rodar(hash_password, senha)
+
+    async def verificar(self, senha: str, hash_atual: str) -> tuple[bool, str | None]:
+        """(senha confere?, novo hash se o custo configurado mudou)."""
+        self.contadores["verificacoes"] += 1
+        ok, novo_hash = await self._rodar(verify_and_update_password, senha, hash_atual)
+        if novo_hash:
+            self.contadores["rehashes"] += 1
+        return ok, novo_hash
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(workers=settings.HASH_WORKERS, fila_max=settings.HASH_FILA_MAX)
@@ -0,0 +1,163 @@
+import hashlib
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# palavras que não mudam o sentido de um desabafo curto ("hoje estou ansioso" ~ "ansioso hoje")
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela para pra com sem
+e ou mas que se eu me meu minha tu te voce voces ele ela eles elas nos isso isto esse essa
+este esta estou esta estamos estao sou e era foi ser ter tenho tem ja muito muita mais
+""".split())
+
+_PRIMO = (1 << 61) - 1
+_NUM_PERM = 64
+_BANDAS = 16
+_LINHAS = _NUM_PERM // _BANDAS
+_rng = random.Random(20240917)
+_PERMUTACOES = [(_rng.randrange(1, _PRIMO), _rng.randrange(0, _PRIMO)) for _ in range(_NUM_PERM)]
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sem acentos/pontuação e com espaços colapsados."""
+    t = unicodedata.normalize("NFKD", texto.lower())
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    t = re.sub(r"[^\w\s]", " ", t)
+    return " ".join(t.split())
+
+
+def _tokens(normalizado: str) -> set[str]:
+    return {p for p in normalizado.split() if p not in STOPWORDS} or set(normalizado.split())
+
+
+def minhash(tokens: set[str]) -> tuple[int, ...]:
+    hashes = [zlib.crc32(t.encode()) for t in tokens]
+    if not hashes:
+        return tuple([_PRIMO] * _NUM_PERM)
+    return tuple(min((a * h + b) % _PRIMO for h in hashes) for a, b in _PERMUTACOES)
+
+
+def similaridade(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimativa de Jaccard entre os dois conjuntos de tokens."""
+    return sum(1 for x, y in zip(a, b) if x == y) / _NUM_PERM
+
+
+@dataclass
+class _Entrada:
+    valor: object
+    assinatura: tuple[int, ...]
+    expira: float
+    hits: int = 0
+    criado_em: float = field(default_factory=time.time)
+    ultimo_hit: float | None = None
+
+
+class SemanticCache:
+    """
+    Cache de respostas da IA com dois níveis, sem rede:
+    - exato: hash do texto normalizado;
+    - similar: MinHash dos tokens + LSH em bandas (só compara com candidatos
+      que colidem em alguma banda), aceitando Jaccard >= `limiar`.
+    LRU com TTL e limite de entradas.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, limiar: float = 0.8):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.limiar = limiar
+        self._entradas: OrderedDict[str, _Entrada] = OrderedDict()
+        self._bandas: dict[tuple, set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits_exatos": 0, "hits_similares": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _chave(normalizado: str) -> str:
+        return hashlib.sha1(normalizado.encode()).hexdigest()
+
+    @staticmethod
+    def _bandas_de(assinatura: tuple[int, ...]):
+        for i in range(_BANDAS):
+            yield (i, assinatura[i * _LINHAS:(i + 1) * _LINHAS])
+
+    def get(self, texto: str):
+        normalizado = normalizar(texto)
+        chave = self._chave(normalizado)
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and entrada.expira >= agora:
+                self._registrar_hit(chave, entrada, "hits_exatos")
+                return entrada.valor
+
+            assinatura = minhash(_tokens(normalizado))
+            candidatos = set()
+            for banda in self._bandas_de(assinatura):
+                candidatos |= self._bandas.get(banda, set())
+            melhor, melhor_sim = None, self.limiar
+            for c in candidatos:
+                e = self._entradas.get(c)
+                if e is None or e.expira < agora:
+                    continue
+                sim = similaridade(assinatura, e.assinatura)
+                if sim >= melhor_sim:
+                    melhor, melhor_sim = c, sim
+            if melhor is not None:
+                entrada = self._entradas[melhor]
+                self._registrar_hit(melhor, entrada, "hits_similares")
+                return entrada.valor
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, texto: str, valor) -> None:
+        normalizado = normalizar(texto)
+        chave = self._chave(normalizado)
+        assinatura = minhash(_tokens(normalizado))
+        with self._lock:
+            self._remover(chave)
+            self._entradas[chave] = _Entrada(valor, assinatura, time.monotonic() + self.ttl)
+            for banda in self._bandas_de(assinatura):
+                self._bandas.setdefault(banda, set()).add(chave)
+            while len(self._entradas) > self.maxsize:
+                self._remover(next(iter(self._entradas)))
+                self.stats["evictions"] += 1
+
+    def _registrar_hit(self, chave: str, entrada: _Entrada, tipo: str) -> None:
+        entrada.hits += 1
+        entrada.ultimo_hit = time.time()
+        self._entradas.move_to_end(chave)
+        self.stats[tipo] += 1
+
+    def _remover(self, chave: str) -> None:
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        for banda in self._bandas_de(entrada.assinatura):
+            chaves = self._bandas.get(banda)
+            if chaves:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._bandas[banda]
+
+    def estatisticas(self, top: int = 10) -> dict:
+        with self._lock:
+            total = self.stats["hits_exatos"] + self.stats["hits_similares"] + self.stats["misses"]
+            hits = self.stats["hits_exatos"] + self.stats["hits_similares"]
+            mais_usadas = sorted(self._entradas.items(), key=lambda kv: kv[1].hits, reverse=True)[:top]
+            return {
+                **self.stats,
+                "entradas": len(self._entradas),
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "mais_usadas": [
+                    {"chave": k[:12], "hits": e.hits, "ultimo_hit": e.ultimo_hit} for k, e in mais_usadas
+                ],
+            }
+
+
+cache_diario = SemanticCache(maxsize=5000, ttl=24 * 3600)
+cache_aconselhamento = SemanticCache(maxsize=5000, ttl=24 * 3600)
@@ -0,0 +1,49 @@
+from collections import Counter
+from app.services.semantic_cache import normalizar
+
+# radicais (já sem acento) -> sentimento. Casamos por prefixo para pegar
+# flexões: "ansios" cobre ansioso/ansiosa/ansiosos...
+LEXICO: dict[str, str] = {
+    # Ansiedade
+    "ansios": "Ansiedade", "ansiedad": "Ansiedade", "nervos": "Ansiedade", "preocup": "Ansiedade",
+    "agonia": "Ansiedade", "aflit": "Ansiedade", "inquiet": "Ansiedade", "tens": "Ansiedade",
+    "medo": "Ansiedade", "panico": "Ansiedade", "vontade": "Ansiedade", "fissura": "Ansiedade",
+    # Tristeza
+    "trist": "Tristeza", "deprimid": "Tristeza", "depress": "Tristeza", "sozinh": "Tristeza",
+    "solidao": "Tristeza", "chor": "Tristeza", "desanim": "Tristeza", "vazi": "Tristeza",
+    "perdi": "Tristeza",
+    # Culpa
+    "culpa": "Culpa", "culpad": "Culpa", "vergonh": "Culpa", "arrepend": "Culpa", "recai": "Culpa",
+    # Raiva
+    "raiva": "Raiva", "odio": "Raiva", "irrit": "Raiva", "revolt": "Raiva", "frustr": "Raiva",
+    # Esperança
+    "esperanc": "Esperança", "confian": "Esperança", "consegu": "Esperança", "forca": "Esperança",
+    "motivad": "Esperança", "orgulh": "Esperança", "melhor": "Esperança", "venc": "Esperança",
+    # Alegria
+    "feliz": "Alegria", "alegr": "Alegria", "content": "Alegria", "aliviad": "Alegria",
+    "tranquil": "Alegria", "paz": "Alegria", "grat": "Alegria",
+}
+
+NEGACOES = frozenset({"nao", "nunca", "nem", "jamais"})
+NEUTRO = "Neutro"
+
+
+def classificar(texto: str) -> str:
+    """
+    Classificador léxico rápido (microssegundos) para o sentimento provisório.
+    Conta ocorrências por sentimento e ignora termos até duas palavras após
+    uma negação ("não estou feliz").
+    """
+    palavras = normalizar(texto).split()
+    votos: Counter = Counter()
+    for i, palavra in enumerate(palavras):
+        if NEGACOES.intersection(palavras[max(0, i - 2):i]):
+            continue
+        for tamanho in range(min(len(palavra), 9), 2, -1):
+            sentimento = LEXICO.get(palavra[:tamanho])
+            if sentimento:
+                votos[sentimento] += 1
+                break
+    if not votos:
+        return NEUTRO
+    return votos.most_common(1)[0][0]
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable
+from anyio import to_thread
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.services.gatilho_scheduler import LockLider
+from app.utils.tarefas import encerrar, esperar_evento
+
+NOME_TAREFA = "expirar_streaks"
+_CHAVE_ADVISORY = 0x73747231  # diferente da do agendador de gatilhos
+_VERIFICAR_SEGUNDOS = 600      # de quanto em quanto tempo confere se a rodada do dia já foi feita
+
+
+def expirar(referencia: date, lote: int, pausa_s: float, deve_parar: Callable[[], bool] = lambda: False) -> dict:
+    """
+    Varre usuarios por keyset em fatias de `lote` ids, um UPDATE por fatia.
+    Retoma do cursor gravado se a rodada de `referencia` foi interrompida
+    (queda ou `deve_parar()` entre fatias, ex.: shutdown).
+    Retorna contadores e a vazão (usuários varridos por segundo).
+    """
+    db = SessionLocal()
+    try:
+        progresso = crud.get_progresso_tarefa(db, NOME_TAREFA)
+        cursor = 0
+        if progresso is not None and progresso.referencia == referencia:
+            if progresso.concluida:
+                return {"lotes": 0, "varridos": 0, "fechadas": 0, "segundos": 0.0, "linhas_por_s": 0.0}
+            cursor = progresso.cursor
+        inicio = time.monotonic()
+        lotes = varridos = fechadas = 0
+        concluida = False
+        while not deve_parar():
+            proximo = crud.proximo_lote_usuarios(db, cursor, lote)
+            if proximo is None:
+                concluida = True
+                break
+            ate, quantidade = proximo
+            fechadas += crud.expirar_streaks_lote(db, NOME_TAREFA, referencia, cursor, ate)
+            varridos += quantidade
+            cursor = ate
+            lotes += 1
+            time.sleep(pausa_s)
+        if concluida:
+            crud.concluir_tarefa(db, NOME_TAREFA, referencia, cursor)
+        segundos = time.monotonic() - inicio
+        return {
+            "lotes": lotes,
+            "varridos": varridos,
+            "fechadas": fechadas,
+            "segundos": round(segundos, 2),
+            "linhas_por_s": round(varridos / segundos, 1) if segundos else 0.0,
+        }
+    finally:
+        db.close()
+
+
+def _rodada_pendente(referencia: date) -> bool:
+    db = SessionLocal()
+    try:
+        progresso = crud.get_progresso_tarefa(db, NOME_TAREFA)
+        return progresso is None or progresso.referencia < referencia or not progresso.concluida
+    finally:
+        db.close()
+
+
+class StreakExpiracao:
+    """
+    Uma rodada por dia (após STREAKS_EXPIRAR_HORA_UTC) fecha as streaks
+    abandonadas, que antes só eram fechadas no próximo check-in do usuário.
+    Todo worker confere periodicamente; só quem pega o lock executa. Se o dono
+    cair no meio, o próximo a pegar o lock continua do cursor salvo.
+    """
+
+    def __init__(self, hora_utc: int, lote: int, pausa_s: float, lock_arquivo: str):
+        self.hora_utc = hora_utc
+        self.lote = lote
+        self.pausa_s = pausa_s
+        self._lock = LockLider(lock_arquivo, chave=_CHAVE_ADVISORY)
+        self._task: asyncio.Task | None = None
+        self._parar: asyncio.Event | None = None
+        self.ultima_rodada: dict | None = None
+
+    async def iniciar(self) -> None:
+        self._parar = asyncio.Event()
+        self._task = asyncio.create_task(self._loop(), name="streak_expiracao")
+
+    async def parar(self) -> None:
+        """Uma rodada em andamento termina o lote atual; a próxima retoma do cursor."""
+        if self._task:
+            self._parar.set()
+            await encerrar(self._task)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while not self._parar.is_set():
+            try:
+                agora = datetime.now(timezone.utc)
+                referencia = agora.date()
+                if agora.hour >= self.hora_utc and await to_thread.run_sync(_rodada_pendente, referencia):
+                    await self._rodar(referencia)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[streaks] erro na expiração: {e}")
+            await esperar_evento(self._parar, self._espera())
+
+    async def _rodar(self, referencia: date) -> None:
+        if not await to_thread.run_sync(self._lock.tentar):
+            return
+        try:
+            stats = await to_thread.run_sync(expirar, referencia, self.lote, self.pausa_s, self._parar.is_set)
+        finally:
+            await to_thread.run_sync(self._lock.liberar)
+        self.ultima_rodada = {"referencia": referencia, **stats}
+        if stats["lotes"]:
+            print(
+                f"[streaks] expiração {referencia}: {stats['fechadas']} streaks fechadas, "
+                f"{stats['varridos']} usuários em {stats['segundos']}s ({stats['linhas_por_s']}/s)"
+            )
+
+    def _espera(self) -> float:
+        """Até o horário da rodada (se ainda não chegou hoje) ou a próxima conferência."""
+        agora = datetime.now(timezone.utc)
+        alvo = agora.replace(hour=self.hora_utc, minute=0, second=0, microsecond=0)
+        if alvo <= agora:
+            alvo += timedelta(days=1)
+        return max(1.0, min((alvo - agora).total_seconds(), _VERIFICAR_SEGUNDOS))
+
+
+streak_expiracao = StreakExpiracao(
+    hora_utc=settings.STREAKS_EXPIRAR_HORA_UTC,
+    lote=settings.STREAKS_EXPIRAR_LOTE,
+    pausa_s=settings.STREAKS_EXPIRAR_PAUSA_SEGUNDOS,
+    lock_arquivo=settings.STREAKS_LOCK_ARQUIVO,
+)
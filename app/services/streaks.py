@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from datetime import date
+
+# NumPy é opcional: sem ele o cálculo em lote cai no laço em Python (mesmo resultado)
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+@dataclass
+class StreakCalculada:
+    usuario_id: int
+    atual: int               # dias da sequência que termina no último check-in
+    inicio_atual: date | None
+    melhor: int              # maior sequência do histórico
+    ultimo_checkin: date
+
+
+def _atual(inicio_run: int, ultimo: int, inicio_streak: int | None) -> tuple[int, int | None]:
+    """Corta a última sequência no início da streak vigente (reset apaga o que veio antes)."""
+    if inicio_streak is None:
+        return 0, None
+    inicio = max(inicio_run, inicio_streak)
+    if inicio > ultimo:
+        return 0, None
+    return ultimo - inicio + 1, inicio
+
+
+def calcular_em_lote(
+    usuario_ids, dias, inicios_streak: dict[int, date | None] | None = None
+) -> list[StreakCalculada]:
+    """
+    Sequências de vários usuários de uma vez. `usuario_ids`/`dias` são colunas
+    paralelas ordenadas por (usuario_id, dia), sem duplicatas (a tabela checkins
+    garante). Com NumPy é run-length vetorizado; sem NumPy, um laço simples.
+    `inicios_streak`: usuario_id -> data do streak_started_at (None = streak zerada);
+    usuário ausente do dict = sem corte.
+    """
+    if len(dias) == 0:
+        return []
+    ordinais = [d.toordinal() for d in dias]
+    if np is not None:
+        linhas = _runs_numpy(np.asarray(usuario_ids, dtype=np.int64), np.asarray(ordinais, dtype=np.int64))
+    else:
+        linhas = _runs_python(usuario_ids, ordinais)
+
+    resultado = []
+    inicios_streak = inicios_streak or {}
+    for usuario_id, inicio_run, ultimo, melhor in linhas:
+        if usuario_id in inicios_streak:
+            corte = inicios_streak[usuario_id]
+            atual, inicio = _atual(inicio_run, ultimo, corte.toordinal() if corte else None)
+        else:
+            atual, inicio = ultimo - inicio_run + 1, inicio_run
+        resultado.append(StreakCalculada(
+            usuario_id=usuario_id,
+            atual=atual,
+            inicio_atual=date.fromordinal(inicio) if inicio is not None else None,
+            melhor=melhor,
+            ultimo_checkin=date.fromordinal(ultimo),
+        ))
+    return resultado
+
+
+def _runs_numpy(usuarios, ordinais) -> list[tuple[int, int, int, int]]:
+    """(usuario_id, início da última sequência, último dia, maior sequência) por usuário."""
+    n = len(ordinais)
+    novo_usuario = np.empty(n, dtype=bool)
+    novo_usuario[0] = True
+    novo_usuario[1:] = usuarios[1:] != usuarios[:-1]
+    nova_run = novo_usuario.copy()
+    nova_run[1:] |= (ordinais[1:] - ordinais[:-1]) != 1
+
+    inicio_runs = np.flatnonzero(nova_run)
+    tamanhos = np.diff(np.append(inicio_runs, n))
+    # índice (em inicio_runs) da primeira sequência de cada usuário
+    run_do_usuario = np.flatnonzero(novo_usuario[inicio_runs])
+    melhores = np.maximum.reduceat(tamanhos, run_do_usuario)
+
+    fim_usuario = np.append(np.flatnonzero(novo_usuario)[1:], n) - 1   # última linha de cada usuário
+    ultima_run = np.append(run_do_usuario[1:], len(inicio_runs)) - 1   # última sequência de cada usuário
+    return list(zip(
+        usuarios[fim_usuario].tolist(),
+        ordinais[inicio_runs[ultima_run]].tolist(),
+        ordinais[fim_usuario].tolist(),
+        melhores.tolist(),
+    ))
+
+
+def _runs_python(usuarios, ordinais) -> list[tuple[int, int, int, int]]:
+    linhas = []
+    atual_usuario = None
+    inicio = anterior = melhor = 0
+    for usuario_id, dia in zip(usuarios, ordinais):
+        if usuario_id != atual_usuario:
+            if atual_usuario is not None:
+                linhas.append((atual_usuario, inicio, anterior, max(melhor, anterior - inicio + 1)))
+            atual_usuario, inicio, melhor = usuario_id, dia, 0
+        elif dia != anterior + 1:
+            melhor = max(melhor, anterior - inicio + 1)
+            inicio = dia
+        anterior = dia
+    linhas.append((atual_usuario, inicio, anterior, max(melhor, anterior - inicio + 1)))
+    return linhas
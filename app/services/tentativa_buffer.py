@@ -0,0 +1,111 @@
+import asyncio
+from anyio import to_thread
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.utils.tarefas import encerrar, esperar_evento
+
+
+class BufferCheio(Exception):
+    """O buffer não tem espaço para o lote: o cliente deve tentar de novo mais tarde."""
+
+
+class TentativaBuffer:
+    """
+    Buffer assíncrono de tentativas de acesso. Acumula linhas em memória e grava
+    em INSERTs multi-linha quando o lote enche ou quando o intervalo estoura.
+    """
+
+    def __init__(self, lote_max: int, intervalo_s: float, capacidade: int):
+        self.lote_max = lote_max
+        self.intervalo_s = intervalo_s
+        self.capacidade = capacidade
+        self._fila: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._chegou: asyncio.Event | None = None  # acorda o loop: linhas novas ou parada
+        self._parando = False
+
+    @property
+    def ativo(self) -> bool:
+        return self._task is not None
+
+    async def iniciar(self) -> None:
+        self._fila = asyncio.Queue(maxsize=self.capacidade)
+        self._chegou = asyncio.Event()
+        self._parando = False
+        self._task = asyncio.create_task(self._loop(), name="tentativa_buffer")
+
+    async def parar(self) -> None:
+        """Para o worker e grava o que ainda estiver na fila (chamado no shutdown)."""
+        if not self._task:
+            return
+        self._parando = True
+        self._chegou.set()
+        await encerrar(self._task)
+        self._task = None
+
+        pendentes = []
+        while not self._fila.empty():
+            pendentes.append(self._fila.get_nowait())
+        for i in range(0, len(pendentes), self.lote_max):
+            await to_thread.run_sync(_gravar_lote, pendentes[i:i + self.lote_max])
+
+    async def enfileirar(self, rows: list[dict]) -> None:
+        # sem worker (ex.: scripts/testes sem lifespan): grava direto
+        if not self.ativo:
+            await to_thread.run_sync(_gravar_lote, rows)
+            return
+        if self.capacidade - self._fila.qsize() < len(rows):
+            raise BufferCheio()
+        for row in rows:
+            self._fila.put_nowait(row)
+        self._chegou.set()
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._parando:
+            self._chegou.clear()
+            if self._fila.empty():
+                await esperar_evento(self._chegou, None)
+                continue
+            lote = []
+            prazo = loop.time() + self.intervalo_s
+            while len(lote) < self.lote_max and not self._parando:
+                try:
+                    lote.append(self._fila.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                self._chegou.clear()
+                await esperar_evento(self._chegou, restante)
+            if lote:
+                await to_thread.run_sync(_gravar_lote, lote)
+
+
+def _gravar_lote(rows: list[dict]) -> None:
+    db = SessionLocal()
+    try:
+        try:
+            crud.create_tentativas_bulk(db, rows)
+        except Exception as e:
+            # uma linha inválida (ex.: site_id inexistente) derruba o INSERT inteiro:
+            # regrava linha a linha e descarta só as que falharem
+            db.rollback()
+            print(f"[tentativas] falha no lote ({len(rows)} linhas): {e}")
+            for row in rows:
+                try:
+                    crud.create_tentativas_bulk(db, [row])
+                except Exception:
+                    db.rollback()
+    finally:
+        db.close()
+
+
+tentativa_buffer = TentativaBuffer(
+    lote_max=settings.TENTATIVAS_LOTE_MAX,
+    intervalo_s=settings.TENTATIVAS_FLUSH_SEGUNDOS,
+    capacidade=settings.TENTATIVAS_BUFFER_MAX,
+)
@@ -1,67 +1,66 @@
-from openai import OpenAI
+from typing import AsyncIterator
 from fastapi import HTTPException
-from app.config import settings
+from app.services import ai_gateway
+from app.services.semantic_cache import cache_aconselhamento
 
-client = OpenAI(api_key=settings.openai_api_key)
+MODELO_ACONSELHAMENTO = "gpt-3.5-turbo"
+PROMPT_CONSELHEIRO = "Você é um conselheiro empático que ajuda pessoas viciadas em apostas a se sentirem acolhidas e motivadas a seguir em frente."
 
+def _mensagens_aconselhamento(mensagem: str) -> list[dict]:
+    return [
+        {"role": "system", "content": PROMPT_CONSELHEIRO},
+        {"role": "user", "content": mensagem}
+    ]
 
-def _get_client() -> OpenAI:
-    # instancia apenas no uso
-    return OpenAI(api_key=settings.openai_api_key)
-
-def gerar_aconselhamento_ia(mensagem: str) -> str:
+async def gerar_aconselhamento_ia(mensagem: str, usar_cache: bool = True) -> str:
+    if usar_cache:
+        em_cache = cache_aconselhamento.get(mensagem)
+        if em_cache is not None:
+            return em_cache
     try:
-        client = _get_client()
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Você é um conselheiro empático que ajuda pessoas viciadas em apostas a se sentirem acolhidas e motivadas a seguir em frente."},
-                {"role": "user", "content": mensagem}
-            ],
+        resposta = await ai_gateway.completar(
+            MODELO_ACONSELHAMENTO,
+            _mensagens_aconselhamento(mensagem),
             max_tokens=350,
             temperature=0.7
         )
-        return response.choices[0].message.content
+        cache_aconselhamento.set(mensagem, resposta)
+        return resposta
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar aconselhamento: {str(e)}")
-    
-def analisar_texto_diario(texto: str) -> tuple[str, str]:
-    prompt = (
-        f"Você é uma IA conselheira emocional. O usuário escreveu o seguinte desabafo:\n\n"
-        f"{texto}\n\n"
-        f"1. Qual é o principal sentimento nesse texto? Seja direto, como: Tristeza, Ansiedade, Raiva, Esperança, etc.\n"
-        f"2. Responda de forma empática e motivadora, como se você fosse um terapeuta gentil."
-    )
 
-    try:
-        resposta = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-        )
-
-        partes = resposta.choices[0].message.content.split("\n", 1)
-        sentimento = partes[0].strip().replace("1. ", "")
-        resposta_ia = partes[1].strip().replace("2. ", "")
-        return sentimento, resposta_ia
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao analisar diário: {str(e)}")
+async def gerar_aconselhamento_ia_stream(mensagem: str, usar_cache: bool = True) -> AsyncIterator[str]:
+    if usar_cache:
+        em_cache = cache_aconselhamento.get(mensagem)
+        if em_cache is not None:
+            yield em_cache
+            return
+    partes = []
+    async for delta in ai_gateway.completar_stream(
+        MODELO_ACONSELHAMENTO,
+        _mensagens_aconselhamento(mensagem),
+        max_tokens=350,
+        temperature=0.7
+    ):
+        partes.append(delta)
+        yield delta
+    cache_aconselhamento.set(mensagem, "".join(partes))
     
-
 async def gerar_conselho_emergencial() -> dict:
     prompt = (
         "Imagine que um usuário está prestes a recair no vício de apostas. Dê uma mensagem curta de apoio emocional "
         "e uma dica prática para ajudá-lo a resistir no momento de urgência."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
+    content = await ai_gateway.completar(
+        "gpt-4o",
+        [{"role": "user", "content": prompt}],
+        temperature=0.9,  # variedade: as respostas alimentam o pool do conselho_pool
         max_tokens=150
     )
 
-    content = response.choices[0].message.content
     partes = content.split("\n", 1)
     return {
         "mensagem_apoio": partes[0].strip(),
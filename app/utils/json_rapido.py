@@ -0,0 +1,33 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from fastapi import Response
+
+# orjson é opcional: sem ele cai no json da stdlib (saída equivalente, mais lenta)
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _padrao(valor):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(dados) -> bytes:
+    if orjson is not None:
+        # OPT_UTC_Z: "...Z" para UTC, igual ao que o Pydantic gera
+        return orjson.dumps(dados, default=_padrao, option=orjson.OPT_UTC_Z)
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class RespostaJSON(Response):
+    """Response com o corpo já em bytes: pula a validação do response_model."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from fastapi import Request
+from sqlalchemy import event
+from app.config import settings
+from app.database import engine
+
+
+class OrcamentoSQLExcedido(RuntimeError):
+    pass
+
+
+@dataclass
+class ContadorSQL:
+    total: int = 0
+    maximo: int | None = None
+    estrito: bool = False   # falha no statement que estoura o orçamento (aponta o N+1 no traceback)
+
+
+# contador da requisição atual; o threadpool das rotas `def` herda o contexto
+_contador: ContextVar[ContadorSQL | None] = ContextVar("contador_sql", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _contar(conn, cursor, statement, parameters, context, executemany):
+    contador = _contador.get()
+    if contador is not None:
+        contador.total += 1
+        if contador.estrito and contador.maximo is not None and contador.total > contador.maximo:
+            raise OrcamentoSQLExcedido(f"{contador.total} statements SQL (orçamento {contador.maximo}): {statement[:200]}")
+
+
+@contextmanager
+def contar_sql(maximo: int | None = None, estrito: bool = False):
+    """Conta os statements executados no engine síncrono dentro do bloco (e nas threads que herdam o contexto)."""
+    contador = ContadorSQL(maximo=maximo, estrito=estrito)
+    token = _contador.set(contador)
+    try:
+        yield contador
+    finally:
+        _contador.reset(token)
+
+
+def orcamento_sql(maximo: int):
+    """
+    Dependência de rota: acusa requisições que passam de `maximo` statements
+    (ex.: lazy load por item de uma lista). Loga sempre; com
+    SQL_ORCAMENTO_ESTRITO (dev/CI) o statement excedente levanta
+    OrcamentoSQLExcedido e a requisição falha com 500.
+    """
+    async def verificar(request: Request):
+        with contar_sql(maximo, settings.SQL_ORCAMENTO_ESTRITO) as contador:
+            yield contador
+        if contador.total > maximo:
+            print(f"[sql] {request.method} {request.url.path}: {contador.total} statements SQL (orçamento {maximo})")
+
+    return verificar
@@ -0,0 +1,129 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable
+from fastapi import HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, load_only
+from app.utils.json_rapido import RespostaJSON, dumps
+
+LIMITE_PADRAO = 50
+LIMITE_MAX = 200
+
+
+def codificar_cursor(momento: datetime, item_id: int) -> str:
+    bruto = json.dumps([momento.isoformat(), item_id]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(token: str) -> tuple[datetime, int]:
+    try:
+        bruto = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        momento, item_id = json.loads(bruto)
+        return datetime.fromisoformat(momento), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+class Paginacao:
+    """
+    Dependência comum das listagens: `?limit=&cursor=&fields=`.
+    Ordena por (coluna de data, id) decrescente e pagina por keyset, sem OFFSET;
+    `fields` carrega só as colunas pedidas (load_only) e devolve só esses campos.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAX, description="Itens por página"),
+        cursor: str | None = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+        fields: str | None = Query(None, description="Campos separados por vírgula, ex.: id,data"),
+    ):
+        self.request = request
+        self.limit = limit
+        self.cursor = decodificar_cursor(cursor) if cursor else None
+        self.campos = [c.strip() for c in fields.split(",") if c.strip()] if fields else None
+        self.next_cursor: str | None = None
+
+    def _campos_pedidos(self, schema: type[BaseModel]) -> list[str] | None:
+        if self.campos is None:
+            return None
+        invalidos = [c for c in self.campos if c not in schema.model_fields]
+        if invalidos:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos em fields: {', '.join(invalidos)}")
+        return self.campos
+
+    def _keyset(self, query, modelo, coluna_ordem):
+        """Filtro do cursor + ordenação + limit (+1 para saber se há próxima página)."""
+        if self.cursor:
+            momento, item_id = self.cursor
+            query = query.filter(
+                or_(coluna_ordem < momento, and_(coluna_ordem == momento, modelo.id < item_id))
+            )
+        return query.order_by(None).order_by(coluna_ordem.desc(), modelo.id.desc()).limit(self.limit + 1)
+
+    def _cortar(self, itens: list, coluna_ordem) -> list:
+        if len(itens) > self.limit:
+            itens = itens[: self.limit]
+            ultimo = itens[-1]
+            self.next_cursor = codificar_cursor(getattr(ultimo, coluna_ordem.key), ultimo.id)
+        return itens
+
+    def aplicar(self, query, modelo, coluna_ordem, schema: type[BaseModel]) -> list:
+        """Executa `query` (ORM) com projeção, cursor e limit; guarda o próximo cursor."""
+        campos = self._campos_pedidos(schema)
+        if campos is not None:
+            colunas = {c for c in campos if c in modelo.__mapper__.column_attrs} | {"id", coluna_ordem.key}
+            query = query.options(load_only(*(getattr(modelo, c) for c in colunas)))
+        return self._cortar(self._keyset(query, modelo, coluna_ordem).all(), coluna_ordem)
+
+    def consultar(self, db: Session, modelo, coluna_ordem, schema: type[BaseModel], *filtros) -> list:
+        """
+        Caminho rápido: select Core só das colunas do schema (ou de `fields`),
+        devolvendo Rows em vez de objetos ORM. Use com `responder_rapido`.
+        """
+        campos = self._campos_pedidos(schema) or list(schema.model_fields)
+        nomes = dict.fromkeys([*campos, "id", coluna_ordem.key])
+        stmt = select(*(getattr(modelo, c) for c in nomes if c in modelo.__mapper__.column_attrs)).where(*filtros)
+        return self._cortar(db.execute(self._keyset(stmt, modelo, coluna_ordem)).all(), coluna_ordem)
+
+    def headers(self) -> dict[str, str]:
+        if not self.next_cursor:
+            return {}
+        proxima = self.request.url.include_query_params(cursor=self.next_cursor)
+        return {"Link": f'<{proxima}>; rel="next"', "X-Next-Cursor": self.next_cursor}
+
+    def responder(self, response: Response, itens: list, converter: Callable | None = None, conversores: dict[str, Callable] | None = None):
+        """
+        Sem `fields`: lista convertida pelo `converter` da rota, se houver
+        (validada pelo response_model). Com `fields`: só os campos pedidos (+ id), lidos direto do ORM.
+        """
+        headers = self.headers()
+        if self.campos is None:
+            response.headers.update(headers)
+            return [converter(i) for i in itens] if converter else itens
+        conversores = conversores or {}
+        campos = ["id", *(c for c in self.campos if c != "id")]
+        dados = [
+            {c: conversores[c](getattr(i, c)) if c in conversores else getattr(i, c) for c in campos}
+            for i in itens
+        ]
+        return RespostaJSON(dumps(dados), headers=headers)
+
+    def responder_rapido(self, schema: type[BaseModel], linhas: list, conversores: dict[str, Callable] | None = None):
+        """
+        Rows de `consultar` direto para bytes JSON, sem passar pelo Pydantic.
+        O response_model da rota continua só como documentação (OpenAPI).
+        """
+        conversores = conversores or {}
+        campos = ["id", *(c for c in self.campos if c != "id")] if self.campos else list(schema.model_fields)
+        if not linhas:
+            return RespostaJSON(b"[]", headers=self.headers())
+        # posição de cada campo no Row: índice de tupla é bem mais barato que getattr por linha
+        posicoes = [(c, linhas[0]._fields.index(c), conversores.get(c)) for c in campos]
+        dados = [
+            {c: conv(r[i]) if conv else r[i] for c, i, conv in posicoes}
+            for r in linhas
+        ]
+        return RespostaJSON(dumps(dados), headers=self.headers())
@@ -0,0 +1,221 @@
+import json
+import re
+from app.services.semantic_cache import normalizar
+from app.services.sentimento_local import classificar, NEUTRO
+
+# conjunto fechado de sentimentos gravados em DiarioEmocional.sentimento
+SENTIMENTOS = ["Tristeza", "Ansiedade", "Raiva", "Esperança", "Alegria", "Culpa", "Medo", "Solidão", NEUTRO]
+
+_POR_NOME = {normalizar(s): s for s in SENTIMENTOS}
+_SINONIMOS = {
+    "triste": "Tristeza", "depressao": "Tristeza", "melancolia": "Tristeza", "desanimo": "Tristeza",
+    "ansioso": "Ansiedade", "ansiosa": "Ansiedade", "nervosismo": "Ansiedade", "preocupacao": "Ansiedade",
+    "angustia": "Ansiedade", "estresse": "Ansiedade",
+    "irritacao": "Raiva", "frustracao": "Raiva", "revolta": "Raiva",
+    "esperancoso": "Esperança", "otimismo": "Esperança", "motivacao": "Esperança", "determinacao": "Esperança",
+    "felicidade": "Alegria", "alivio": "Alegria", "gratidao": "Alegria", "orgulho": "Alegria",
+    "vergonha": "Culpa", "arrependimento": "Culpa", "remorso": "Culpa",
+    "pavor": "Medo", "receio": "Medo", "solitario": "Solidão", "isolamento": "Solidão",
+}
+
+ANALISE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sentimento": {"type": "string", "enum": SENTIMENTOS},
+        "resposta": {"type": "string"},
+    },
+    "required": ["sentimento", "resposta"],
+    "additionalProperties": False,
+}
+
+# response_format para a API de chat (saída validada pelo próprio modelo)
+RESPONSE_FORMAT_ANALISE = {
+    "type": "json_schema",
+    "json_schema": {"name": "analise_diario", "strict": True, "schema": ANALISE_SCHEMA},
+}
+
+# prompt em lote do diario_enrichment: {"analises": [{"id", "sentimento", "resposta"}]}
+RESPONSE_FORMAT_ANALISES_LOTE = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "analises_diario",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "analises": {
+                    "type": "array",
+                    "items": {
+                        **ANALISE_SCHEMA,
+                        "properties": {"id": {"type": "integer"}, **ANALISE_SCHEMA["properties"]},
+                        "required": ["id", *ANALISE_SCHEMA["required"]],
+                    },
+                },
+            },
+            "required": ["analises"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def normalizar_sentimento(valor: str | None, texto_apoio: str = "") -> str:
+    """
+    Mapeia texto livre ("1. Ansiedade.", "sentimento: tristeza profunda") para
+    um item de SENTIMENTOS. Sem correspondência, usa o classificador local.
+    """
+    v = normalizar(valor or "")
+    v = re.sub(r"^(\d+\s*)?(sentimento( principal)?\s*)?", "", v).strip()
+    if v in _POR_NOME:
+        return _POR_NOME[v]
+    for palavra in v.split():
+        if palavra in _POR_NOME:
+            return _POR_NOME[palavra]
+        if palavra in _SINONIMOS:
+            return _SINONIMOS[palavra]
+    return classificar(f"{valor or ''} {texto_apoio}")
+
+
+def _extrair_json(texto: str):
+    """
+    json.loads tolerante: aceita cercas ```json, texto antes/depois do objeto e
+    quebras de linha cruas dentro das strings (strict=False).
+    """
+    t = texto.strip()
+    if t.startswith("```"):
+        t = re.sub(r"^```\w*\s*|\s*```$", "", t)
+    try:
+        return json.loads(t, strict=False)
+    except ValueError:
+        pass
+    inicio, fim = t.find("{"), t.rfind("}")
+    if inicio != -1 and fim > inicio:
+        try:
+            return json.loads(t[inicio:fim + 1], strict=False)
+        except ValueError:
+            pass
+    return None
+
+
+def _decodificar(trecho: str) -> str:
+    """Conteúdo de um trecho de string JSON; escape inválido fica como texto (sem a barra)."""
+    try:
+        return json.loads(f'"{trecho}"', strict=False)
+    except ValueError:
+        return trecho.replace("\\", "")
+
+
+def _texto_livre(texto: str) -> tuple[str | None, str]:
+    """Formato legado: '1. <sentimento>\\n2. <resposta>' ou 'Sentimento: ...\\nResposta: ...'."""
+    linhas = [l.strip() for l in texto.strip().splitlines() if l.strip()]
+    if not linhas:
+        return None, ""
+    primeira = re.sub(r"^(1[.)]\s*|sentimento[^:]*:\s*)", "", linhas[0], flags=re.I)
+    resto = "\n".join(linhas[1:])
+    resto = re.sub(r"^(2[.)]\s*|resposta[^:]*:\s*)", "", resto, flags=re.I)
+    if len(primeira.split()) > 4 and not resto:
+        # não veio separado: tudo é resposta, o sentimento sai do classificador
+        return None, linhas[0]
+    return primeira, resto
+
+
+def parse_analise(conteudo: str, texto_usuario: str = "") -> tuple[str, str]:
+    """
+    (sentimento, resposta) a partir de qualquer completion: JSON do schema,
+    JSON com lixo em volta, JSON truncado ou texto livre. Nunca lança exceção —
+    uma resposta fora do formato não deve custar uma segunda chamada paga.
+    """
+    parser = ParserIncremental(texto_usuario)
+    parser.feed(conteudo or "")
+    return parser.resultado()
+
+
+def parse_analises_lote(conteudo: str) -> dict[int, tuple[str, str]]:
+    """Resposta do prompt em lote: {"analises": [{"id", "sentimento", "resposta"}]} -> {id: (sentimento, resposta)}."""
+    dados = _extrair_json(conteudo or "")
+    itens = dados.get("analises", []) if isinstance(dados, dict) else dados if isinstance(dados, list) else []
+    resultado = {}
+    for a in itens:
+        if not isinstance(a, dict):
+            continue
+        try:
+            diario_id = int(a.get("id"))
+        except (TypeError, ValueError):
+            continue
+        resposta = str(a.get("resposta") or "").strip()
+        if resposta:
+            resultado[diario_id] = (normalizar_sentimento(a.get("sentimento"), resposta), resposta)
+    return resultado
+
+
+_RE_SENTIMENTO = re.compile(r'"sentimento"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_RE_RESPOSTA_INICIO = re.compile(r'"resposta"\s*:\s*"')
+
+
+class ParserIncremental:
+    """
+    Lê o JSON {"sentimento", "resposta"} conforme os tokens chegam: o sentimento
+    fica disponível assim que a string fecha e a resposta vai sendo decodificada
+    aos poucos. Se o stream cair no meio, `resultado()` devolve o que já chegou.
+    """
+
+    def __init__(self, texto_usuario: str = ""):
+        self.texto_usuario = texto_usuario
+        self.buffer = ""
+        self.sentimento: str | None = None
+        self._resposta_inicio: int | None = None
+        self._resposta_lida = 0  # caracteres de `resposta` já entregues
+
+    def feed(self, pedaco: str) -> str:
+        """Acrescenta um pedaço e retorna o trecho novo da resposta (pode ser "")."""
+        self.buffer += pedaco
+        if self.sentimento is None:
+            m = _RE_SENTIMENTO.search(self.buffer)
+            if m:
+                self.sentimento = normalizar_sentimento(_decodificar(m.group(1)), self.texto_usuario)
+        if self._resposta_inicio is None:
+            m = _RE_RESPOSTA_INICIO.search(self.buffer)
+            if not m:
+                return ""
+            self._resposta_inicio = m.end()
+        atual = self._resposta_parcial()
+        novo = atual[self._resposta_lida:]
+        self._resposta_lida = len(atual)
+        return novo
+
+    def _resposta_parcial(self) -> str:
+        bruto = self.buffer[self._resposta_inicio:]
+        saida, i = [], 0
+        while i < len(bruto):
+            c = bruto[i]
+            if c == '"':
+                break
+            if c == "\\":
+                if i + 1 >= len(bruto):
+                    break  # escape incompleto: espera o próximo pedaço
+                if bruto[i + 1] == "u":
+                    if i + 6 > len(bruto):
+                        break
+                    saida.append(_decodificar(bruto[i:i + 6]))
+                    i += 6
+                    continue
+                saida.append(_decodificar(bruto[i:i + 2]))
+                i += 2
+                continue
+            saida.append(c)
+            i += 1
+        return "".join(saida)
+
+    def resultado(self) -> tuple[str, str]:
+        dados = _extrair_json(self.buffer)
+        if isinstance(dados, dict):
+            sentimento = dados.get("sentimento") or dados.get("sentiment")
+            resposta = str(dados.get("resposta") or dados.get("response") or "").strip()
+        elif self._resposta_inicio is not None or self.sentimento:
+            # JSON truncado (stream interrompido): fica com o que já foi lido
+            sentimento = self.sentimento
+            resposta = self._resposta_parcial().strip() if self._resposta_inicio is not None else ""
+        else:
+            sentimento, resposta = _texto_livre(self.buffer)
+            resposta = resposta.strip()
+        return normalizar_sentimento(sentimento, self.texto_usuario or resposta), resposta
@@ -0,0 +1,35 @@
+import asyncio
+
+
+async def esperar_evento(evento: asyncio.Event, segundos: float | None) -> bool:
+    """
+    Espera `evento` por até `segundos` (None = sem prazo); True se ele foi disparado.
+    Não usa asyncio.wait_for: no Python 3.11, se a espera interna já terminou
+    quando chega o cancel, o wait_for engole o CancelledError e a task não para.
+    """
+    if evento.is_set():
+        return True
+    espera = asyncio.ensure_future(evento.wait())
+    try:
+        await asyncio.wait((espera,), timeout=segundos)
+    finally:
+        espera.cancel()
+    return evento.is_set()
+
+
+async def encerrar(task: asyncio.Task | None, timeout: float = 10.0) -> None:
+    """
+    Espera o loop sair sozinho (o chamador já sinalizou a parada). Passado o
+    prazo, cancela e espera de novo com o mesmo prazo: o shutdown nunca trava.
+    """
+    if task is None:
+        return
+    await asyncio.wait((task,), timeout=timeout)
+    if not task.done():
+        task.cancel()
+        await asyncio.wait((task,), timeout=timeout)
+        if not task.done():
+            print(f"[tarefas] {task.get_name()} não terminou em {2 * timeout:.0f}s; seguindo com o shutdown")
+            return
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[tarefas] {task.get_name()} terminou com erro: {task.exception()}")
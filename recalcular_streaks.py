@@ -0,0 +1,15 @@
+# recalcular_streaks.py
+from app.database import SessionLocal
+from app import models  # garante que os models registrem as tabelas
+from app.crud import recalcular_progresso_desafios, recalcular_streaks
+
+print("Recalculando streaks a partir da tabela checkins…")
+db = SessionLocal()
+try:
+    total = recalcular_streaks(db)
+    print(f"{total} usuários com check-ins recalculados!")
+    # o progresso dos desafios depende das streaks e dos dias com check-in
+    desafios = recalcular_progresso_desafios(db)
+    print(f"{desafios} desafios ativos recalculados!")
+finally:
+    db.close()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+# configuração mínima antes de importar o app (Settings lê o ambiente no import)
+_DIR = tempfile.mkdtemp(prefix="betblocker-testes-")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "2525")
+os.environ.setdefault("SMTP_USER", "teste")
+os.environ.setdefault("SMTP_PASSWORD", "teste")
+os.environ.setdefault("SMTP_STARTTLS", "false")
+os.environ.setdefault("SMTP_USE_CREDENTIALS", "false")
+# TEST_DATABASE_URL aponta os testes para um Postgres de verdade; o padrão é um arquivo SQLite
+os.environ.setdefault("DATABASE_URL", os.environ.get("TEST_DATABASE_URL", f"sqlite:///{_DIR}/testes.db"))
+os.environ.setdefault("openai_api_key", "sk-teste")
+os.environ.setdefault("OPENAI_MODEL_DIARIO", "modelo-diario")
+os.environ.setdefault("OPENAI_MODEL_CONSELHO", "modelo-conselho")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")  # nada escuta aqui
+os.environ.setdefault("GATILHOS_NOTIFICAR", "false")
+os.environ.setdefault("STREAKS_EXPIRAR", "false")
+os.environ.setdefault("SQL_ORCAMENTO_ESTRITO", "true")  # rota acima do orçamento de SQL reprova o teste
+os.environ.setdefault("GATILHOS_LOCK_ARQUIVO", f"{_DIR}/gatilhos.lock")
+os.environ.setdefault("STREAKS_LOCK_ARQUIVO", f"{_DIR}/streaks.lock")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app import models
+from app.core.security import create_access_token, hash_password
+from app.database import Base, SessionLocal, engine
+from app.dependencies import auth as auth_dep
+from app.main import app
+from app.services import blocklist_matcher
+from app.services.catalogo_cache import catalogo_cache
+
+
+# benchmarks rodam reduzidos no CI; BENCH_COMPLETO=1 usa os tamanhos pedidos (1M linhas etc.)
+BENCH_COMPLETO = os.environ.get("BENCH_COMPLETO") == "1"
+
+
+@pytest.fixture
+def escala():
+    """escala(completo, reduzido) -> tamanho do benchmark nesta execução."""
+    return lambda completo, reduzido: completo if BENCH_COMPLETO else reduzido
+
+
+@pytest.fixture
+def relatar(request):
+    """Imprime uma linha de resultado do benchmark (visível com -s ou -rP)."""
+    def _relatar(**valores):
+        print(f"[bench] {request.node.name}: " + ", ".join(f"{k}={v}" for k, v in valores.items()))
+    return _relatar
+
+
+@pytest.fixture(autouse=True)
+def _banco_limpo():
+    """Cada teste começa com as tabelas vazias e sem caches de processo."""
+    yield
+    with engine.begin() as conn:
+        for tabela in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(tabela))
+    auth_dep._versoes.clear()
+    catalogo_cache.invalidar()
+    blocklist_matcher.matcher.carregado = False
+    blocklist_matcher._dono_global.clear()
+
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+@pytest.fixture
+def client():
+    # sem o lifespan: os workers de fundo não sobem nos testes de rota
+    return TestClient(app)
+
+
+@pytest.fixture
+def criar_usuario(db):
+    contador = iter(range(1, 1_000_000))
+
+    def _criar(**campos) -> models.Usuario:
+        n = next(contador)
+        campos.setdefault("nome", f"Usuário {n}")
+        campos.setdefault("email", f"usuario{n}@example.com")
+        campos.setdefault("senha", hash_password("Senha@123"))
+        campos.setdefault("email_verificado", True)
+        usuario = models.Usuario(**campos)
+        db.add(usuario)
+        db.commit()
+        db.refresh(usuario)
+        return usuario
+
+    return _criar
+
+
+@pytest.fixture
+def auth_headers():
+    def _headers(usuario: models.Usuario) -> dict:
+        token = create_access_token(auth_dep.claims_do_usuario(usuario))
+        return {"Authorization": f"Bearer {token}"}
+
+    return _headers
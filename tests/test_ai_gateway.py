@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from app import models
+from app.config import settings
+from app.services import ai_gateway
+from app.utils.ai_utils import gerar_aconselhamento_ia
+
+
+class _FakeOpenAI(ThreadingHTTPServer):
+    """POST /v1/chat/completions compatível com a API da OpenAI (normal e stream)."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.resposta = "Você não está sozinho. Respire fundo."
+        self.atraso_s = 0.0
+        self.pedidos: list[dict] = []
+        self.em_voo = self.max_em_voo = 0
+        self._lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        servidor: _FakeOpenAI = self.server
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with servidor._lock:
+            servidor.pedidos.append({"auth": self.headers.get("Authorization"), **corpo})
+            servidor.em_voo += 1
+            servidor.max_em_voo = max(servidor.max_em_voo, servidor.em_voo)
+        try:
+            time.sleep(servidor.atraso_s)
+            if corpo.get("stream"):
+                self._stream(corpo["model"], servidor.resposta)
+            else:
+                self._json(corpo["model"], servidor.resposta)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # o cliente desistiu (timeout)
+        finally:
+            with servidor._lock:
+                servidor.em_voo -= 1
+
+    def _json(self, model: str, texto: str):
+        dados = json.dumps({
+            "id": "chatcmpl-teste", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _stream(self, model: str, texto: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")  # corpo termina com o fechamento da conexão
+        self.end_headers()
+        for palavra in texto.split(" "):
+            chunk = {
+                "id": "chatcmpl-teste", "object": "chat.completion.chunk", "created": 0, "model": model,
+                "choices": [{"index": 0, "delta": {"content": palavra + " "}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    servidor = _FakeOpenAI()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"http://127.0.0.1:{servidor.server_address[1]}/v1")
+    # cliente e semáforos são por event loop: cada teste começa com os seus
+    ai_gateway._client = None
+    ai_gateway._semaforos.clear()
+    yield servidor
+    ai_gateway._client = None
+    ai_gateway._semaforos.clear()
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_aconselhamento_pela_api_fake(client, db, criar_usuario, auth_headers, fake_openai):
+    usuario = criar_usuario()
+    r = client.post("/aconselhamento/?cache=false", json={"mensagem": "quero apostar agora"}, headers=auth_headers(usuario))
+    assert r.status_code == 200, r.text
+    assert r.json()["resposta"] == fake_openai.resposta
+    (pedido,) = fake_openai.pedidos
+    assert pedido["auth"] == "Bearer sk-teste"
+    assert pedido["messages"][-1] == {"role": "user", "content": "quero apostar agora"}
+    assert db.query(models.Aconselhamento).filter_by(usuario_id=usuario.id).one().resposta == fake_openai.resposta
+
+
+def test_stream_sse_pela_api_fake(client, db, criar_usuario, auth_headers, fake_openai):
+    usuario = criar_usuario()
+    r = client.post("/aconselhamento/stream?cache=false", json={"mensagem": "recaí hoje"}, headers=auth_headers(usuario))
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    eventos = [bloco for bloco in r.text.split("\n\n") if bloco]
+    deltas = [json.loads(e[len("data: "):])["delta"] for e in eventos if e.startswith("data: ")]
+    assert len(deltas) == len(fake_openai.resposta.split(" "))
+    assert "".join(deltas).strip() == fake_openai.resposta
+    assert eventos[-1].startswith("event: fim")
+    assert fake_openai.pedidos[0]["stream"] is True
+    salvo = db.query(models.Aconselhamento).filter_by(usuario_id=usuario.id).one()
+    assert salvo.resposta.strip() == fake_openai.resposta
+
+
+def test_limite_de_concorrencia_por_modelo(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_MAX_CONCORRENCIA_POR_MODELO", 2)
+    fake_openai.atraso_s = 0.1
+
+    async def cenario():
+        return await asyncio.gather(*(
+            ai_gateway.completar("modelo-x", [{"role": "user", "content": str(i)}]) for i in range(6)
+        ))
+
+    assert asyncio.run(cenario()) == [fake_openai.resposta] * 6
+    assert fake_openai.max_em_voo == 2
+
+
+def test_timeout_vira_erro_sem_travar(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_TIMEOUT_SEGUNDOS", 0.2)
+    fake_openai.atraso_s = 2
+
+    t0 = time.perf_counter()
+    with pytest.raises(HTTPException) as erro:
+        asyncio.run(gerar_aconselhamento_ia("demora", usar_cache=False))
+    assert erro.value.status_code == 500
+    assert time.perf_counter() - t0 < 1.9  # 2 tentativas (max_retries=1) de 0,2 s + backoff
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+from app import crud, models, schemas
+from app.services import alert_aggregator as modulo
+from app.services.alert_aggregator import AlertAggregator
+
+
+def test_parar_nao_trava_com_notificacao_pendente(db, criar_usuario, monkeypatch):
+    usuario = criar_usuario()
+    site = crud.create_site(db, schemas.SiteBloqueadoCreate(url="bet365.com", tipo="apostas"), usuario.id)
+    em_voo, liberar = threading.Event(), threading.Event()
+    carregar = modulo._carregar_destinos
+
+    def carregar_devagar(prontos):
+        em_voo.set()
+        liberar.wait(5)
+        return carregar(prontos)
+
+    monkeypatch.setattr(modulo, "_carregar_destinos", carregar_devagar)
+
+    async def cenario():
+        agregador = AlertAggregator(janela_s=0, capacidade=5, recarga_s=60)
+        await agregador.iniciar()
+        agregador.registrar(usuario.id, site.id, datetime.now(timezone.utc))
+        while not em_voo.is_set():  # o tick já tirou a janela da fila
+            await asyncio.sleep(0.01)
+        assert agregador.pendentes == 0
+        parada = asyncio.create_task(agregador.parar())
+        await asyncio.sleep(0.05)
+        liberar.set()
+        await asyncio.wait_for(parada, timeout=5)
+        assert agregador._task is None
+        return agregador
+
+    agregador = asyncio.run(cenario())
+    assert agregador.contadores["enviados"] == 1
+    (email,) = db.query(models.EmailOutbox).all()
+    assert usuario.email in email.destinatarios and "bet365.com" in email.corpo
+
+
+def test_falha_no_envio_devolve_a_janela(db, criar_usuario, monkeypatch):
+    usuario = criar_usuario()
+    agregador = AlertAggregator(janela_s=0, capacidade=5, recarga_s=60)
+    agregador.registrar(usuario.id, 1, None)
+
+    async def falhar(*args):
+        raise RuntimeError("outbox fora do ar")
+
+    monkeypatch.setattr(modulo, "send_email_digest", falhar)
+    asyncio.run(agregador._enviar(agregador._coletar_prontos(float("inf"))))
+    agregador.registrar(usuario.id, 2, None)  # chegou outra enquanto isso
+    assert agregador.contadores["falhas"] == 1
+    assert agregador.pendentes == 1
+    assert agregador._pendentes[usuario.id].total == 2
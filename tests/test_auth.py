@@ -0,0 +1,93 @@
+from sqlalchemy import event
+
+from app import models
+from app.core.security import create_access_token
+from app.database import async_engine
+from app.dependencies import auth as auth_dep
+
+
+def _contar_statements():
+    contador = {"total": 0}
+
+    def contar(*_):
+        contador["total"] += 1
+
+    return contador, contar
+
+
+def test_cache_quente_nao_consulta_o_banco(client, criar_usuario, auth_headers):
+    headers = auth_headers(criar_usuario())
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    contador, contar = _contar_statements()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", contar)
+    try:
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", contar)
+    assert contador["total"] == 0
+
+
+def test_usuario_removido_nao_autentica(client, db, criar_usuario, auth_headers):
+    usuario = criar_usuario()
+    headers = auth_headers(usuario)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    db.delete(usuario)
+    db.commit()
+    auth_dep._versoes.clear()  # outro worker / cache expirado
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_troca_de_senha_revoga_tokens_anteriores(client, criar_usuario, auth_headers):
+    usuario = criar_usuario()
+    antigo = auth_headers(usuario)
+    resposta = client.patch(
+        f"/usuarios/{usuario.id}/senha", json={"senha_atual": "Senha@123", "nova_senha": "Nova@4567"}
+    )
+    assert resposta.status_code == 200
+    assert client.get("/auth/me", headers=antigo).status_code == 401
+
+    login = client.post("/auth/login", data={"username": usuario.email, "password": "Nova@4567"})
+    assert login.status_code == 200
+    novo = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert client.get("/auth/me", headers=novo).status_code == 200
+
+
+def test_versao_do_token_e_conferida_no_banco(client, db, criar_usuario):
+    usuario = criar_usuario()
+    claims = auth_dep.claims_do_usuario(usuario)
+    db.query(models.Usuario).filter_by(id=usuario.id).update({"token_version": 3})
+    db.commit()
+    auth_dep._versoes.clear()
+    velho = create_access_token(claims)
+    atual = create_access_token({**claims, "ver": 3})
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {velho}"}).status_code == 401
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {atual}"}).status_code == 200
+
+
+def test_principal_vem_das_claims_e_o_banco_so_confere_a_versao(client, criar_usuario):
+    usuario = criar_usuario()
+    token = create_access_token({**auth_dep.claims_do_usuario(usuario), "nome": "Nome do Token"})
+    headers = {"Authorization": f"Bearer {token}"}
+    auth_dep._versoes.clear()  # worker frio
+    contador, contar = _contar_statements()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", contar)
+    try:
+        r = client.get("/auth/me", headers=headers)
+        frio = contador["total"]
+        client.get("/auth/me", headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", contar)
+    assert r.status_code == 200 and r.json()["nome"] == "Nome do Token"
+    assert (frio, contador["total"]) == (1, 1)
+
+
+def test_revogacao_em_outro_worker_vale_quando_a_versao_expira(client, db, criar_usuario, auth_headers):
+    usuario = criar_usuario()
+    headers = auth_headers(usuario)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    # outro worker trocou a senha: aqui a versão em cache ainda é a antiga
+    db.query(models.Usuario).filter_by(id=usuario.id).update({"token_version": 1})
+    db.commit()
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    auth_dep._versoes.clear()  # passaram AUTH_CACHE_SEGUNDOS
+    assert client.get("/auth/me", headers=headers).status_code == 401
@@ -0,0 +1,82 @@
+import random
+import time
+
+import pytest
+from sqlalchemy import insert, select
+
+from app import models
+from app.services.blocklist_matcher import BlocklistMatcher
+
+pytestmark = pytest.mark.bench
+
+TLDS = ["com", "net", "bet", "com.br", "io"]
+
+
+def _regras(n: int, donos: list[int]) -> list[dict]:
+    rnd = random.Random(1)
+    return [
+        {
+            "url": ("*." if i % 10 == 0 else "") + f"site{i}.{TLDS[i % len(TLDS)]}",
+            "tipo": "apostas",
+            "usuario_id": rnd.choice(donos),
+        }
+        for i in range(n)
+    ]
+
+
+def _hosts(n_regras: int, quantidade: int) -> list[str]:
+    rnd = random.Random(2)
+    hosts = []
+    for _ in range(quantidade):
+        i = rnd.randrange(n_regras * 2)  # metade não existe
+        base = f"site{i}.{TLDS[i % len(TLDS)]}"
+        hosts.append(rnd.choice([base, f"www.{base}", f"m.apostas.{base}"]))
+    return hosts
+
+
+def _candidatas(host: str) -> list[str]:
+    """O que a consulta por SQL precisa procurar: cada sufixo, e "*." + sufixo próprio."""
+    labels = host.split(".")
+    candidatas = []
+    for i in range(len(labels) - 1):
+        sufixo = ".".join(labels[i:])
+        candidatas.append(sufixo)
+        if i > 0:
+            candidatas.append("*." + sufixo)
+    return candidatas
+
+
+def test_trie_contra_consulta_sql_por_url(db, criar_usuario, escala, relatar):
+    n_regras = escala(1_000_000, 20_000)
+    n_hosts = escala(100_000, 2_000)
+    donos = [criar_usuario().id for _ in range(3)]
+    regras = _regras(n_regras, donos)
+    for i in range(0, len(regras), 50_000):
+        db.execute(insert(models.SiteBloqueado), regras[i:i + 50_000])
+    db.commit()
+    hosts = _hosts(n_regras, n_hosts)
+
+    matcher = BlocklistMatcher()
+    t0 = time.perf_counter()
+    matcher.carregar(db)
+    compilar_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pelo_trie = [matcher.match(h) is not None for h in hosts]
+    trie_us = (time.perf_counter() - t0) / n_hosts * 1e6
+
+    S = models.SiteBloqueado
+    t0 = time.perf_counter()
+    pelo_sql = [
+        db.execute(select(S.id).where(S.url.in_(_candidatas(h))).limit(1)).first() is not None
+        for h in hosts
+    ]
+    sql_us = (time.perf_counter() - t0) / n_hosts * 1e6
+
+    relatar(
+        regras=n_regras, hosts=n_hosts, compilar_s=round(compilar_s, 2),
+        trie_us_por_host=round(trie_us, 2), sql_us_por_host=round(sql_us, 1), bloqueados=sum(pelo_trie),
+    )
+    assert pelo_trie == pelo_sql
+    assert 0 < sum(pelo_trie) < n_hosts
+    assert trie_us < sql_us
@@ -0,0 +1,61 @@
+from app import crud, schemas
+from app.config import settings
+from app.services.blocklist_matcher import BlocklistMatcher
+
+
+def _matcher(*regras: tuple[int, str, int]) -> BlocklistMatcher:
+    m = BlocklistMatcher()
+    for site_id, url, dono in regras:
+        m.adicionar(site_id, url, dono)
+    return m
+
+
+def test_curinga_casa_subdominios_inclusive_www():
+    m = _matcher((1, "*.sportingbet.com", 1))
+    assert m.match("www.sportingbet.com") == (1, "sportingbet.com")
+    assert m.match("https://a.b.sportingbet.com/x") == (1, "sportingbet.com")
+    assert m.match("sportingbet.com") is None
+
+
+def test_www_na_regra_vale_para_o_dominio():
+    m = _matcher((1, "https://www.Bet365.com/apostas", 1))
+    for host in ("bet365.com", "www.bet365.com", "m.bet365.com"):
+        assert m.match(host) == (1, "bet365.com")
+    assert m.match("notbet365.com") is None
+
+
+def test_regra_mais_especifica_e_filtro_por_dono():
+    m = _matcher((1, "bet.com", 1), (2, "live.bet.com", 2))
+    assert m.match("x.live.bet.com") == (2, "live.bet.com")
+    assert m.match("x.live.bet.com", {1}) == (1, "bet.com")
+    assert m.match("x.live.bet.com", {3}) is None
+
+
+def test_remover_e_atualizar():
+    m = _matcher((1, "bet.com", 1))
+    m.adicionar(1, "aposta.net", 1)
+    assert m.match("bet.com") is None
+    assert m.match("aposta.net") == (1, "aposta.net")
+    m.remover(1)
+    assert m.match("aposta.net") is None
+    assert len(m) == 0
+
+
+def test_match_so_ve_as_proprias_regras_e_as_globais(client, db, criar_usuario, auth_headers):
+    eu, outro = criar_usuario(), criar_usuario()
+    admin = criar_usuario(email=settings.ADMIN_EMAIL)
+    meu = crud.create_site(db, schemas.SiteBloqueadoCreate(url="meu.com"), eu.id)
+    crud.create_site(db, schemas.SiteBloqueadoCreate(url="deoutro.com"), outro.id)
+    global_ = crud.create_site(db, schemas.SiteBloqueadoCreate(url="*.global.com"), admin.id)
+
+    hosts = ["meu.com", "deoutro.com", "www.global.com"]
+    resposta = client.post("/sites-bloqueados/match", json={"hostnames": hosts}, headers=auth_headers(eu))
+    assert resposta.status_code == 200
+    assert [(r["bloqueado"], r["site_id"]) for r in resposta.json()["resultados"]] == [
+        (True, meu.id), (False, None), (True, global_.id),
+    ]
+
+    resposta = client.post(
+        "/sites-bloqueados/match", json={"hostnames": hosts, "apenas_meus": True}, headers=auth_headers(eu)
+    )
+    assert [r["bloqueado"] for r in resposta.json()["resultados"]] == [True, False, False]
@@ -0,0 +1,63 @@
+from app import crud, schemas
+from app.services.blocklist_matcher import BlocklistMatcher
+
+
+def _criar_site(db, url: str, usuario_id: int):
+    return crud.create_site(db, schemas.SiteBloqueadoCreate(url=url, tipo="apostas"), usuario_id)
+
+
+def test_delta_e_304_na_versao_atual(client, db, criar_usuario):
+    usuario = criar_usuario()
+    a = _criar_site(db, "bet-a.com", usuario.id)
+    v1 = crud.get_blocklist_version(db)
+    b = _criar_site(db, "bet-b.com", usuario.id)
+    crud.delete_site(db, a)
+
+    r = client.get("/sites-bloqueados/sync", params={"since": v1})
+    assert r.status_code == 200
+    corpo = r.json()
+    assert corpo["reset"] is False
+    assert [s["id"] for s in corpo["adicionados"]] == [b.id]
+    assert corpo["removidos"] == [a.id]
+    assert corpo["versao"] == crud.get_blocklist_version(db)
+
+    r = client.get("/sites-bloqueados/sync", params={"since": corpo["versao"]})
+    assert r.status_code == 304
+
+
+def test_etag_sem_since_responde_304(client, db, criar_usuario):
+    usuario = criar_usuario()
+    _criar_site(db, "bet-a.com", usuario.id)
+
+    r = client.get("/sites-bloqueados/sync")
+    assert r.status_code == 200 and r.json()["reset"] is True
+    etag = r.headers["ETag"]
+    r = client.get("/sites-bloqueados/sync", params={"since": 0}, headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.headers["ETag"] == etag
+
+    _criar_site(db, "bet-b.com", usuario.id)
+    r = client.get("/sites-bloqueados/sync", params={"since": 0}, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["reset"] is True  # lista mudou: baixa o snapshot de novo
+    assert r.headers["ETag"] != etag
+
+
+def test_cliente_a_frente_do_servidor_recebe_reset(client, db, criar_usuario):
+    usuario = criar_usuario()
+    _criar_site(db, "bet-a.com", usuario.id)
+    atual = crud.get_blocklist_version(db)
+
+    r = client.get("/sites-bloqueados/sync", params={"since": atual + 100})
+    assert r.status_code == 200
+    assert r.json() == {"versao": atual, "reset": True, "adicionados": [], "removidos": []}
+
+
+def test_matcher_recarrega_quando_o_change_log_volta(db, criar_usuario):
+    usuario = criar_usuario()
+    site = _criar_site(db, "bet-a.com", usuario.id)
+    matcher = BlocklistMatcher()
+    matcher.carregar(db)
+    matcher.versao += 100  # versão de um banco que foi restaurado de um backup mais antigo
+    crud.delete_site(db, site)
+    matcher.sincronizar(db)
+    assert matcher.versao == crud.get_blocklist_version(db)
+    assert matcher.match("bet-a.com", None) is None
@@ -0,0 +1,51 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app import crud, models
+from app.crud import today_utc
+from app.database import SessionLocal
+
+N = 16
+
+
+def test_checkins_concorrentes_avancam_a_streak_uma_vez(db, criar_usuario):
+    hoje = today_utc()
+    usuario = criar_usuario(
+        streak_started_at=datetime.combine(hoje - timedelta(days=2), datetime.min.time(), tzinfo=timezone.utc),
+        last_checkin_date=hoje - timedelta(days=1),
+    )
+    # cada check-in aplicado soma 1 em dias_checkin: conta quantas transições passaram
+    desafio = models.UserChallenge(
+        user_id=usuario.id, title="30 dias", target_type="money", target_value=1000,
+        status="active", started_at=datetime.now(timezone.utc), baseline_money=10,
+    )
+    db.add(desafio)
+    db.commit()
+    usuario_id, desafio_id = usuario.id, desafio.id  # as threads não tocam na sessão do teste
+
+    barreira = threading.Barrier(N)
+    streaks, erros = [], []
+
+    def checkin():
+        sessao = SessionLocal()
+        try:
+            barreira.wait()
+            streaks.append(crud.get_current_streak_days(crud.do_daily_checkin(sessao, usuario_id)))
+        except Exception as e:  # "database is locked" etc. também reprovam
+            erros.append(e)
+        finally:
+            sessao.close()
+
+    threads = [threading.Thread(target=checkin) for _ in range(N)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert erros == []
+    assert streaks == [3] * N
+    db.expire_all()
+    assert db.get(models.Usuario, usuario_id).last_checkin_date == hoje
+    assert db.query(models.Checkin).filter_by(usuario_id=usuario_id, dia=hoje).count() == 1
+    desafio = db.get(models.UserChallenge, desafio_id)
+    assert (desafio.dias_checkin, desafio.progress_value) == (1, 10)
@@ -0,0 +1,44 @@
+import asyncio
+
+from app import crud, models
+from app.services.diario_enrichment import DiarioEnriquecedor
+from app.utils.structured_output import RESPONSE_FORMAT_ANALISES_LOTE
+
+
+def _pendentes(db, usuario, n: int) -> list[int]:
+    diarios = [
+        models.DiarioEmocional(texto=f"desabafo {i}", sentimento="Neutro", usuario_id=usuario.id, analise_status="pendente")
+        for i in range(n)
+    ]
+    db.add_all(diarios)
+    db.commit()
+    return [d.id for d in diarios]
+
+
+def test_parar_nao_trava_com_notificacao_pendente():
+    async def cenario():
+        worker = DiarioEnriquecedor(lote_max=10, max_tentativas=3, intervalo_s=30)
+        await worker.iniciar()
+        for _ in range(50):
+            await asyncio.sleep(0)
+            worker.notificar()
+        await asyncio.wait_for(worker.parar(), timeout=5)
+        assert worker._task is None
+
+    asyncio.run(cenario())
+
+
+def test_reservas_nao_se_sobrepoem(db, criar_usuario):
+    ids = _pendentes(db, criar_usuario(), 15)
+    primeira = {d["id"] for d in crud.claim_diarios_pendentes(db, 10)}
+    segunda = {d["id"] for d in crud.claim_diarios_pendentes(db, 10)}
+    assert len(primeira) == 10
+    assert primeira.isdisjoint(segunda)
+    assert primeira | segunda == set(ids)
+    assert crud.claim_diarios_pendentes(db, 10) == []
+
+
+def test_schema_do_lote_exige_id_em_cada_analise():
+    item = RESPONSE_FORMAT_ANALISES_LOTE["json_schema"]["schema"]["properties"]["analises"]["items"]
+    assert item["required"] == ["id", "sentimento", "resposta"]
+    assert item["additionalProperties"] is False
@@ -0,0 +1,18 @@
+import asyncio
+
+from app.config import settings
+from app.services.gatilho_scheduler import GatilhoScheduler
+
+
+def test_parar_nao_trava_com_notificacao_pendente():
+    async def cenario():
+        agendador = GatilhoScheduler(sync_s=30, lock_arquivo=settings.GATILHOS_LOCK_ARQUIVO)
+        await agendador.iniciar()
+        for _ in range(50):
+            await asyncio.sleep(0)
+            agendador.notificar()
+        await asyncio.wait_for(agendador.parar(), timeout=5)
+        assert agendador._task is None
+        assert not agendador.lider
+
+    asyncio.run(cenario())
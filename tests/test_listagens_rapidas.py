@@ -0,0 +1,142 @@
+import gc
+import json
+import time
+from datetime import datetime, time as hora, timedelta
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import Aconselhamento, Gatilho
+from app.routes.gatilhos import _csv_to_ints
+from app.schemas import AconselhamentoOut, GatilhoOut
+from app.utils.model_utils import to_pydantic
+from app.utils.paginacao import Paginacao
+
+
+def _popular(db: Session, usuario_id: int, n: int):
+    inicio = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    db.execute(insert(Aconselhamento), [
+        {"usuario_id": usuario_id, "mensagem": f"mensagem {i} com \"aspas\" e acentuação",
+         "resposta": "Respire fundo. " * 8, "data": inicio + timedelta(minutes=i)}
+        for i in range(n)
+    ])
+    db.execute(insert(Gatilho), [
+        {"usuario_id": usuario_id, "nome": f"Gatilho {i}", "dias_da_semana": "0,4,6" if i % 2 else "",
+         "hora_inicio": hora(20, 0), "hora_fim": hora(23, 59), "ativo": bool(i % 3), "criado_em": inicio + timedelta(minutes=i)}
+        for i in range(n)
+    ])
+    db.commit()
+
+
+def _pelo_pydantic(schema, objetos) -> list:
+    """O que o caminho antigo mandava: response_model validado e serializado pelo Pydantic."""
+    adaptador = TypeAdapter(list[schema])
+    return json.loads(adaptador.dump_json(adaptador.validate_python(objetos, from_attributes=True)))
+
+
+def test_caminho_rapido_gera_o_mesmo_json_que_o_pydantic(client, db, criar_usuario, auth_headers):
+    usuario = criar_usuario()
+    _popular(db, usuario.id, 5)
+
+    r = client.get("/aconselhamento/", headers=auth_headers(usuario))
+    assert r.status_code == 200 and r.headers["content-type"] == "application/json"
+    registros = db.query(Aconselhamento).order_by(Aconselhamento.data.desc(), Aconselhamento.id.desc()).all()
+    assert r.json() == _pelo_pydantic(AconselhamentoOut, registros)
+
+    r = client.get("/gatilhos/", headers=auth_headers(usuario))
+    gatilhos = db.query(Gatilho).order_by(Gatilho.criado_em.desc(), Gatilho.id.desc()).all()
+    assert r.json() == _pelo_pydantic(GatilhoOut, [
+        {**{c: getattr(g, c) for c in GatilhoOut.model_fields}, "dias_da_semana": _csv_to_ints(g.dias_da_semana)}
+        for g in gatilhos
+    ])
+
+
+def test_caminho_rapido_pagina_e_projeta(client, db, criar_usuario, auth_headers):
+    usuario = criar_usuario()
+    _popular(db, usuario.id, 5)
+
+    r = client.get("/gatilhos/?limit=2&fields=nome,dias_da_semana", headers=auth_headers(usuario))
+    assert [list(g) for g in r.json()] == [["id", "nome", "dias_da_semana"]] * 2
+    assert [g["dias_da_semana"] for g in r.json()] == [[], [0, 4, 6]]
+    vistos = [g["id"] for g in r.json()]
+    while "X-Next-Cursor" in r.headers:
+        r = client.get(f"/gatilhos/?limit=2&cursor={r.headers['X-Next-Cursor']}", headers=auth_headers(usuario))
+        vistos += [g["id"] for g in r.json()]
+    assert len(vistos) == len(set(vistos)) == 5
+
+    assert client.get("/aconselhamento/?fields=senha", headers=auth_headers(usuario)).status_code == 400
+
+
+def _app_de_listagem(usuario_id: int, limite: int) -> FastAPI:
+    """
+    As duas versões da listagem lado a lado, sem o teto de `limit` da rota
+    pública: /antes/ é o ORM -> to_pydantic -> response_model; /depois/ é o
+    select Core -> bytes de `responder_rapido`.
+    """
+    app = FastAPI()
+
+    @app.get("/antes/aconselhamento/", response_model=list[AconselhamentoOut])
+    def antes_aconselhamento(request: Request, db: Session = Depends(get_db)):
+        pagina = Paginacao(request, limit=limite, cursor=None, fields=None)
+        query = db.query(Aconselhamento).filter_by(usuario_id=usuario_id)
+        registros = pagina.aplicar(query, Aconselhamento, Aconselhamento.data, AconselhamentoOut)
+        return [to_pydantic(r, AconselhamentoOut) for r in registros]
+
+    @app.get("/depois/aconselhamento/", response_model=list[AconselhamentoOut])
+    def depois_aconselhamento(request: Request, db: Session = Depends(get_db)):
+        pagina = Paginacao(request, limit=limite, cursor=None, fields=None)
+        linhas = pagina.consultar(db, Aconselhamento, Aconselhamento.data, AconselhamentoOut, Aconselhamento.usuario_id == usuario_id)
+        return pagina.responder_rapido(AconselhamentoOut, linhas)
+
+    @app.get("/antes/gatilhos/", response_model=list[GatilhoOut])
+    def antes_gatilhos(request: Request, db: Session = Depends(get_db)):
+        pagina = Paginacao(request, limit=limite, cursor=None, fields=None)
+        query = db.query(Gatilho).filter(Gatilho.usuario_id == usuario_id)
+        itens = pagina.aplicar(query, Gatilho, Gatilho.criado_em, GatilhoOut)
+        return [
+            GatilhoOut(id=i.id, nome=i.nome, dias_da_semana=_csv_to_ints(i.dias_da_semana),
+                       hora_inicio=i.hora_inicio, hora_fim=i.hora_fim, ativo=i.ativo, criado_em=i.criado_em)
+            for i in itens
+        ]
+
+    @app.get("/depois/gatilhos/", response_model=list[GatilhoOut])
+    def depois_gatilhos(request: Request, db: Session = Depends(get_db)):
+        pagina = Paginacao(request, limit=limite, cursor=None, fields=None)
+        linhas = pagina.consultar(db, Gatilho, Gatilho.criado_em, GatilhoOut, Gatilho.usuario_id == usuario_id)
+        return pagina.responder_rapido(GatilhoOut, linhas, {"dias_da_semana": _csv_to_ints})
+
+    return app
+
+
+@pytest.mark.bench
+def test_cpu_por_requisicao_com_10k_linhas(db, criar_usuario, escala, relatar):
+    linhas = escala(10_000, 2_000)
+    requisicoes = escala(20, 5)
+    usuario = criar_usuario()
+    _popular(db, usuario.id, linhas)
+
+    cpu_ms = {}
+    with TestClient(_app_de_listagem(usuario.id, linhas)) as cliente:
+        for rota in ("aconselhamento", "gatilhos"):
+            corpos = {}
+            for versao in ("antes", "depois"):
+                url = f"/{versao}/{rota}/"
+                cliente.get(url)  # aquece o cache de compilação do SQL
+                gc.collect()  # o lixo de uma versão não entra na conta da outra
+                t0 = time.process_time()
+                for _ in range(requisicoes):
+                    r = cliente.get(url)
+                cpu_ms[versao] = (time.process_time() - t0) / requisicoes * 1000
+                assert r.status_code == 200
+                corpos[versao] = r.json()
+            assert corpos["antes"] == corpos["depois"] and len(corpos["depois"]) == linhas
+            relatar(
+                rota=rota, linhas=linhas, requisicoes=requisicoes, cpu_antes_ms=round(cpu_ms["antes"], 1),
+                cpu_depois_ms=round(cpu_ms["depois"], 1), reducao=f"{1 - cpu_ms['depois'] / cpu_ms['antes']:.0%}",
+            )
+            assert cpu_ms["depois"] < cpu_ms["antes"]
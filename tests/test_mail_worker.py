@@ -0,0 +1,145 @@
+import asyncio
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app import crud, models
+from app.config import settings
+from app.database import SessionLocal
+from app.services.mail_worker import MailWorker
+
+
+def _enfileirar(db, n: int) -> list[int]:
+    return [crud.enqueue_email(db, [f"d{i}@teste.local"], f"assunto {i}", "corpo").id for i in range(n)]
+
+
+def test_parar_nao_trava_com_notificacao_pendente():
+    async def cenario():
+        worker = MailWorker(pool_size=1, lote_max=10, max_tentativas=3, backoff_s=1, intervalo_s=30)
+        await worker.iniciar()
+        for _ in range(50):
+            await asyncio.sleep(0)
+            worker.notificar()   # a espera interna termina junto com o pedido de parada
+        await asyncio.wait_for(worker.parar(), timeout=5)
+        assert worker._task is None
+
+    asyncio.run(cenario())
+
+
+def test_reservas_nao_se_sobrepoem(db):
+    ids = _enfileirar(db, 40)
+    primeira = {i["id"] for i in crud.claim_emails(db, 25)}
+    segunda = {i["id"] for i in crud.claim_emails(db, 25)}
+    assert len(primeira) == 25
+    assert primeira.isdisjoint(segunda)
+    assert primeira | segunda == set(ids)
+    assert crud.claim_emails(db, 25) == []
+
+
+def test_reservas_concorrentes_nao_se_sobrepoem(db):
+    ids = _enfileirar(db, 60)
+    barreira = threading.Barrier(4)
+    reservados: list[list[int]] = []
+
+    def reservar():
+        sessao = SessionLocal()
+        try:
+            barreira.wait()
+            reservados.append([i["id"] for i in crud.claim_emails(sessao, 30)])
+        finally:
+            sessao.close()
+
+    threads = [threading.Thread(target=reservar) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    todos = [i for lote in reservados for i in lote]
+    assert len(todos) == len(set(todos))
+    # quem perdeu a disputa volta com menos itens; o resto sai na próxima rodada
+    restantes = [i["id"] for i in crud.claim_emails(db, 60)]
+    assert set(todos).isdisjoint(restantes)
+    assert set(todos) | set(restantes) == set(ids)
+
+
+def test_lease_vencido_volta_a_ser_reservado(db):
+    (id_,) = _enfileirar(db, 1)
+    assert [i["id"] for i in crud.claim_emails(db, 10)] == [id_]
+    assert crud.claim_emails(db, 10) == []
+    item = db.get(models.EmailOutbox, id_)
+    item.proxima_tentativa_em = datetime.now(timezone.utc) - timedelta(seconds=1)  # worker caiu
+    db.commit()
+    assert [i["id"] for i in crud.claim_emails(db, 10)] == [id_]
+
+
+class _Caixa:
+    """Handler do aiosmtpd: guarda as mensagens e recusa destinatários @recusa.local."""
+
+    def __init__(self):
+        self.mensagens = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@recusa.local"):
+            return "550 destinatário recusado"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensagens.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def servidor_smtp(monkeypatch):
+    with socket.socket() as s:  # porta livre (o Controller não aceita port=0)
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    caixa = _Caixa()
+    controller = Controller(caixa, hostname="127.0.0.1", port=porta)
+    controller.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", porta)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(settings, "SMTP_USE_CREDENTIALS", False)
+    yield caixa
+    controller.stop()
+
+
+def _status(ids: list[int]) -> dict[int, str]:
+    sessao = SessionLocal()
+    try:
+        return dict(sessao.query(models.EmailOutbox.id, models.EmailOutbox.status).filter(models.EmailOutbox.id.in_(ids)))
+    finally:
+        sessao.close()
+
+
+def test_entrega_pelo_smtp_e_reagenda_falhas(db, servidor_smtp):
+    ok = _enfileirar(db, 12)
+    recusado = crud.enqueue_email(db, ["alguem@recusa.local"], "assunto", "corpo").id
+
+    async def cenario():
+        worker = MailWorker(pool_size=2, lote_max=5, max_tentativas=3, backoff_s=60, intervalo_s=0.05)
+        await worker.iniciar()
+        for _ in range(200):
+            if worker.contadores["enviados"] == len(ok) and worker.contadores["falhas"] == 1:
+                break
+            await asyncio.sleep(0.05)
+        await worker.parar()
+        return worker
+
+    worker = asyncio.run(cenario())
+    assert sorted(m.rcpt_tos[0] for m in servidor_smtp.mensagens) == sorted(f"d{i}@teste.local" for i in range(12))
+    assert set(_status(ok).values()) == {"enviado"}
+    assert _status([recusado]) == {recusado: "pendente"}   # volta com backoff
+    assert worker.contadores["retentativas"] == 1
+    assert worker.metricas()["latencia_p50_ms"] is not None
+
+
+def test_metricas_de_envio_so_para_o_admin(client, criar_usuario, auth_headers):
+    assert client.get("/emails/metricas").status_code == 401
+    assert client.get("/emails/metricas", headers=auth_headers(criar_usuario())).status_code == 403
+    resposta = client.get("/emails/metricas", headers=auth_headers(criar_usuario(email="admin@example.com")))
+    assert resposta.status_code == 200
@@ -0,0 +1,86 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base
+from app.migracoes import COLUNAS, migrar
+
+# esquema das tabelas antes das colunas novas
+LEGADO = [
+    """CREATE TABLE usuarios (
+        id INTEGER PRIMARY KEY, nome VARCHAR, email VARCHAR UNIQUE, senha VARCHAR,
+        email_verificado BOOLEAN NOT NULL, streak_started_at DATETIME,
+        best_streak_days INTEGER NOT NULL, last_streak_days INTEGER NOT NULL, last_checkin_date DATE)""",
+    """CREATE TABLE diario_emocional (
+        id INTEGER PRIMARY KEY, texto TEXT NOT NULL, sentimento VARCHAR, resposta TEXT,
+        data DATETIME, usuario_id INTEGER NOT NULL REFERENCES usuarios(id))""",
+    """CREATE TABLE gatilhos (
+        id INTEGER PRIMARY KEY, usuario_id INTEGER NOT NULL REFERENCES usuarios(id), nome VARCHAR NOT NULL,
+        dias_da_semana VARCHAR NOT NULL, hora_inicio TIME NOT NULL, hora_fim TIME NOT NULL,
+        ativo BOOLEAN NOT NULL, criado_em DATETIME NOT NULL)""",
+    """CREATE TABLE challenge_templates (
+        id INTEGER PRIMARY KEY, slug VARCHAR(80) UNIQUE, title VARCHAR(120) NOT NULL, description TEXT,
+        target_type VARCHAR(8) NOT NULL, target_value INTEGER, starts_at DATETIME, expires_at DATETIME,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)""",
+    """CREATE TABLE user_challenges (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES usuarios(id),
+        template_id INTEGER REFERENCES challenge_templates(id), title VARCHAR(120) NOT NULL, description TEXT,
+        target_type VARCHAR(8) NOT NULL, target_value INTEGER NOT NULL, deadline_days INTEGER,
+        status VARCHAR(9) NOT NULL, started_at DATETIME, completed_at DATETIME, abandoned_at DATETIME,
+        baseline_money INTEGER, baseline_time_min INTEGER, baseline_streak_days INTEGER,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)""",
+    """CREATE TABLE usuarios_painel_snapshot (
+        usuario_id INTEGER PRIMARY KEY REFERENCES usuarios(id) ON DELETE CASCADE, dia DATE NOT NULL,
+        dados TEXT NOT NULL, atualizado_em DATETIME NOT NULL)""",
+]
+
+
+@pytest.fixture
+def base_antiga(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/antiga.db")
+    hoje = date.today()
+    with engine.begin() as conn:
+        for ddl in LEGADO:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO usuarios VALUES (1, 'Ana', 'ana@example.com', 'x', 1, :inicio, 0, 0, :ultimo)"
+        ), {"inicio": f"{hoje - timedelta(days=4)} 08:00:00.000000", "ultimo": str(hoje)})
+        conn.execute(text(
+            "INSERT INTO diario_emocional VALUES (1, 'dia difícil', 'Tristeza', 'força', :data, 1)"
+        ), {"data": f"{hoje} 10:00:00.000000"})
+        conn.execute(text(
+            "INSERT INTO gatilhos VALUES (1, 1, 'Noite', '0,4', '20:00:00.000000', '23:00:00.000000', 1, :agora)"
+        ), {"agora": f"{hoje} 09:00:00.000000"})
+        conn.execute(text(
+            "INSERT INTO user_challenges (id, user_id, title, target_type, target_value, status, started_at,"
+            " baseline_money, created_at, updated_at)"
+            " VALUES (1, 1, 'Economizar', 'money', 1000, 'active', :inicio, 50, :inicio, :inicio)"
+        ), {"inicio": f"{hoje - timedelta(days=2)} 00:00:00.000000"})
+    yield engine
+    engine.dispose()
+
+
+def test_base_antiga_recebe_colunas_e_indices_e_os_backfills_rodam(base_antiga):
+    Base.metadata.create_all(bind=base_antiga)   # mesma ordem do app.main
+    adicionadas = migrar(base_antiga)
+    assert sorted(adicionadas) == sorted(f"{c.table.name}.{c.name}" for c, _ in COLUNAS)
+    assert "ix_gatilhos_usuario_criado" in {i["name"] for i in inspect(base_antiga).get_indexes("gatilhos")}
+    assert migrar(base_antiga) == []   # idempotente
+
+    db = sessionmaker(bind=base_antiga)()
+    try:
+        usuario = db.get(models.Usuario, 1)
+        assert (usuario.fuso_horario, usuario.token_version) == ("America/Sao_Paulo", 0)
+        assert db.get(models.DiarioEmocional, 1).analise_status == "concluida"
+        assert crud.reconstruir_rollup_diario(db) == 2          # dia + semana
+        assert crud.reconstruir_agenda_gatilhos(db) == 1
+        gatilho = db.get(models.Gatilho, 1)
+        assert gatilho.dias_mask == 0b10001 and gatilho.atualizado_em is not None
+        assert crud.reconstruir_checkins(db) == 5
+        assert crud.recalcular_progresso_desafios(db) == 1
+        assert db.get(models.UserChallenge, 1).progress_value == 150  # 3 dias com check-in x 50
+    finally:
+        db.close()
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import select
+
+from app import models
+from app.config import settings
+from app.utils.orcamento_sql import OrcamentoSQLExcedido, contar_sql
+
+
+@pytest.fixture(autouse=True)
+def estrito(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_ORCAMENTO_ESTRITO", True)
+
+
+@pytest.fixture
+def template(db):
+    tpl = models.ChallengeTemplate(slug="sem-apostas-7", title="7 dias", target_type="streak", target_value=7)
+    db.add(tpl)
+    db.commit()
+    return tpl
+
+
+def test_contador_estrito_falha_no_statement_excedente(db):
+    with contar_sql(maximo=1, estrito=True) as contador:
+        db.execute(select(1))
+        with pytest.raises(OrcamentoSQLExcedido):
+            db.execute(select(2))
+    assert contador.total == 2
+
+
+def test_meus_desafios_cabe_no_orcamento(client, db, criar_usuario, auth_headers, template):
+    usuario = criar_usuario()
+    for _ in range(5):  # com lazy load de template por item seriam 1 + 5 statements
+        client.post("/challenges/", json={"template_id": template.id}, headers=auth_headers(usuario))
+    resposta = client.get("/challenges/me", headers=auth_headers(usuario))
+    assert resposta.status_code == 200
+    assert len(resposta.json()) == 5
+
+
+def test_criar_desafio_cabe_no_orcamento(client, criar_usuario, auth_headers, template):
+    resposta = client.post("/challenges/", json={"template_id": template.id}, headers=auth_headers(criar_usuario()))
+    assert resposta.status_code == 200
+    assert resposta.json()["template_id"] == template.id
+
+
+def test_criar_desafio_custom_cabe_no_orcamento(client, criar_usuario, auth_headers):
+    resposta = client.post(
+        "/challenges/",
+        json={"title": "Sem apostas", "target_type": "money", "target_value": 500},
+        headers=auth_headers(criar_usuario()),
+    )
+    assert resposta.status_code == 200
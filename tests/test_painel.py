@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from app import crud
+from app.crud import today_utc
+from app.database import SessionLocal
+from app.services import painel_usuario
+
+
+def _inicio(dias_atras: int) -> datetime:
+    return datetime.combine(today_utc() - timedelta(days=dias_atras), datetime.min.time(), tzinfo=timezone.utc)
+
+
+def test_checkin_durante_o_calculo_nao_deixa_snapshot_velho(db, criar_usuario, monkeypatch):
+    usuario = criar_usuario(streak_started_at=_inicio(3), last_checkin_date=today_utc() - timedelta(days=1))
+    usuario_id = usuario.id
+    get_baseline = crud.get_baseline_by_user
+
+    def checkin_no_meio(sessao, uid):
+        # o usuário já foi lido com a streak de ontem; o check-in commita antes da gravação
+        outra = SessionLocal()
+        try:
+            crud.do_daily_checkin(outra, uid)
+        finally:
+            outra.close()
+        return get_baseline(sessao, uid)
+
+    for versao_anterior in (False, True):  # sem linha de snapshot e com linha invalidada
+        monkeypatch.setattr(crud, "get_baseline_by_user", checkin_no_meio)
+        assert painel_usuario.obter(db, usuario_id)["streak"]["currentDays"] == 3
+        monkeypatch.setattr(crud, "get_baseline_by_user", get_baseline)
+        db.expire_all()
+        assert painel_usuario.obter(db, usuario_id)["streak"]["currentDays"] == 4
+
+        if not versao_anterior:  # prepara a segunda volta: streak de ontem outra vez
+            usuario = db.get(type(usuario), usuario_id)
+            usuario.last_checkin_date = today_utc() - timedelta(days=1)
+            crud.invalidar_painel(db, usuario_id)
+            db.commit()
+
+
+def test_painel_usa_a_mesma_streak_do_checkin(client, db, criar_usuario):
+    usuario = criar_usuario(streak_started_at=_inicio(9), last_checkin_date=today_utc() - timedelta(days=1))
+    r = client.post(f"/usuarios/{usuario.id}/checkin")
+    assert r.status_code == 201
+    db.refresh(usuario)
+    esperado = crud.get_current_streak_days(usuario)
+    assert esperado == 10
+    assert client.get(f"/usuarios/{usuario.id}/streak").json()["currentDays"] == esperado
+    assert client.get(f"/usuarios/{usuario.id}/dashboard").json()["streak"]["currentDays"] == esperado
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+from app.config import settings
+from app.core.security import hash_password
+from app.services.password_hasher import PasswordHasher
+
+
+def test_rehash_quando_o_custo_muda():
+    antigo = bcrypt.using(rounds=4).hash("Senha@123")
+    hasher = PasswordHasher(workers=1, fila_max=4)
+    try:
+        ok, novo = asyncio.run(hasher.verificar("Senha@123", antigo))
+    finally:
+        hasher.encerrar()
+    assert ok
+    assert novo.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert hasher.contadores["rehashes"] == 1
+
+
+def test_fila_cheia_responde_429():
+    hash_atual = hash_password("Senha@123")
+    hasher = PasswordHasher(workers=1, fila_max=2)
+
+    async def cenario():
+        return await asyncio.gather(
+            *(hasher.verificar("Senha@123", hash_atual) for _ in range(5)), return_exceptions=True
+        )
+
+    try:
+        resultados = asyncio.run(cenario())
+    finally:
+        hasher.encerrar()
+    rejeitados = [r for r in resultados if isinstance(r, HTTPException)]
+    assert [r.status_code for r in rejeitados] == [429] * 3
+    assert [r for r in resultados if not isinstance(r, HTTPException)] == [(True, None)] * 2
+
+
+@pytest.mark.bench
+def test_logins_por_segundo(escala, relatar):
+    logins = escala(200, 12)
+    hash_atual = hash_password("Senha@123")
+    hasher = PasswordHasher(workers=settings.HASH_WORKERS, fila_max=logins)
+    atrasos = []
+
+    async def cenario():
+        feito = False
+
+        async def sonda():  # o event loop continua livre enquanto o bcrypt roda
+            while not feito:
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.01)
+                atrasos.append(time.perf_counter() - t0 - 0.01)
+
+        tarefa = asyncio.create_task(sonda())
+        t0 = time.perf_counter()
+        resultados = await asyncio.gather(*(hasher.verificar("Senha@123", hash_atual) for _ in range(logins)))
+        segundos = time.perf_counter() - t0
+        feito = True
+        await tarefa
+        return resultados, segundos
+
+    try:
+        resultados, segundos = asyncio.run(cenario())
+    finally:
+        hasher.encerrar()
+    nucleos = min(settings.HASH_WORKERS, os.cpu_count() or 1)
+    atraso_max_ms = round(max(atrasos) * 1000, 1)
+    relatar(
+        custo=settings.BCRYPT_ROUNDS, workers=settings.HASH_WORKERS, nucleos=nucleos, logins=logins,
+        logins_por_s=round(logins / segundos, 1), logins_por_s_por_nucleo=round(logins / segundos / nucleos, 1),
+        atraso_loop_max_ms=atraso_max_ms,
+    )
+    assert resultados == [(True, None)] * logins
+    assert atraso_max_ms < 100
@@ -0,0 +1,85 @@
+import random
+import time
+
+import pytest
+
+from app.services import semantic_cache
+from app.services.semantic_cache import SemanticCache
+
+
+def test_niveis_exato_e_similar():
+    cache = SemanticCache(maxsize=10, ttl=60)
+    cache.set("Hoje estou ansioso!", "resposta")
+    assert cache.get("hoje estou ansioso") == "resposta"      # exato (normalizado)
+    assert cache.get("ansioso hoje") == "resposta"            # similar (mesmos tokens sem stopwords)
+    assert cache.get("hoje estou feliz") is None
+    assert (cache.stats["hits_exatos"], cache.stats["hits_similares"], cache.stats["misses"]) == (1, 1, 1)
+
+
+def test_ttl_e_lru(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: agora[0])
+    cache = SemanticCache(maxsize=2, ttl=10)
+    cache.set("perdi dinheiro apostando", 1)
+    cache.set("vontade de jogar cassino", 2)
+    cache.get("perdi dinheiro apostando")            # vira a mais recente
+    cache.set("briguei com minha familia", 3)        # despeja a menos usada
+    assert cache.get("vontade de jogar cassino") is None
+    assert cache.get("perdi dinheiro apostando") == 1
+    agora[0] += 11
+    assert cache.get("perdi dinheiro apostando") is None
+    assert cache.stats["evictions"] == 1
+
+
+SENTIMENTOS = ["ansioso", "triste", "culpado", "irritado", "sozinho", "esperancoso", "cansado", "aliviado"]
+GATILHOS = ["apostas", "cassino", "futebol", "roleta", "dividas", "salario", "madrugada", "celular", "propaganda", "amigos"]
+CONTEXTOS = ["trabalho", "familia", "casa", "faculdade", "bar", "onibus", "fim de semana", "aniversario"]
+
+
+def _variar(rnd: random.Random, palavras: list[str]) -> str:
+    """Mesmo desabafo escrito de outro jeito: ordem, stopwords, caixa, pontuação e acento."""
+    palavras = palavras[:]
+    rnd.shuffle(palavras)
+    extras = rnd.sample(["hoje", "estou", "eu", "muito", "com", "de", "me", "sinto"], k=rnd.randrange(0, 3))
+    texto = " ".join(extras + palavras)
+    if rnd.random() < 0.3:
+        texto = texto.capitalize() + rnd.choice(["!", "...", "."])
+    return texto.replace("dividas", rnd.choice(["dívidas", "dividas"]))
+
+
+@pytest.mark.bench
+def test_taxa_de_acerto_e_latencia(escala, relatar):
+    rnd = random.Random(3)
+    entradas = escala(100_000, 5_000)
+    temas = [[s, g, c] for s in SENTIMENTOS for g in GATILHOS for c in CONTEXTOS]
+    pesos = [1 / (i + 1) for i in range(len(temas))]  # poucos temas dominam, como no uso real
+    cache = SemanticCache(maxsize=5000, ttl=3600)
+
+    latencias, errados, unicos = [], 0, 0
+    for i in range(entradas):
+        if rnd.random() < 0.15:  # desabafo que não se repete
+            tema_id, palavras = f"unico-{i}", [f"palavra{i}", f"outra{i}", rnd.choice(SENTIMENTOS)]
+            unicos += 1
+        else:
+            tema_id = rnd.choices(range(len(temas)), weights=pesos)[0]
+            palavras = temas[tema_id]
+        texto = _variar(rnd, palavras)
+        t0 = time.perf_counter()
+        valor = cache.get(texto)
+        latencias.append(time.perf_counter() - t0)
+        if valor is None:
+            cache.set(texto, tema_id)  # a "chamada da IA"
+        elif valor != tema_id:
+            errados += 1
+
+    latencias.sort()
+    stats = cache.estatisticas()
+    relatar(
+        entradas=entradas, temas=len(temas), unicos=unicos, hit_rate=stats["hit_rate"],
+        hits_exatos=stats["hits_exatos"], hits_similares=stats["hits_similares"], respostas_erradas=errados,
+        get_p50_us=round(latencias[len(latencias) // 2] * 1e6, 1),
+        get_p99_us=round(latencias[int(len(latencias) * 0.99)] * 1e6, 1),
+    )
+    assert errados == 0
+    assert stats["hits_similares"] > stats["hits_exatos"]  # as variações só casam pelo nível similar
+    assert stats["hit_rate"] > 0.6
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert
+
+from app import crud, models
+from app.config import settings
+from app.services.streak_expiracao import NOME_TAREFA, StreakExpiracao, expirar
+
+
+def _abandonadas(criar_usuario, n: int, hoje: date) -> list[models.Usuario]:
+    return [
+        criar_usuario(
+            streak_started_at=datetime.combine(hoje - timedelta(days=10), datetime.min.time(), tzinfo=timezone.utc),
+            last_checkin_date=hoje - timedelta(days=5),
+        )
+        for _ in range(n)
+    ]
+
+
+def test_parar_nao_trava():
+    async def cenario():
+        job = StreakExpiracao(hora_utc=0, lote=100, pausa_s=0, lock_arquivo=settings.STREAKS_LOCK_ARQUIVO)
+        await job.iniciar()
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(job.parar(), timeout=5)
+        assert job._task is None
+
+    asyncio.run(cenario())
+
+
+def test_rodada_interrompida_retoma_do_cursor(db, criar_usuario):
+    hoje = date.today()
+    usuarios = _abandonadas(criar_usuario, 5, hoje)
+    chamadas = iter([False, True])  # para depois do primeiro lote
+
+    parcial = expirar(hoje, lote=2, pausa_s=0, deve_parar=lambda: next(chamadas))
+    assert parcial["fechadas"] == 2
+    progresso = crud.get_progresso_tarefa(db, NOME_TAREFA)
+    assert not progresso.concluida
+    assert progresso.cursor == usuarios[1].id
+
+    resto = expirar(hoje, lote=2, pausa_s=0)
+    assert resto["fechadas"] == 3
+    db.expire_all()
+    assert crud.get_progresso_tarefa(db, NOME_TAREFA).concluida
+    assert db.query(models.StreakTransicao).filter_by(motivo="expirada").count() == 5
+    assert expirar(hoje, lote=2, pausa_s=0)["lotes"] == 0
+
+
+@pytest.mark.bench
+def test_expiracao_de_1m_usuarios(db, escala, relatar):
+    usuarios = escala(1_000_000, 20_000)
+    hoje = date.today()
+    meia_noite = datetime.min.time()
+
+    def _usuario(i: int) -> dict:
+        perfil = i % 3  # 0 = abandonou, 1 = fez check-in ontem, 2 = sem streak
+        dados = {"nome": f"Usuário {i}", "email": f"carga{i}@example.com", "senha": "x", "best_streak_days": i % 20}
+        if perfil != 2:
+            inicio = hoje - timedelta(days=40 - i % 7)
+            fim = hoje - timedelta(days=2 + i % 10) if perfil == 0 else hoje - timedelta(days=1)
+            dados |= {"streak_started_at": datetime.combine(inicio, meia_noite, tzinfo=timezone.utc), "last_checkin_date": fim}
+        return dados
+
+    for inicio in range(0, usuarios, 100_000):
+        db.execute(insert(models.Usuario), [_usuario(i) for i in range(inicio, min(usuarios, inicio + 100_000))])
+    db.commit()
+    abandonadas = len(range(0, usuarios, 3))
+
+    lote, pausa_s = settings.STREAKS_EXPIRAR_LOTE, settings.STREAKS_EXPIRAR_PAUSA_SEGUNDOS
+    stats = expirar(hoje, lote=lote, pausa_s=pausa_s)
+    trabalho_s = stats["segundos"] - stats["lotes"] * pausa_s
+    relatar(
+        usuarios=usuarios, lote=lote, pausa_s=pausa_s, lotes=stats["lotes"], fechadas=stats["fechadas"],
+        segundos=stats["segundos"], linhas_por_s=stats["linhas_por_s"],
+        linhas_por_s_sem_pausa=round(stats["varridos"] / trabalho_s), ms_por_lote=round(trabalho_s / stats["lotes"] * 1000, 1),
+    )
+    assert (stats["varridos"], stats["fechadas"]) == (usuarios, abandonadas)
+    assert db.query(func.count(models.StreakTransicao.id)).scalar() == abandonadas
+    abertas = db.query(func.count(models.Usuario.id)).filter(models.Usuario.streak_started_at.isnot(None)).scalar()
+    assert abertas == len(range(1, usuarios, 3))  # quem fez check-in ontem segue com a streak
+    # streak fechada vira last e, se maior que a guardada, best
+    fechado = db.query(models.Usuario).filter_by(email="carga0@example.com").one()
+    assert (fechado.last_streak_days, fechado.best_streak_days) == (39, 39)
@@ -0,0 +1,148 @@
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from app import crud, models
+from app.crud import today_utc
+from app.services import painel_usuario, streaks
+
+
+def test_recalcular_usa_a_maior_sequencia_do_log(db, criar_usuario):
+    hoje = today_utc()
+    inicio = hoje - timedelta(days=1)
+    usuario = criar_usuario(
+        streak_started_at=datetime.combine(inicio, datetime.min.time(), tzinfo=timezone.utc),
+        last_checkin_date=hoje - timedelta(days=3),  # coluna desatualizada
+        best_streak_days=2,
+    )
+    antigos = [hoje - timedelta(days=d) for d in range(20, 15, -1)]  # 5 dias seguidos
+    for dia in antigos + [inicio, hoje]:
+        crud.registrar_checkin(db, usuario.id, dia)
+    db.commit()
+    painel_usuario.obter(db, usuario.id)
+
+    assert crud.recalcular_streaks(db, lote_usuarios=1) == 1
+    db.refresh(usuario)
+    assert usuario.best_streak_days == 5
+    assert usuario.last_checkin_date == hoje
+    # o snapshot do painel foi invalidado junto
+    assert crud.get_painel_snapshot(db, usuario.id).dados == ""
+    assert painel_usuario.obter(db, usuario.id)["streak"] == {
+        "currentDays": 2, "bestDays": 5, "since": usuario.streak_started_at.isoformat(),
+    }
+
+
+def test_recalcular_nao_diminui_o_melhor_guardado(db, criar_usuario):
+    usuario = criar_usuario(best_streak_days=40)
+    crud.registrar_checkin(db, usuario.id, today_utc())
+    db.commit()
+    crud.recalcular_streaks(db)
+    db.refresh(usuario)
+    assert usuario.best_streak_days == 40
+
+
+def test_numpy_e_laco_python_dao_o_mesmo_resultado(monkeypatch):
+    rnd = random.Random(7)
+    base = date(2025, 1, 1)
+    linhas = sorted(
+        {(u, base + timedelta(days=rnd.randrange(60))) for u in range(1, 30) for _ in range(rnd.randrange(1, 40))}
+    )
+    usuario_ids, dias = zip(*linhas)
+    inicios = {u: base + timedelta(days=rnd.randrange(60)) if u % 3 else None for u in range(1, 30)}
+    com_numpy = streaks.calcular_em_lote(usuario_ids, dias, inicios)
+    monkeypatch.setattr(streaks, "np", None)
+    assert streaks.calcular_em_lote(usuario_ids, dias, inicios) == com_numpy
+
+
+def test_recalcular_progresso_a_partir_do_log(db, criar_usuario):
+    hoje = today_utc()
+    usuario = criar_usuario()
+    desafio = models.UserChallenge(
+        user_id=usuario.id, title="Economizar", target_type="money", target_value=100, status="active",
+        started_at=datetime.combine(hoje - timedelta(days=3), datetime.min.time(), tzinfo=timezone.utc),
+        baseline_money=30,
+    )
+    outro = criar_usuario()
+    db.add(desafio)
+    db.add(models.UserChallenge(
+        user_id=outro.id, title="Economizar", target_type="money", target_value=100, status="active",
+        started_at=desafio.started_at, baseline_money=30,
+    ))
+    db.commit()
+    for d in range(4):  # check-ins importados direto na tabela
+        crud.registrar_checkin(db, usuario.id, hoje - timedelta(days=d))
+    crud.registrar_checkin(db, usuario.id, hoje - timedelta(days=10))  # antes do início: não conta
+    db.commit()
+
+    assert crud.recalcular_progresso_desafios(db, usuario.id) == 1
+    db.refresh(desafio)
+    assert (desafio.dias_checkin, desafio.progress_value, desafio.status) == (4, 120, "completed")
+
+
+def _log_sintetico(rnd: np.random.Generator, primeiro_id: int, usuarios: int, dias: int = 365):
+    """Um ano de check-ins por usuário, cada um com a sua assiduidade; ordenado por (usuario_id, dia)."""
+    assiduidade = rnd.uniform(0.05, 0.95, usuarios)
+    usuario, dia = np.nonzero(rnd.random((usuarios, dias)) < assiduidade[:, None])
+    return usuario.astype(np.int64) + primeiro_id, dia.astype(np.int64) + date(2025, 1, 1).toordinal()
+
+
+@pytest.mark.bench
+def test_runs_de_1m_usuarios_por_365_dias(escala, relatar):
+    usuarios = escala(1_000_000, 20_000)
+    lote = 10_000  # o lote padrão de recalcular_streaks
+    rnd = np.random.default_rng(20)
+    checkins, numpy_s = 0, 0.0
+    for primeiro in range(1, usuarios + 1, lote):
+        ids, ordinais = _log_sintetico(rnd, primeiro, min(lote, usuarios - primeiro + 1))
+        t0 = time.perf_counter()
+        streaks._runs_numpy(ids, ordinais)
+        numpy_s += time.perf_counter() - t0
+        checkins += len(ordinais)
+
+    # uma fatia pelo laço Python e pelo caminho completo (objetos date, como vêm do banco)
+    ids, ordinais = _log_sintetico(rnd, 1, lote)
+    t0 = time.perf_counter()
+    pelo_laco = streaks._runs_python(ids.tolist(), ordinais.tolist())
+    python_s = time.perf_counter() - t0
+    assert pelo_laco == streaks._runs_numpy(ids, ordinais)
+    usuario_ids, dias = ids.tolist(), [date.fromordinal(o) for o in ordinais.tolist()]
+    t0 = time.perf_counter()
+    streaks.calcular_em_lote(usuario_ids, dias)
+    lote_s = time.perf_counter() - t0
+
+    relatar(
+        usuarios=usuarios, checkins=checkins, numpy_s=round(numpy_s, 2),
+        numpy_ns_por_checkin=round(numpy_s / checkins * 1e9, 1),
+        python_ns_por_checkin=round(python_s / len(ordinais) * 1e9, 1),
+        calcular_em_lote_ms_por_10k_usuarios=round(lote_s * 1000),
+    )
+    assert numpy_s / checkins < python_s / len(ordinais)
+
+
+@pytest.mark.bench
+def test_recalcular_streaks_no_banco(db, escala, relatar):
+    usuarios = escala(10_000, 500)
+    db.execute(insert(models.Usuario), [
+        {"nome": f"Usuário {i}", "email": f"carga{i}@example.com", "senha": "x"} for i in range(usuarios)
+    ])
+    ids = [i for (i,) in db.query(models.Usuario.id).order_by(models.Usuario.id)]
+    ids_log, ordinais = _log_sintetico(np.random.default_rng(21), 0, usuarios)
+    db.execute(insert(models.Checkin), [
+        {"usuario_id": ids[u], "dia": date.fromordinal(o)} for u, o in zip(ids_log.tolist(), ordinais.tolist())
+    ])
+    db.commit()
+
+    t0 = time.perf_counter()
+    total = crud.recalcular_streaks(db)
+    segundos = time.perf_counter() - t0
+    relatar(
+        usuarios=usuarios, checkins=len(ordinais), segundos=round(segundos, 2),
+        usuarios_por_s=round(total / segundos), checkins_por_s=round(len(ordinais) / segundos),
+    )
+    assert total == len(set(ids_log.tolist()))
+    esperado = {ids[u]: melhor for u, _, _, melhor in streaks._runs_numpy(ids_log, ordinais)}
+    assert dict(db.query(models.Usuario.id, models.Usuario.best_streak_days)) == {i: esperado.get(i, 0) for i in ids}
@@ -0,0 +1,117 @@
+import json
+import random
+import time
+
+import pytest
+
+from app.utils.structured_output import SENTIMENTOS, ParserIncremental, parse_analise, parse_analises_lote
+
+# completions no formato em que os modelos de fato respondem (schema, legado e desvios)
+GRAVADAS = [
+    ('{"sentimento": "Ansiedade", "resposta": "Respire fundo, isso passa."}', "Ansiedade", "Respire fundo, isso passa."),
+    ('```json\n{"sentimento": "Culpa", "resposta": "Errar faz parte."}\n```', "Culpa", "Errar faz parte."),
+    ('Claro! Aqui está:\n{"sentimento": "tristeza", "resposta": "Você não está só."} Espero ajudar.', "Tristeza", "Você não está só."),
+    ('{"sentiment": "Medo", "response": "Peça ajuda a alguém."}', "Medo", "Peça ajuda a alguém."),
+    ('{"sentimento": "Esperan\\u00e7a", "resposta": "Linha 1\\nLinha 2 \\"citada\\""}', "Esperança", 'Linha 1\nLinha 2 "citada"'),
+    ("1. Ansiedade.\n2. Vai ficar tudo bem, um dia de cada vez.", "Ansiedade", "Vai ficar tudo bem, um dia de cada vez."),
+    ("Sentimento: raiva\nResposta: Canalize isso numa caminhada.", "Raiva", "Canalize isso numa caminhada."),
+    ("1) solitário\n2) Ligue para um amigo hoje.", "Solidão", "Ligue para um amigo hoje."),
+    ('{"sentimento": "alívio profundo", "resposta": "Que bom!"}', "Alegria", "Que bom!"),
+    ('{"sentimento": "Neutro", "resposta": ""}', "Neutro", ""),
+]
+
+
+def _pedacos(rnd: random.Random, texto: str) -> list[str]:
+    """Quebra como um stream quebraria: inclusive no meio de escapes \\uXXXX."""
+    cortes = sorted(rnd.sample(range(1, len(texto)), k=min(len(texto) - 1, rnd.randrange(1, 12)))) if len(texto) > 1 else []
+    return [texto[a:b] for a, b in zip([0, *cortes], [*cortes, len(texto)])]
+
+
+def _mutar(rnd: random.Random, texto: str) -> str:
+    op = rnd.randrange(5)
+    if op == 0:  # stream interrompido
+        return texto[: rnd.randrange(len(texto) + 1)]
+    if op == 1:  # lixo no meio
+        i = rnd.randrange(len(texto) + 1)
+        return texto[:i] + "".join(rnd.choice('{}[]":,\\\n xé\u0000') for _ in range(rnd.randrange(1, 8))) + texto[i:]
+    if op == 2:  # caractere apagado
+        i = rnd.randrange(max(1, len(texto)))
+        return texto[:i] + texto[i + 1:]
+    if op == 3:  # bytes aleatórios
+        return "".join(chr(rnd.randrange(0, 0x2FF)) for _ in range(rnd.randrange(0, 80)))
+    return texto.upper()
+
+
+@pytest.mark.parametrize("conteudo,sentimento,resposta", GRAVADAS)
+def test_completions_gravadas(conteudo, sentimento, resposta):
+    assert parse_analise(conteudo) == (sentimento, resposta)
+
+
+@pytest.mark.parametrize("conteudo,sentimento,resposta", [g for g in GRAVADAS if g[0].lstrip().startswith("{")])
+def test_incremental_entrega_a_resposta_em_pedacos(conteudo, sentimento, resposta):
+    rnd = random.Random(conteudo)
+    for _ in range(50):
+        parser = ParserIncremental()
+        entregue = "".join(parser.feed(p) for p in _pedacos(rnd, conteudo))
+        if '"resposta"' in conteudo:
+            assert entregue == resposta
+        assert parser.resultado() == (sentimento, resposta)
+
+
+def test_fuzz_nunca_lanca_e_sempre_devolve_um_sentimento_valido(escala):
+    rnd = random.Random(13)
+    for i in range(escala(200_000, 5_000)):
+        base = GRAVADAS[i % len(GRAVADAS)][0]
+        texto = _mutar(rnd, base)
+        sentimento, resposta = parse_analise(texto)
+        assert sentimento in SENTIMENTOS and isinstance(resposta, str), texto
+
+        parser = ParserIncremental()
+        entregue = "".join(parser.feed(p) for p in _pedacos(rnd, texto))
+        sentimento, resposta = parser.resultado()
+        assert sentimento in SENTIMENTOS, texto
+        if texto.startswith('{"sentimento"'):
+            # o que já saiu pelo stream nunca é desdito pelo resultado final
+            assert resposta.startswith(entregue.strip()) or entregue.startswith(resposta), texto
+
+
+def test_lote_ignora_itens_quebrados():
+    conteudo = json.dumps({"analises": [
+        {"id": 1, "sentimento": "Medo", "resposta": "Calma."},
+        {"id": "x", "sentimento": "Medo", "resposta": "sem id válido"},
+        {"id": 3, "sentimento": "Raiva", "resposta": ""},
+        "lixo",
+        {"id": 4, "sentimento": "inventado", "resposta": "Estou triste por você."},
+    ]})
+    resultado = parse_analises_lote(conteudo)
+    assert set(resultado) == {1, 4}
+    assert resultado[1] == ("Medo", "Calma.")
+    assert resultado[4][0] in SENTIMENTOS
+    assert parse_analises_lote(conteudo[:40]) == {}
+
+
+@pytest.mark.bench
+def test_vazao_do_parser(escala, relatar):
+    rnd = random.Random(5)
+    amostras = [_mutar(rnd, g[0]) if rnd.random() < 0.3 else g[0] for g in GRAVADAS for _ in range(100)]
+    rodadas = escala(200, 10)
+    t0 = time.perf_counter()
+    for _ in range(rodadas):
+        for texto in amostras:
+            parse_analise(texto)
+    inteiro_s = time.perf_counter() - t0
+    pedacos = [_pedacos(rnd, t) for t in amostras]
+    t0 = time.perf_counter()
+    for _ in range(rodadas):
+        for lista in pedacos:
+            parser = ParserIncremental()
+            for p in lista:
+                parser.feed(p)
+            parser.resultado()
+    stream_s = time.perf_counter() - t0
+    n = rodadas * len(amostras)
+    relatar(
+        completions=n,
+        inteiro_us=round(inteiro_s / n * 1e6, 1),
+        stream_us=round(stream_s / n * 1e6, 1),
+    )
@@ -0,0 +1,55 @@
+import asyncio
+
+from app import crud, models, schemas
+from app.services.tentativa_buffer import TentativaBuffer
+
+
+def _site(db, usuario) -> models.SiteBloqueado:
+    return crud.create_site(db, schemas.SiteBloqueadoCreate(url="bet365.com", tipo="apostas"), usuario.id)
+
+
+def test_batch_rejeita_ids_inexistentes_sem_gravar_nada(client, db, criar_usuario):
+    usuario = criar_usuario()
+    site = _site(db, usuario)
+    resposta = client.post("/tentativas/batch", json={"tentativas": [
+        {"site_id": site.id, "usuario_id": usuario.id},
+        {"site_id": site.id + 999, "usuario_id": usuario.id},
+        {"site_id": site.id, "usuario_id": usuario.id + 999},
+    ]})
+    assert resposta.status_code == 422
+    locais = [e["loc"] for e in resposta.json()["detail"]]
+    assert locais == [["body", "tentativas", 1, "site_id"], ["body", "tentativas", 2, "usuario_id"]]
+    assert db.query(models.TentativaAcesso).count() == 0
+
+
+def test_batch_valido_grava_todas(client, db, criar_usuario):
+    usuario = criar_usuario()
+    site = _site(db, usuario)
+    resposta = client.post("/tentativas/batch", json={"tentativas": [{"site_id": site.id, "usuario_id": usuario.id}] * 3})
+    assert resposta.status_code == 202
+    assert resposta.json() == {"aceitas": 3}
+    assert db.query(models.TentativaAcesso).count() == 3
+
+
+def test_parar_grava_a_fila_e_nao_trava(db, criar_usuario):
+    usuario = criar_usuario()
+    site = _site(db, usuario)
+
+    async def cenario():
+        buffer = TentativaBuffer(lote_max=500, intervalo_s=30, capacidade=1000)
+        await buffer.iniciar()
+        await buffer.enfileirar([{"site_id": site.id, "usuario_id": usuario.id, "data_hora": None}] * 10)
+        await asyncio.sleep(0)
+        await asyncio.wait_for(buffer.parar(), timeout=5)
+
+    asyncio.run(cenario())
+    assert db.query(models.TentativaAcesso).count() == 10
+
+
+def test_metricas_de_alertas_so_para_o_admin(client, criar_usuario, auth_headers):
+    url = "/tentativas/alertas/metricas"
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers=auth_headers(criar_usuario())).status_code == 403
+    resposta = client.get(url, headers=auth_headers(criar_usuario(email="admin@example.com")))
+    assert resposta.status_code == 200
+    assert "pendentes" in resposta.json()